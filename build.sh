@@ -36,4 +36,17 @@ python manage.py collectstatic --no-input
 echo "Aplicando migrações do banco de dados..."
 python manage.py migrate
 
+# Passo 3b: Criar a Tabela de Cache
+# O cache de produção ('DatabaseCache' no 'settings.py') guarda os dados
+# em uma tabela do banco. O comando só cria a tabela se ela ainda não existir.
+echo "Criando a tabela de cache..."
+python manage.py createcachetable
+
+# Passo 4: Reconstruir a Listagem de Professores
+# A tabela 'ProfessorListing' é uma cópia desnormalizada dos professores
+# ativos, mantida por signals. Reconstruí-la no deploy garante o
+# preenchimento inicial (backfill) e corrige qualquer divergência.
+echo "Reconstruindo a listagem de professores..."
+python manage.py rebuild_professor_listing
+
 echo "Build concluído com sucesso!"
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Entrega dos Arquivos de Mídia (fotos enviadas pelos usuários) em Produção.
+
+Substitui o 'django.views.static.serve', que a documentação do Django
+desaconselha em produção: ele lê o arquivo inteiro pelo Python a cada
+requisição, sem cache no navegador e sem suporte a "Range".
+
+O que esta view faz:
+1. CACHE NO NAVEGADOR: nomes com hash do conteúdo (os que casam com
+   'NOME_POR_CONTEUDO' de 'users/armazenamento.py') nunca mudam de conteúdo, então recebem
+   'Cache-Control: immutable' por um ano. Os demais recebem um cache curto
+   (MIDIA_CACHE_SEGUNDOS) e são revalidados pelo ETag.
+2. ETAG FORTE (tamanho + data de modificação em nanossegundos, como o
+   nginx) e respostas 304 para 'If-None-Match' / 'If-Modified-Since'.
+3. RANGE: 'Range: bytes=...' (um intervalo) responde 206 só com o trecho
+   pedido; 'If-Range' garante que o trecho é da mesma versão do arquivo.
+4. ENTREGA PELO SERVIDOR WEB (opcional, settings.MIDIA_ENTREGA): com
+   'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache/lighttpd), a view só
+   confere o arquivo e monta os cabeçalhos; os bytes são enviados pelo
+   servidor web, sem ocupar o worker do Python.
+
+Sem o servidor web na frente, a resposta completa usa 'FileResponse', que
+o Gunicorn envia com 'sendfile' (cópia direta do disco para a rede).
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from users.armazenamento import NOME_POR_CONTEUDO
+
+# Cache dos arquivos com hash: um ano e "imutável" (o navegador nem revalida)
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+# 'bytes=INICIO-FIM', 'bytes=INICIO-' ou 'bytes=-SUFIXO' (um único intervalo)
+INTERVALO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Tamanho dos pedaços lidos do disco nas respostas parciais
+TAMANHO_PEDACO = 64 * 1024
+
+
+def _etag(estado):
+    """ETag forte a partir do tamanho e da data de modificação."""
+    return f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+
+
+def _etag_confere(cabecalho, etag):
+    """'If-None-Match' usa comparação fraca: ignora o prefixo 'W/'."""
+    if cabecalho.strip() == '*':
+        return True
+    return any(valor.strip().removeprefix('W/') == etag for valor in cabecalho.split(','))
+
+
+def _nao_modificado(request, etag, modificado_em):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # Quando os dois vêm, o 'If-None-Match' decide (RFC 9110)
+        return _etag_confere(if_none_match, etag)
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(modificado_em) <= if_modified_since
+
+
+def _intervalo(request, tamanho, etag, modificado_em):
+    """
+    Lê o cabeçalho 'Range'. Retorna (inicio, fim) inclusivo, None para
+    enviar o arquivo inteiro, ou False se o intervalo não existe no arquivo.
+    """
+    cabecalho = request.META.get('HTTP_RANGE', '')
+    correspondencia = INTERVALO.match(cabecalho.replace(' ', ''))
+    if not correspondencia:
+        return None # Sem 'Range', ou vários intervalos: envia tudo (permitido)
+
+    # 'If-Range': o trecho só vale se for da mesma versão do arquivo
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None:
+        data = parse_http_date_safe(if_range)
+        if if_range != etag and (data is None or int(modificado_em) > data):
+            return None
+
+    inicio, fim = correspondencia.groups()
+    if inicio == '' and fim == '':
+        return None
+    if inicio == '':
+        # 'bytes=-500': os últimos 500 bytes
+        sufixo = int(fim)
+        if sufixo == 0:
+            return False
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def _pedacos(arquivo, inicio, quantidade):
+    """Lê 'quantidade' bytes a partir de 'inicio', em pedaços."""
+    with arquivo:
+        arquivo.seek(inicio)
+        while quantidade > 0:
+            pedaco = arquivo.read(min(TAMANHO_PEDACO, quantidade))
+            if not pedaco:
+                break
+            quantidade -= len(pedaco)
+            yield pedaco
+
+
+@require_safe
+def servir_midia(request, caminho):
+    """
+    Entrega o arquivo 'caminho' de MEDIA_ROOT (só GET e HEAD).
+    """
+    try:
+        completo = safe_join(settings.MEDIA_ROOT, caminho)
+        estado = os.stat(completo)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("Arquivo não encontrado.")
+    if not os.path.isfile(completo):
+        raise Http404("Arquivo não encontrado.")
+
+    etag = _etag(estado)
+    modificado_em = estado.st_mtime
+    cabecalhos = {
+        'ETag': etag,
+        'Last-Modified': http_date(modificado_em),
+        'Cache-Control': (
+            CACHE_IMUTAVEL if NOME_POR_CONTEUDO.match(caminho)
+            else f'public, max-age={settings.MIDIA_CACHE_SEGUNDOS}'
+        ),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _nao_modificado(request, etag, modificado_em):
+        response = HttpResponseNotModified()
+        for nome, valor in cabecalhos.items():
+            response[nome] = valor
+        return response
+
+    tipo, codificacao = mimetypes.guess_type(completo)
+    tipo = tipo or 'application/octet-stream'
+
+    # Entrega pelo servidor web: ele mesmo trata o 'Range' e envia os bytes
+    entrega = settings.MIDIA_ENTREGA
+    if entrega:
+        response = HttpResponse(content_type=tipo)
+        if entrega == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(settings.MIDIA_PREFIXO_INTERNO + caminho)
+        else:
+            response['X-Sendfile'] = completo
+        for nome, valor in cabecalhos.items():
+            response[nome] = valor
+        return response
+
+    intervalo = _intervalo(request, estado.st_size, etag, modificado_em)
+    if intervalo is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{estado.st_size}'
+        return response
+
+    if intervalo is None:
+        # Arquivo inteiro: 'FileResponse' usa o 'sendfile' do servidor WSGI
+        response = FileResponse(open(completo, 'rb'), content_type=tipo)
+        if codificacao:
+            response.headers['Content-Encoding'] = codificacao
+    else:
+        inicio, fim = intervalo
+        quantidade = fim - inicio + 1
+        response = StreamingHttpResponse(
+            _pedacos(open(completo, 'rb'), inicio, quantidade), status=206, content_type=tipo
+        )
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{estado.st_size}'
+        response['Content-Length'] = str(quantidade)
+
+    for nome, valor in cabecalhos.items():
+        response[nome] = valor
+    return response
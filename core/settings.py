@@ -76,6 +76,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                # Contador de mensagens não lidas do menu (sem consulta extra)
+                'users.context_processors.mensagens_nao_lidas',
             ],
         },
     },
@@ -98,6 +100,37 @@ DATABASES = {
 }
 
 
+# --- Configuração de Cache ---
+
+# O cache guarda resultados caros de calcular (ex: contagens de filtros da
+# listagem) para não repetir as mesmas consultas a cada visita.
+
+# Máximo de chaves antes do "cull" (o padrão do Django, 300, é pouco: só os
+# cards e as páginas em cache já passam disso e expulsariam os contadores
+# de geração e os do limite de taxa)
+LIMITE_ENTRADAS_CACHE = int(os.environ.get('LIMITE_ENTRADAS_CACHE', 50000))
+
+if 'RENDER' in os.environ:
+    # Em produção: Usa uma tabela do próprio banco, compartilhada por todos os
+    # workers do Gunicorn (um cache em memória seria separado por processo).
+    # A tabela é criada pelo 'createcachetable' no 'build.sh'.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_professor_certo',
+            'OPTIONS': {'MAX_ENTRIES': LIMITE_ENTRADAS_CACHE},
+        }
+    }
+else:
+    # Em desenvolvimento: Cache simples na memória do processo.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': LIMITE_ENTRADAS_CACHE},
+        }
+    }
+
+
 # --- Validação de Senhas ---
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -124,8 +157,6 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [ os.path.join(BASE_DIR, 'static'), ]
 # Onde o 'collectstatic' reunirá todos os arquivos para produção
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-# Armazenamento otimizado do WhiteNoise (com compressão)
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 
 # --- Configuração de Mídia (Uploads dos Usuários) ---
@@ -142,6 +173,35 @@ else:
     # Em desenvolvimento: Usa a pasta 'media' local.
     MEDIA_ROOT = BASE_DIR / 'media'
 
+# Onde os arquivos são gravados ('STORAGES' substitui o antigo
+# 'STATICFILES_STORAGE', que o Django 5.1 deixou de ler).
+STORAGES = {
+    # Fotos enviadas: gravadas com o hash do conteúdo no nome, sem
+    # duplicatas. Ver 'users/armazenamento.py' e o comando 'gc_media'.
+    'default': {
+        'BACKEND': 'users.armazenamento.ArmazenamentoPorConteudo',
+    },
+    # Arquivos estáticos: armazenamento otimizado do WhiteNoise (com compressão)
+    # em produção. Localmente (e nos testes) o padrão, que dispensa o 'collectstatic'.
+    'staticfiles': {
+        'BACKEND': (
+            'whitenoise.storage.CompressedManifestStaticFilesStorage' if 'RENDER' in os.environ
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# Entrega das fotos em produção (ver 'core/midia.py').
+# Cache no navegador (em segundos) dos arquivos SEM hash do conteúdo no nome;
+# os com hash são "imutáveis" por um ano.
+MIDIA_CACHE_SEGUNDOS = int(os.environ.get('MIDIA_CACHE_SEGUNDOS', 60 * 60))
+# Com um nginx/Apache na frente, a view só confere o arquivo e o servidor web
+# envia os bytes: 'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache).
+# Vazio: o próprio Django envia o arquivo.
+MIDIA_ENTREGA = os.environ.get('MIDIA_ENTREGA') or None
+# Prefixo da 'location internal' do nginx que aponta para MEDIA_ROOT
+MIDIA_PREFIXO_INTERNO = os.environ.get('MIDIA_PREFIXO_INTERNO', '/midia-interna/')
+
 
 # --- Configurações Específicas do Projeto ---
 
@@ -155,6 +215,27 @@ LOGOUT_REDIRECT_URL = '/'
 AUTH_USER_MODEL = 'users.CustomUser'
 
 
+# --- Limites de Taxa (Anti-Spam) ---
+# Quantas vezes cada ação pode ser feita por usuário em uma janela de tempo
+# (em segundos). 'por' separa a contagem por um parâmetro da URL.
+# Ver 'users/limites.py'.
+LIMITES_DE_TAXA = {
+    'contato_professor': [
+        # Até 3 mensagens por hora para o MESMO professor
+        {'limite': 3, 'janela': 60 * 60, 'por': 'professor_pk'},
+        # Até 20 mensagens por hora somando TODOS os professores
+        {'limite': 20, 'janela': 60 * 60},
+    ],
+}
+
+
+# --- Retenção de Mensagens ---
+# Mensagens de contato mais antigas que isto (em meses) são movidas para o
+# arquivo 'MensagemArquivada' pelo comando 'archive_messages'.
+# Ver 'users/arquivo.py'.
+RETENCAO_MENSAGENS_MESES = int(os.environ.get('RETENCAO_MENSAGENS_MESES', 24))
+
+
 # --- Configuração de E-mail (Produção vs. Desenvolvimento) ---
 
 EMAIL_SUBJECT_PREFIX = '[Professor Certo] '
@@ -172,4 +253,8 @@ if 'RENDER' in os.environ:
 else:
     # Em desenvolvimento: Imprime e-mails no console, em vez de enviá-los.
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
-    DEFAULT_FROM_EMAIL = 'noreply@desenvolvimento.com'
\ No newline at end of file
+    DEFAULT_FROM_EMAIL = 'noreply@desenvolvimento.com'
+
+# Endereço público do site, para montar links absolutos em e-mails enviados
+# fora de uma requisição (ex: os resumos de mensagens dos professores).
+SITE_URL = f'https://{RENDER_EXTERNAL_HOSTNAME}' if RENDER_EXTERNAL_HOSTNAME else 'http://127.0.0.1:8000'
\ No newline at end of file
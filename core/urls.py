@@ -9,8 +9,8 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-# Import necessário para servir arquivos de mídia em produção (Debug=False)
-from django.views.static import serve 
+# View que serve os arquivos de mídia em produção (Debug=False)
+from core.midia import servir_midia
 
 urlpatterns = [
     # 1. Painel de Administração do Django
@@ -44,8 +44,8 @@ else:
     # Esta regra permite que o servidor de aplicação (Render) sirva os arquivos
     # de mídia (fotos) que estão armazenados no Disco Persistente.
     # Isso é necessário para que as fotos de perfil apareçam no site ativo.
+    # 'servir_midia' (ver 'core/midia.py') responde com cache no navegador,
+    # ETag/304 e "Range", no lugar do 'django.views.static.serve'.
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {
-            'document_root': settings.MEDIA_ROOT,
-        }),
-    ]
\ No newline at end of file
+        re_path(r'^media/(?P<caminho>.*)$', servir_midia),
+    ]
@@ -12,6 +12,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 # Pega a aplicação Django padrão
 application = get_wsgi_application()
 
+# Monta o índice do autocompletar da busca ANTES da primeira requisição,
+# para que o primeiro visitante após um deploy não espere por ele
+from users import autocompletar
+autocompletar.aquecer()
+
 # 1. Envolve com o WhiteNoise para servir ARQUIVOS ESTÁTICOS (logo, css)
 # O WhiteNoise busca arquivos do STATIC_ROOT (que o 'collectstatic' criou)
 # Esta linha é OBRIGATÓRIA para o logo, css, etc.
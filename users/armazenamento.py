@@ -0,0 +1,102 @@
+"""
+Armazenamento das Fotos Enviadas com Nomes pelo Conteúdo.
+
+Antes, cada foto era gravada com o nome que veio do celular
+('profile_pics/IMG_1234.jpg', 'profile_pics/IMG_1234_aB3xY9z.jpg'...).
+Com este armazenamento (o 'default' em settings.STORAGES), o nome é o hash
+SHA-256 do conteúdo, numa subpasta própria (PASTA_CONTEUDO):
+'profile_pics/sha256/3f9c2b7a1d4e5f60a1b2c3d4e5f60718.jpg'.
+
+Vantagens:
+1. DEDUPLICAÇÃO: a mesma foto enviada duas vezes (ex: o professor que
+   salva o perfil de novo com a mesma foto) vira o mesmo arquivo no disco.
+2. CACHE IMUTÁVEL: um nome nunca muda de conteúdo, então o navegador pode
+   guardar a foto "para sempre" (ver 'core/midia.py').
+
+Como um arquivo pode ser usado por mais de um registro, NENHUM código
+apaga a foto antiga quando ela é trocada ou a conta é excluída: o comando
+'gc_media' (ver 'limpeza_midia.py') remove periodicamente os arquivos que
+nenhum registro usa mais.
+
+As variantes (pasta 'imagens.PASTA_VARIANTES') não passam pelo hash: o
+nome delas já deriva do nome (com hash) do original, e o worker de imagens
+precisa gravá-las exatamente com esse nome.
+
+A subpasta separa estes arquivos das fotos antigas, gravadas com o nome
+original direto em 'profile_pics/' (o Django nunca cria subpastas a partir
+do nome enviado): só o que casa com NOME_POR_CONTEUDO recebe o cache
+imutável e é conferido pelo 'gc_media', por mais que o nome de uma foto
+antiga se pareça com um hash.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from .imagens import PASTA_VARIANTES
+
+# Caracteres do hash no nome (128 bits: colisão impossível na prática)
+TAMANHO_HASH = 32
+
+# Subpasta (dentro do 'upload_to') dos arquivos gravados por este armazenamento
+PASTA_CONTEUDO = 'sha256'
+
+# Nomes gravados por este armazenamento e as variantes derivadas deles:
+# 'profile_pics/sha256/<hash>.jpg' e 'variantes/profile_pics/sha256/<hash>/288.webp'
+NOME_POR_CONTEUDO = re.compile(
+    rf'^(?:{PASTA_VARIANTES}/)?[^/]+/{PASTA_CONTEUDO}/[0-9a-f]{{{TAMANHO_HASH}}}(?:\.[^/]+|/[^/]+)$'
+)
+
+
+def hash_do_conteudo(conteudo):
+    """SHA-256 (em hexadecimal, encurtado) do arquivo, lido em pedaços."""
+    calculo = hashlib.sha256()
+    if hasattr(conteudo, 'seek'):
+        conteudo.seek(0)
+    for pedaco in conteudo.chunks():
+        calculo.update(pedaco)
+    if hasattr(conteudo, 'seek'):
+        conteudo.seek(0)
+    return calculo.hexdigest()[:TAMANHO_HASH]
+
+
+class ArmazenamentoPorConteudo(FileSystemStorage):
+    """
+    'FileSystemStorage' (MEDIA_ROOT) que grava cada arquivo com o nome
+    '<pasta>/PASTA_CONTEUDO/<hash do conteúdo>.<extensão>'.
+    """
+
+    def derivado(self, nome):
+        """Arquivos gravados com o nome exato pedido (as variantes)."""
+        return nome.startswith(f'{PASTA_VARIANTES}/')
+
+    def nome_por_conteudo(self, nome, conteudo):
+        """'profile_pics/IMG_1234.JPG' -> 'profile_pics/sha256/<hash>.jpg'"""
+        pasta = posixpath.dirname(nome)
+        if posixpath.basename(pasta) != PASTA_CONTEUDO:
+            # Um nome que já é da subpasta (ex: o original limpo pelo worker) fica nela
+            pasta = posixpath.join(pasta, PASTA_CONTEUDO)
+        _base, extensao = posixpath.splitext(nome)
+        return posixpath.join(pasta, hash_do_conteudo(conteudo) + extensao.lower())
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if self.derivado(name):
+            return super().save(name, content, max_length=max_length)
+
+        name = self.nome_por_conteudo(name, content)
+        if self.exists(name):
+            # Mesmo conteúdo já gravado: reaproveita o arquivo. A data de
+            # modificação é renovada, como numa gravação nova: o 'gc_media'
+            # não apaga arquivos recentes, e este pode ser uma cópia sem uso
+            # prestes a ser referenciada de novo (o registro ainda não foi salvo).
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
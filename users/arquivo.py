@@ -0,0 +1,131 @@
+"""
+Arquivamento das Mensagens Antigas ('ContactProfessor' -> 'MensagemArquivada').
+
+A tabela de mensagens só cresce, e a caixa de mensagens, o limite de taxa e
+o Admin passam por ela. As mensagens mais velhas que a retenção
+(settings.RETENCAO_MENSAGENS_MESES) são movidas para a tabela "fria"
+'MensagemArquivada', em LOTES por faixa de chave primária:
+
+    INSERT INTO arquivo (...) SELECT ... FROM mensagens WHERE id >= a AND id < b AND data_envio < limite ...
+    DELETE FROM mensagens WHERE id >= a AND id < b AND data_envio < limite ...
+
+A data é conferida em TODA faixa: a ordem das chaves primárias não é
+garantidamente a ordem de envio. Mensagens que ainda esperam o resumo do
+professor ('notificado_em' vazio) ficam de fora até o resumo sair.
+
+Cada faixa é uma transação curta (as travas duram só um lote), e o
+comando pode ser interrompido e executado de novo a qualquer momento.
+
+Os contadores desnormalizados NÃO são atualizados por signals aqui (o
+DELETE é um SQL direto, justamente para não carregar cada mensagem):
+- 'Conversa.total_mensagens' continua contando as mensagens arquivadas,
+  que ainda fazem parte da conversa;
+- uma mensagem ainda não lida é arquivada como LIDA: ela sai de
+  'Conversa.nao_lidas_professor' e de 'CustomUser.mensagens_nao_lidas'
+  na mesma transação do lote.
+
+Uso:
+    limite = arquivo.limite_de_retencao(24)
+    for inicio, fim in arquivo.faixas(limite, 1000):
+        arquivo.arquivar_faixa(inicio, fim, limite)
+"""
+
+import calendar
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ContactProfessor, Conversa, CustomUser, MensagemArquivada
+
+
+def limite_de_retencao(meses, agora=None):
+    """Data a partir da qual as mensagens são mantidas (hoje menos 'meses' meses)."""
+    agora = agora or timezone.now()
+    mes = agora.month - 1 - meses
+    ano = agora.year + mes // 12
+    mes = mes % 12 + 1
+    # Ex: 31/03 menos 1 mês -> 28/02 (ou 29/02)
+    dia = min(agora.day, calendar.monthrange(ano, mes)[1])
+    return agora.replace(year=ano, month=mes, day=dia)
+
+
+def faixas(limite, tamanho):
+    """
+    Faixas [inicio, fim) de chaves primárias que podem conter mensagens
+    anteriores a 'limite': da menor à maior chave entre elas (pelo
+    'contato_data_envio_idx'), sem supor que a mensagem mais nova tenha a
+    maior chave. Faixas vazias custam quase nada.
+    """
+    pontas = ContactProfessor.objects.filter(data_envio__lt=limite).aggregate(primeira=Min('pk'), ultima=Max('pk'))
+    primeira, ultima = pontas['primeira'], pontas['ultima']
+    if primeira is None:
+        return
+    for inicio in range(primeira, ultima + 1, tamanho):
+        yield inicio, min(inicio + tamanho, ultima + 1)
+
+
+def _colunas(modelo):
+    return [campo.column for campo in modelo._meta.concrete_fields]
+
+
+def arquivar_faixa(inicio, fim, limite):
+    """
+    Move as mensagens da faixa [inicio, fim) anteriores a 'limite' para o
+    arquivo, numa única transação. Retorna quantas foram movidas.
+
+    Ordem das travas, a mesma das outras escritas (ver 'Conversa'):
+    usuários -> mensagens -> conversas.
+    """
+    antigas = ContactProfessor.objects.filter(
+        pk__gte=inicio, pk__lt=fim, data_envio__lt=limite,
+        notificado_em__isnull=False, # Ainda esperando o resumo: fica para depois
+    )
+
+    with transaction.atomic():
+        # 1. Professores com mensagens não lidas na faixa (descontadas abaixo)
+        professores = list(
+            antigas.filter(lida=False).order_by('professor_id')
+            .values_list('professor_id', flat=True).distinct()
+        )
+        if professores:
+            list(CustomUser.objects.select_for_update().filter(pk__in=professores).order_by('pk').values_list('pk'))
+
+        # 2. Trava as mensagens do lote (ninguém as marca como lidas no meio)
+        if not list(antigas.select_for_update().order_by('pk').values_list('pk')):
+            return 0
+
+        # 3. Mensagens não lidas saem dos contadores
+        nao_lidas = antigas.filter(lida=False).values('conversa_id', 'professor_id').annotate(total=Count('pk')).order_by('conversa_id')
+        por_professor = {}
+        for grupo in nao_lidas:
+            Conversa.objects.filter(pk=grupo['conversa_id']).update(
+                nao_lidas_professor=Greatest(F('nao_lidas_professor') - grupo['total'], 0)
+            )
+            por_professor[grupo['professor_id']] = por_professor.get(grupo['professor_id'], 0) + grupo['total']
+        for professor_id, total in por_professor.items():
+            CustomUser.objects.filter(pk=professor_id).update(
+                mensagens_nao_lidas=Greatest(F('mensagens_nao_lidas') - total, 0)
+            )
+
+        # 4. Copia e apaga com SQL direto (sem montar objetos nem disparar signals)
+        quote = connection.ops.quote_name
+        origem = quote(ContactProfessor._meta.db_table)
+        destino = quote(MensagemArquivada._meta.db_table)
+        colunas = [coluna for coluna in _colunas(MensagemArquivada) if coluna not in ('lida', 'arquivada_em')]
+        lista = ', '.join(quote(coluna) for coluna in colunas)
+        filtro = (
+            f"{quote('id')} >= %s AND {quote('id')} < %s AND {quote('data_envio')} < %s "
+            f"AND {quote('notificado_em')} IS NOT NULL"
+        )
+        parametros = [inicio, fim, connection.ops.adapt_datetimefield_value(limite)]
+        agora = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {destino} ({lista}, {quote('lida')}, {quote('arquivada_em')}) "
+                f"SELECT {lista}, %s, %s FROM {origem} WHERE {filtro}",
+                [True, agora, *parametros],
+            )
+            cursor.execute(f"DELETE FROM {origem} WHERE {filtro}", parametros)
+            return cursor.rowcount
@@ -0,0 +1,201 @@
+"""
+Autocompletar da Busca (Índice de Prefixos em Memória).
+
+A cada tecla digitada na busca, o navegador pede sugestões ao servidor.
+Consultar o banco a cada tecla seria caro, então as sugestões saem de um
+índice guardado na memória do próprio processo:
+
+1. O índice é uma LISTA ORDENADA de chaves normalizadas (minúsculas, sem
+   acentos), uma por palavra de cada disciplina, cidade e nome de professor.
+   Ex: "São Paulo" gera as chaves "sao paulo" e "paulo".
+2. Achar tudo que começa com "pau" é uma busca binária ('bisect') pelo
+   primeiro item >= "pau", seguida de uma leitura sequencial enquanto as
+   chaves ainda começarem com "pau". Nenhuma consulta ao banco.
+3. O índice é montado (UMA consulta à 'ProfessorListing') na INICIALIZAÇÃO
+   de cada processo web ('aquecer', chamado pelo 'core/wsgi.py'), antes da
+   primeira requisição. Se ainda assim não existir (ex: o 'runserver', ou o
+   banco estava fora do ar), é montado na primeira busca.
+4. Quando a geração 'listagem' avança (ver 'geracoes.py'), o índice novo é
+   montado numa THREAD separada, e o antigo continua respondendo até ele
+   ficar pronto: nenhuma requisição espera pela remontagem. Para também
+   não consultar o cache a cada tecla, a geração só é conferida a cada
+   INTERVALO_VERIFICACAO segundos.
+
+Uso:
+    autocompletar.sugerir('fis')
+    # [{'tipo': 'disciplina', 'rotulo': 'Física', 'url': '/?disciplina=fisica'}, ...]
+"""
+
+import bisect
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.urls import reverse
+
+from . import geracoes
+from .busca import normalizar
+
+logger = logging.getLogger(__name__)
+
+# Prefixos menores que isso não geram sugestões (seriam quase tudo)
+MINIMO_CARACTERES = 2
+
+# Quantidade máxima de sugestões devolvidas
+LIMITE_SUGESTOES = 8
+
+# De quantos em quantos segundos conferir se a listagem mudou
+INTERVALO_VERIFICACAO = 5
+
+
+class IndicePrefixos:
+    """
+    Índice de prefixos imutável: depois de montado, só é lido (por isso
+    pode ser compartilhado entre threads sem travas).
+
+    Cada entrada é (rotulo, tipo, url, peso), onde 'peso' é a quantidade de
+    professores associados (disciplinas e cidades mais comuns aparecem antes).
+    """
+
+    def __init__(self, entradas):
+        pares = []
+        for numero, (rotulo, _tipo, _url, _peso) in enumerate(entradas):
+            palavras = normalizar(rotulo).split()
+            # Uma chave a partir de cada palavra: "sao paulo", "paulo"
+            for i in range(len(palavras)):
+                pares.append((' '.join(palavras[i:]), numero))
+        pares.sort()
+        self.chaves = [chave for chave, _numero in pares]
+        self.posicoes = [numero for _chave, numero in pares]
+        self.entradas = entradas
+        # Rótulos normalizados, para o desempate alfabético sem recalcular
+        self.ordem_alfabetica = [normalizar(rotulo) for rotulo, _tipo, _url, _peso in entradas]
+
+    def buscar(self, prefixo, limite=LIMITE_SUGESTOES):
+        prefixo = normalizar(prefixo)
+        if len(prefixo) < MINIMO_CARACTERES:
+            return []
+
+        inicio = bisect.bisect_left(self.chaves, prefixo)
+        encontrados = set()
+        for i in range(inicio, len(self.chaves)):
+            if not self.chaves[i].startswith(prefixo):
+                break
+            encontrados.add(self.posicoes[i])
+
+        # Os de maior peso primeiro; empates em ordem alfabética
+        melhores = heapq.nsmallest(
+            limite, encontrados,
+            key=lambda n: (-self.entradas[n][3], self.ordem_alfabetica[n]),
+        )
+        return [
+            {'tipo': self.entradas[n][1], 'rotulo': self.entradas[n][0], 'url': self.entradas[n][2]}
+            for n in melhores
+        ]
+
+
+def montar_indice():
+    """
+    Lê a listagem de professores (UMA consulta) e monta o índice com as
+    disciplinas, cidades e nomes distintos.
+    """
+    # Importação local: 'models.py' importa módulos deste app
+    from .models import ProfessorListing
+
+    lista = reverse('users:lista_professores')
+    disciplinas = Counter()
+    nomes_disciplinas = {}
+    cidades = Counter()
+    entradas = []
+
+    for nome, username, cidade, itens in ProfessorListing.objects.values_list(
+        'nome_exibicao', 'username', 'cidade', 'disciplinas'
+    ).iterator(chunk_size=2000):
+        entradas.append((nome, 'professor', reverse('users:perfil_detalhe', args=[username]), 1))
+        if cidade.strip():
+            cidades[cidade.strip()] += 1
+        for item in itens:
+            disciplinas[item['slug']] += 1
+            nomes_disciplinas.setdefault(item['slug'], item['nome'])
+
+    for slug, total in disciplinas.items():
+        entradas.append((nomes_disciplinas[slug], 'disciplina', f"{lista}?{urlencode({'disciplina': slug})}", total))
+    for cidade, total in cidades.items():
+        entradas.append((cidade, 'cidade', f"{lista}?{urlencode({'cidade': cidade})}", total))
+
+    return IndicePrefixos(entradas)
+
+
+# --- Estado do processo ---
+_trava = threading.Lock()
+_indice = None
+_geracao = None
+_proxima_verificacao = 0.0
+_remontando = False
+
+
+def _montar(geracao):
+    """Monta o índice e o publica (a troca da referência é atômica)."""
+    global _indice, _geracao
+    indice = montar_indice()
+    with _trava:
+        _indice, _geracao = indice, geracao
+
+
+def _remontar_em_segundo_plano(geracao):
+    global _remontando
+    try:
+        _montar(geracao)
+    except Exception:
+        logger.exception("Falha ao remontar o índice do autocompletar.")
+    finally:
+        _remontando = False
+        connection.close() # A thread tem a sua própria conexão com o banco
+
+
+def aquecer():
+    """
+    Monta o índice na inicialização do processo web (ver 'core/wsgi.py').
+    Uma falha (ex: banco fora do ar) não impede o processo de subir: o
+    índice será montado na primeira busca.
+    """
+    try:
+        _montar(geracoes.atual('listagem'))
+    except Exception:
+        logger.exception("Não foi possível montar o índice do autocompletar na inicialização.")
+
+
+def obter_indice():
+    """
+    Retorna o índice do processo. Se a listagem mudou, dispara a remontagem
+    em segundo plano e devolve o índice atual enquanto isso. Na maioria das
+    chamadas não faz nenhuma E/S: só compara o relógio.
+    """
+    global _indice, _geracao, _proxima_verificacao, _remontando
+
+    agora = time.monotonic()
+    if _indice is not None and agora < _proxima_verificacao:
+        return _indice
+
+    with _trava:
+        if _indice is not None and agora < _proxima_verificacao:
+            return _indice # Outra thread acabou de conferir
+        _proxima_verificacao = agora + INTERVALO_VERIFICACAO
+        geracao = geracoes.atual('listagem')
+        if _indice is None:
+            # Reserva: o processo não foi aquecido (ex: 'runserver'). As
+            # outras requisições esperam na trava em vez de montar de novo
+            _indice, _geracao = montar_indice(), geracao
+        elif geracao != _geracao and not _remontando:
+            _remontando = True
+            threading.Thread(target=_remontar_em_segundo_plano, args=(geracao,), daemon=True).start()
+        return _indice
+
+
+def sugerir(prefixo, limite=LIMITE_SUGESTOES):
+    """Retorna as sugestões para o texto digitado."""
+    return obter_indice().buscar(prefixo, limite)
@@ -0,0 +1,377 @@
+"""
+Motor de Busca Textual (Full-Text Search) para o aplicativo 'users'.
+
+Este arquivo substitui a antiga cadeia de '__icontains' (que obrigava o banco
+a ler a tabela inteira a cada busca) por um ÍNDICE DE BUSCA mantido pela
+aplicação. O índice fica em uma tabela própria, 'users_professor_busca',
+com uma linha por professor (a chave é o 'id' do CustomUser):
+
+1. PostgreSQL (Produção): uma coluna 'tsvector' com índice GIN, gerada com
+   o dicionário 'portuguese' (stemming: "aulas" encontra "aula").
+2. SQLite (Desenvolvimento): uma tabela virtual FTS5, que ignora acentos.
+   O SQLite não tem stemmer em português, então usamos busca por prefixo
+   ("matem" encontra "matemática") como aproximação.
+
+A tabela é criada pela migração '0002_indice_busca_professores' e mantida
+em sincronia pelos signals definidos no 'models.py'. Todo o texto é
+NORMALIZADO (minúsculas, sem acentos) antes de ser indexado, e o termo
+buscado também: "matematica" encontra "Matemática" nos dois bancos.
+
+Quando a busca exata encontra poucos professores (ex: erro de digitação,
+"matemtica"), entra a BUSCA APROXIMADA por trigramas (seção 4), sobre a
+coluna normalizada 'ProfessorListing.texto_busca':
+
+1. PostgreSQL: extensão 'pg_trgm' com índice GIN na coluna.
+2. SQLite: tabela virtual FTS5 com o tokenizador 'trigram'
+   ('users_professor_trigramas'), que devolve os candidatos pelo índice;
+   a similaridade é calculada só para esses candidatos.
+"""
+
+import re
+import unicodedata
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+
+# Nome da tabela do índice (a mesma em ambos os bancos)
+TABELA_BUSCA = 'users_professor_busca'
+
+# Peso de cada campo no ranking. Disciplinas valem mais que o nome,
+# que vale mais que a cidade.
+# PostgreSQL usa as letras 'A' a 'D'; o SQLite usa pesos numéricos no 'bm25'.
+PESOS_POSTGRES = {'disciplinas': 'A', 'nome': 'B', 'cidade': 'C'}
+PESOS_SQLITE = (4.0, 2.0, 1.0) # Mesma ordem das colunas: disciplinas, nome, cidade
+
+# Busca aproximada (trigramas)
+TABELA_TRIGRAMAS = 'users_professor_trigramas' # Só no SQLite
+MINIMO_RESULTADOS_EXATOS = 3   # Abaixo disso, a busca aproximada é usada
+SIMILARIDADE_MINIMA = 0.3      # De 0 (nada em comum) a 1 (palavra idêntica)
+LIMITE_CANDIDATOS = 100        # Máximo de professores vindos da busca aproximada
+
+
+# ==============================================================================
+# 1. MONTAGEM DO DOCUMENTO
+# ==============================================================================
+
+def normalizar(texto):
+    """
+    Minúsculas, sem acentos e com espaços simples.
+    Ex: "  Educação  Física" -> "educacao fisica"
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def documento_professor(user):
+    """
+    Monta o "documento" de busca de um professor: um dicionário com o
+    texto de cada campo indexado.
+
+    Parâmetros:
+        user (CustomUser): O usuário professor.
+    """
+    try:
+        disciplinas = user.professorprofile.disciplinas
+    except ObjectDoesNotExist:
+        disciplinas = ''
+
+    nome = ' '.join(filter(None, [
+        user.username,
+        user.nome_completo,
+        user.como_deseja_ser_chamado,
+    ]))
+
+    return {
+        'disciplinas': normalizar(disciplinas),
+        'nome': normalizar(nome),
+        'cidade': normalizar(user.cidade),
+    }
+
+
+def texto_busca(user, nomes_disciplinas):
+    """
+    Monta o texto normalizado de um professor para a busca aproximada
+    (coluna 'ProfessorListing.texto_busca').
+
+    Ex: "ana ana souza sao paulo matematica fisica"
+    """
+    return normalizar(' '.join([
+        user.username,
+        user.nome_completo or '',
+        user.como_deseja_ser_chamado or '',
+        user.cidade or '',
+        *nomes_disciplinas,
+    ]))
+
+
+# ==============================================================================
+# 2. ATUALIZAÇÃO DO ÍNDICE
+# ==============================================================================
+
+def indexar_professor(user):
+    """
+    Insere ou atualiza a linha de um professor no índice de busca.
+    Usuários que não são professores são removidos do índice.
+    """
+    if not user.is_professor:
+        remover_professor(user.pk)
+        return
+
+    doc = documento_professor(user)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"""
+                INSERT INTO {TABELA_BUSCA} (user_id, documento)
+                VALUES (
+                    %s,
+                    setweight(to_tsvector('portuguese', %s), '{PESOS_POSTGRES['disciplinas']}') ||
+                    setweight(to_tsvector('portuguese', %s), '{PESOS_POSTGRES['nome']}') ||
+                    setweight(to_tsvector('portuguese', %s), '{PESOS_POSTGRES['cidade']}')
+                )
+                ON CONFLICT (user_id) DO UPDATE SET documento = EXCLUDED.documento
+                """,
+                [user.pk, doc['disciplinas'], doc['nome'], doc['cidade']],
+            )
+        elif connection.vendor == 'sqlite':
+            # Tabelas FTS5 não têm "UPSERT": apagamos e inserimos de novo.
+            cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE rowid = %s", [user.pk])
+            cursor.execute(
+                f"INSERT INTO {TABELA_BUSCA} (rowid, disciplinas, nome, cidade) VALUES (%s, %s, %s, %s)",
+                [user.pk, doc['disciplinas'], doc['nome'], doc['cidade']],
+            )
+
+
+def remover_professor(user_id):
+    """
+    Remove a linha de um professor do índice de busca (se existir).
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE user_id = %s", [user_id])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE rowid = %s", [user_id])
+
+
+# ==============================================================================
+# 3. CONSULTA
+# ==============================================================================
+
+def _consulta_fts5(termo):
+    """
+    Converte o texto digitado pelo usuário em uma consulta FTS5 segura.
+    Cada palavra vira um prefixo entre aspas (ex: 'mat sp' -> '"mat"* "sp"*'),
+    o que também neutraliza operadores especiais do FTS5 (AND, OR, NEAR...).
+    """
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def _buscar_exato(queryset, termo):
+    """
+    Busca pelo índice textual (seções 1 e 2). Ver 'buscar'.
+    """
+    termo = normalizar(termo)
+    meta = queryset.model._meta
+    coluna_pk = f'{connection.ops.quote_name(meta.db_table)}.{connection.ops.quote_name(meta.pk.column)}'
+
+    if connection.vendor == 'postgresql':
+        consulta = "websearch_to_tsquery('portuguese', %s)"
+        filtro = RawSQL(f"SELECT user_id FROM {TABELA_BUSCA} WHERE documento @@ {consulta}", [termo])
+        # 'ts_rank' retorna 'real' (float4): convertido para float8, o valor
+        # volta do cursor de paginação (ver 'paginacao.py') exatamente igual,
+        # e as comparações com ele não pulam nem repetem empates
+        relevancia = RawSQL(
+            f"SELECT ts_rank(documento, {consulta})::float8 FROM {TABELA_BUSCA} WHERE user_id = {coluna_pk}",
+            [termo],
+            output_field=FloatField(),
+        )
+
+    elif connection.vendor == 'sqlite':
+        consulta = _consulta_fts5(termo)
+        if not consulta:
+            # O termo só tinha pontuação: nada a buscar.
+            return queryset.annotate(relevancia=Value(0.0)).none()
+        pesos = ', '.join(str(peso) for peso in PESOS_SQLITE)
+        filtro = RawSQL(f"SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s", [consulta])
+        # 'bm25' retorna valores negativos (menor = melhor), então invertemos o sinal.
+        relevancia = RawSQL(
+            f"SELECT -bm25({TABELA_BUSCA}, {pesos}) FROM {TABELA_BUSCA} "
+            f"WHERE {TABELA_BUSCA} MATCH %s AND rowid = {coluna_pk}",
+            [consulta],
+            output_field=FloatField(),
+        )
+
+    else:
+        # Outros bancos: busca sem índice na coluna normalizada, com relevância fixa.
+        condicao = Q()
+        for palavra in termo.split():
+            condicao &= Q(texto_busca__contains=palavra)
+        return queryset.filter(condicao).annotate(relevancia=Value(1.0))
+
+    return queryset.filter(pk__in=filtro).annotate(relevancia=relevancia)
+
+
+def buscar(queryset, termo):
+    """
+    Filtra um queryset de professores pelo termo de busca e anota cada
+    resultado com a sua 'relevancia' (quanto maior, melhor).
+
+    Se a busca exata encontrar menos de MINIMO_RESULTADOS_EXATOS professores,
+    completa o resultado com a busca aproximada por trigramas, e a
+    'relevancia' passa a ser a similaridade (os exatos valem 1.0).
+
+    O queryset deve ser de 'ProfessorListing' (ou de outro modelo cuja
+    chave primária seja o 'id' do CustomUser e que tenha 'texto_busca').
+
+    Uso:
+        professores = buscar(professores, 'matemática').order_by('-relevancia')
+
+    Parâmetros:
+        queryset (QuerySet): Os professores candidatos.
+        termo (str): O texto digitado na caixa de busca.
+    """
+    resultado = _buscar_exato(queryset, termo)
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return resultado
+
+    # Uma consulta curta (LIMIT) só para saber se a busca exata basta
+    exatos = list(resultado.values_list('pk', flat=True)[:MINIMO_RESULTADOS_EXATOS])
+    if len(exatos) >= MINIMO_RESULTADOS_EXATOS:
+        return resultado
+
+    similaridades = dict(_candidatos_aproximados(termo))
+    if not similaridades:
+        return resultado
+    similaridades.update({pk: 1.0 for pk in exatos})
+
+    # 'Cast' para float8, como a relevância da busca exata (ver '_buscar_exato')
+    relevancia = Cast(Case(
+        *[When(pk=pk, then=Value(similaridade)) for pk, similaridade in similaridades.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    ), FloatField())
+    return queryset.filter(pk__in=list(similaridades)).annotate(relevancia=relevancia)
+
+
+# ==============================================================================
+# 4. BUSCA APROXIMADA (TRIGRAMAS)
+# ==============================================================================
+
+def trigramas(palavra):
+    """
+    Conjunto de trigramas de uma palavra, no mesmo formato do 'pg_trgm'
+    (com dois espaços no início e um no fim).
+    Ex: "mat" -> {'  m', ' ma', 'mat', 'at '}
+    """
+    texto = f'  {palavra} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def similaridade(termo, texto):
+    """
+    Semelhança (0 a 1) entre o termo buscado e o texto de um professor,
+    no espírito do 'word_similarity' do PostgreSQL: para cada palavra do
+    termo, a maior semelhança de trigramas com alguma palavra do texto,
+    na média.
+
+    Ex: similaridade("matemtica", "ana matematica") -> ~0.6
+    """
+    palavras_termo = normalizar(termo).split()
+    palavras_texto = [trigramas(p) for p in set(normalizar(texto).split())]
+    if not palavras_termo or not palavras_texto:
+        return 0.0
+
+    total = 0.0
+    for palavra in palavras_termo:
+        tri = trigramas(palavra)
+        total += max(len(tri & outra) / len(tri | outra) for outra in palavras_texto)
+    return total / len(palavras_termo)
+
+
+def indexar_trigramas(user_id, texto):
+    """
+    Atualiza o texto de um professor no índice de trigramas do SQLite.
+    (No PostgreSQL o índice GIN da coluna 'texto_busca' se atualiza sozinho.)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_TRIGRAMAS} WHERE rowid = %s", [user_id])
+        cursor.execute(f"INSERT INTO {TABELA_TRIGRAMAS} (rowid, texto) VALUES (%s, %s)", [user_id, texto])
+
+
+def remover_trigramas(user_id):
+    """Remove um professor do índice de trigramas do SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_TRIGRAMAS} WHERE rowid = %s", [user_id])
+
+
+def reconstruir_trigramas():
+    """
+    Recria todo o índice de trigramas do SQLite a partir da listagem
+    (usado pelo 'rebuild_professor_listing', cujo 'bulk_create' não dispara signals).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_TRIGRAMAS}")
+        cursor.execute(
+            f"INSERT INTO {TABELA_TRIGRAMAS} (rowid, texto) "
+            f"SELECT user_id, texto_busca FROM users_professorlisting"
+        )
+
+
+def _candidatos_aproximados(termo):
+    """
+    Retorna até LIMITE_CANDIDATOS pares (user_id, similaridade), do mais
+    parecido para o menos parecido, sempre partindo de um índice (nunca
+    calculando a similaridade para a tabela inteira).
+    """
+    termo = normalizar(termo)
+    palavras = re.findall(r'\w+', termo)
+    if not palavras:
+        return []
+
+    if connection.vendor == 'postgresql':
+        # O operador '<%' ("termo parecido com alguma palavra do texto") usa
+        # o índice GIN; o limite de semelhança vale só para esta transação.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(SIMILARIDADE_MINIMA)])
+            cursor.execute(
+                """
+                SELECT user_id, word_similarity(%s, texto_busca) AS similaridade
+                FROM users_professorlisting
+                WHERE %s <%% texto_busca
+                ORDER BY similaridade DESC, user_id
+                LIMIT %s
+                """,
+                [termo, termo, LIMITE_CANDIDATOS],
+            )
+            return [(user_id, float(valor)) for user_id, valor in cursor.fetchall()]
+
+    if connection.vendor == 'sqlite':
+        # Candidatos: quem tem QUALQUER trigrama do termo (via índice FTS5),
+        # os que têm mais trigramas em comum primeiro ('rank').
+        trechos = sorted({p[i:i + 3] for p in palavras for i in range(len(p) - 2)})
+        if not trechos:
+            return [] # Palavras com menos de 3 letras
+        consulta = ' OR '.join(f'"{trecho}"' for trecho in trechos)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, texto FROM {TABELA_TRIGRAMAS} WHERE {TABELA_TRIGRAMAS} MATCH %s ORDER BY rank LIMIT %s",
+                [consulta, LIMITE_CANDIDATOS],
+            )
+            candidatos = [(user_id, similaridade(termo, texto)) for user_id, texto in cursor.fetchall()]
+        candidatos = [par for par in candidatos if par[1] >= SIMILARIDADE_MINIMA]
+        candidatos.sort(key=lambda par: (-par[1], par[0]))
+        return candidatos
+
+    return []
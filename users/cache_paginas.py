@@ -0,0 +1,141 @@
+"""
+Cache de Página Inteira para Visitantes Anônimos.
+
+A maior parte do tráfego das páginas públicas ('/', '/voluntarios/',
+'/sobre/' e '/perfil/<username>/') vem de visitantes SEM login, que recebem
+exatamente o mesmo HTML. Para eles, a resposta pronta é guardada no cache
+e devolvida ANTES da view rodar (nenhuma consulta, nenhum template).
+
+Como funciona:
+1. Cada view cacheável é decorada com '@cache_anonimo(grupo)'. O 'grupo' é
+   o nome de uma geração (ver 'geracoes.py') da qual a página depende.
+   Ex: 'listagem' para a lista de professores, 'perfil:{username}' para
+   um perfil ('{username}' vem dos parâmetros da URL).
+2. A chave inclui o deploy atual ('versao_deploy'), a geração atual do
+   grupo, o caminho e a query string (com os parâmetros em ordem
+   alfabética, para que '?a=1&b=2' e '?b=2&a=1' usem a mesma entrada).
+3. A invalidação é feita pelos signals de 'models.py': quando um
+   'CustomUser', 'ProfessorProfile' ou 'Avaliacao' relevante muda, a
+   geração correspondente avança e SÓ as páginas daquele grupo deixam de
+   ser usadas. O tempo no cache serve apenas para liberar espaço.
+
+Nunca são guardadas (nem servidas do cache):
+- Requisições de usuários logados ou que não sejam GET/HEAD.
+- Páginas com mensagens do Django ('messages') pendentes: elas aparecem
+  uma única vez e não podem ir parar na página de outro visitante.
+- Respostas que não sejam 200 ou que gravem cookies (ex: token CSRF).
+
+Uso:
+    @cache_anonimo('perfil:{username}')
+    def perfil_detalhe(request, username): ...
+"""
+
+import functools
+import hashlib
+import os
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import geracoes
+
+# Arquivo com os nomes (com hash) dos estáticos, gravado pelo 'collectstatic'
+MANIFESTO_ESTATICOS = 'staticfiles.json'
+
+# Tempo máximo no cache. Na prática, a invalidação é feita pelas gerações.
+TEMPO_CACHE = 60 * 60 * 24 * 7
+
+# Grupo das páginas que não dependem de nenhum dado do banco (ex: 'Sobre')
+GRUPO_ESTATICO = 'paginas_estaticas'
+
+
+@functools.cache
+def versao_deploy():
+    """
+    Identifica o deploy atual, para que páginas guardadas por um deploy
+    anterior nunca sejam servidas: elas apontam para CSS/JS com nomes de
+    hash que o 'collectstatic' novo já não tem, e podem ter sido montadas
+    com templates antigos. O cache de produção (uma tabela do banco)
+    sobrevive aos deploys.
+
+    Usa o commit do deploy ('RENDER_GIT_COMMIT', definido pelo Render) ou,
+    sem ele, o hash do manifesto dos estáticos.
+    """
+    commit = os.environ.get('RENDER_GIT_COMMIT')
+    if commit:
+        return commit[:12]
+    try:
+        with open(os.path.join(settings.STATIC_ROOT, MANIFESTO_ESTATICOS), 'rb') as manifesto:
+            return hashlib.md5(manifesto.read()).hexdigest()[:12]
+    except OSError:
+        return 'local' # Desenvolvimento, sem 'collectstatic'
+
+
+def grupo_perfil(username):
+    """Nome da geração da página de perfil de 'username'."""
+    return f'perfil:{username}'
+
+
+def _chave(request, grupo):
+    parametros = urlencode(sorted(request.GET.lists()), doseq=True)
+    endereco = hashlib.md5(f'{request.path}?{parametros}'.encode()).hexdigest()
+    return f'pagina:{versao_deploy()}:{grupo}:{geracoes.atual(grupo)}:{endereco}'
+
+
+def _tem_mensagens(request):
+    # 'len' lê as mensagens sem marcá-las como exibidas
+    return len(messages.get_messages(request)) > 0
+
+
+def _cacheavel(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not _tem_mensagens(request)
+    )
+
+
+def _resposta_guardavel(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # O template usou '{% csrf_token %}': a página tem um token só deste visitante
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        # Uma mensagem foi criada durante a própria view
+        and not _tem_mensagens(request)
+    )
+
+
+def cache_anonimo(grupo):
+    """
+    Decorador que guarda a página inteira para visitantes anônimos.
+
+    Parâmetros:
+        grupo (str): Geração da qual a página depende. Pode usar os
+            parâmetros da URL, ex: 'perfil:{username}'.
+    """
+    def decorador(view):
+        @functools.wraps(view)
+        def _view(request, *args, **kwargs):
+            if not _cacheavel(request):
+                return view(request, *args, **kwargs)
+
+            chave = _chave(request, grupo.format(**kwargs))
+            guardada = cache.get(chave)
+            if guardada is not None:
+                conteudo, tipo = guardada
+                response = HttpResponse(conteudo, content_type=tipo)
+                response['X-Cache-Pagina'] = 'HIT'
+                return response
+
+            response = view(request, *args, **kwargs)
+            if _resposta_guardavel(request, response):
+                cache.set(chave, (response.content, response['Content-Type']), TEMPO_CACHE)
+                response['X-Cache-Pagina'] = 'MISS'
+            return response
+        return _view
+    return decorador
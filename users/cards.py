@@ -0,0 +1,64 @@
+"""
+Cache dos Cards de Professores (Fragmentos de HTML).
+
+Os cards da grade mudam raramente, mas eram renderizados do zero a cada
+visita (foto, nome, disciplinas, badges...). Agora cada card renderizado é
+guardado no cache com uma chave que inclui a VERSÃO da linha da listagem
+('ProfessorListing.atualizado_em'): quando o professor muda, a versão
+muda, a chave muda, e o card antigo simplesmente deixa de ser usado.
+
+Para montar uma página:
+1. Calcula as chaves de todos os cards da página.
+2. Busca todos de uma vez com 'cache.get_many' (uma ida ao cache).
+3. Renderiza SÓ os que faltaram e os grava com 'cache.set_many'.
+
+Com o cache "quente", a grade não renderiza nenhum template de card.
+"""
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache_paginas import versao_deploy
+
+TEMPLATE_CARD = 'users/partials/card_professor.html'
+
+# Tempo máximo no cache. Na prática, a invalidação é feita pela versão.
+TEMPO_CACHE = 60 * 60 * 24 * 7
+
+
+def _chave(professor):
+    versao = professor.atualizado_em.strftime('%Y%m%d%H%M%S%f')
+    # O deploy entra na chave: cards de um template antigo não são reaproveitados
+    return f'card:{versao_deploy()}:{professor.pk}:{versao}'
+
+
+def _cacheavel(professor):
+    # A distância ('?cep=...') depende de quem busca: esses cards não vão ao cache
+    return getattr(professor, 'distancia', None) is None
+
+
+def renderizar(professores):
+    """
+    Retorna a lista com o HTML do card de cada professor, na mesma ordem.
+
+    Parâmetros:
+        professores (list): Linhas de 'ProfessorListing' (ex: 'pagina.itens').
+    """
+    chaves = {professor.pk: _chave(professor) for professor in professores if _cacheavel(professor)}
+    prontos = cache.get_many(list(chaves.values())) if chaves else {}
+
+    cards = []
+    novos = {}
+    for professor in professores:
+        chave = chaves.get(professor.pk)
+        html = prontos.get(chave) if chave else None
+        if html is None:
+            html = render_to_string(TEMPLATE_CARD, {'professor': professor})
+            if chave:
+                novos[chave] = html
+        cards.append(mark_safe(html))
+
+    if novos:
+        cache.set_many(novos, TEMPO_CACHE)
+    return cards
@@ -0,0 +1,20 @@
+"""
+Context Processors do App 'users'.
+
+Variáveis disponíveis em TODOS os templates (registrados em
+settings.TEMPLATES['OPTIONS']['context_processors']).
+"""
+
+
+def mensagens_nao_lidas(request):
+    """
+    Quantidade de mensagens recebidas e ainda não lidas, para o menu.
+
+    Lê o contador desnormalizado 'CustomUser.mensagens_nao_lidas': a linha
+    do usuário já foi carregada pelo 'AuthenticationMiddleware', então não
+    há nenhuma consulta (nem COUNT) a mais por página.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'mensagens_nao_lidas': user.mensagens_nao_lidas}
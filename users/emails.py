@@ -0,0 +1,118 @@
+"""
+Entrega dos E-mails da Fila ('EmailOutbox').
+
+Cada rodada do worker:
+1. RESERVA um lote de e-mails pendentes cuja vez já chegou, com
+   'SELECT ... FOR UPDATE SKIP LOCKED': vários workers podem rodar ao mesmo
+   tempo sem pegar o mesmo e-mail (cada um pula as linhas travadas pelos
+   outros). A reserva empurra 'proxima_tentativa' para frente e é gravada
+   numa transação CURTA, que termina antes de falar com o servidor de e-mail.
+2. ENVIA o lote inteiro por UMA única conexão SMTP (abrir uma conexão com
+   TLS e login a cada e-mail é a parte mais lenta do envio).
+3. Marca cada e-mail como enviado, ou agenda uma nova tentativa com espera
+   crescente (1, 2, 4, 8... minutos). Depois de MAXIMO_TENTATIVAS, desiste.
+
+No SQLite (desenvolvimento) o 'FOR UPDATE' é ignorado; ali as escritas já
+acontecem uma de cada vez.
+
+Uso:
+    enviados, falhas = emails.processar_lote()
+"""
+
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+# Quantidade de e-mails reservados (e enviados pela mesma conexão) por rodada
+TAMANHO_LOTE = 50
+
+# Por quanto tempo um e-mail reservado fica fora da fila. Se o worker
+# morrer no meio do envio, o e-mail volta para a fila depois disso.
+TEMPO_RESERVA = timedelta(minutes=10)
+
+# Tentativas antes de desistir e a espera máxima entre duas tentativas
+MAXIMO_TENTATIVAS = 8
+ESPERA_MAXIMA = timedelta(hours=6)
+
+
+def espera_apos(tentativas):
+    """
+    Espera antes da próxima tentativa ("backoff" exponencial).
+    Ex: 1 tentativa -> 1 min | 2 -> 2 min | 3 -> 4 min ... (até ESPERA_MAXIMA)
+    """
+    return min(timedelta(minutes=2 ** (tentativas - 1)), ESPERA_MAXIMA)
+
+
+def reservar_lote(tamanho=TAMANHO_LOTE):
+    """
+    Reserva até 'tamanho' e-mails pendentes e retorna a lista deles.
+    A transação dura só o tempo do SELECT + UPDATE.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.Status.PENDENTE, proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa')
+            .values_list('pk', flat=True)[:tamanho]
+        )
+        if not ids:
+            return []
+        EmailOutbox.objects.filter(pk__in=ids).update(
+            proxima_tentativa=agora + TEMPO_RESERVA,
+            tentativas=F('tentativas') + 1,
+        )
+    return list(EmailOutbox.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _registrar_falha(email, erro, agora):
+    email.ultimo_erro = str(erro) or erro.__class__.__name__
+    if email.tentativas >= MAXIMO_TENTATIVAS:
+        email.status = EmailOutbox.Status.FALHOU
+    else:
+        email.proxima_tentativa = agora + espera_apos(email.tentativas)
+
+
+def processar_lote(tamanho=TAMANHO_LOTE):
+    """
+    Reserva e envia um lote. Retorna (enviados, falhas).
+    """
+    lote = reservar_lote(tamanho)
+    if not lote:
+        return 0, 0
+
+    conexao = get_connection(fail_silently=False)
+    try:
+        conexao.open()
+    except Exception as erro:
+        # Sem conexão, nenhum e-mail do lote pôde ser tentado
+        agora = timezone.now()
+        for email in lote:
+            _registrar_falha(email, erro, agora)
+        EmailOutbox.objects.bulk_update(lote, ['status', 'proxima_tentativa', 'ultimo_erro'])
+        return 0, len(lote)
+
+    enviados = 0
+    try:
+        for email in lote:
+            try:
+                # Um e-mail por vez (pela mesma conexão), para saber qual falhou
+                conexao.send_messages([email.como_email(conexao)])
+            except Exception as erro:
+                _registrar_falha(email, erro, timezone.now())
+            else:
+                email.status = EmailOutbox.Status.ENVIADO
+                email.data_envio = timezone.now()
+                email.ultimo_erro = ''
+                enviados += 1
+    finally:
+        conexao.close()
+
+    EmailOutbox.objects.bulk_update(lote, ['status', 'proxima_tentativa', 'ultimo_erro', 'data_envio'])
+    return enviados, len(lote) - enviados
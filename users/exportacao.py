@@ -0,0 +1,138 @@
+"""
+Exportação do Histórico de Mensagens (CSV ou JSONL).
+
+O histórico de um professor pode ter centenas de milhares de mensagens, então
+o arquivo NUNCA é montado inteiro na memória:
+1. As mensagens são lidas com '.iterator(chunk_size=...)', que no PostgreSQL
+   usa um cursor no servidor: o banco entrega TAMANHO_LOTE linhas por vez.
+2. Cada bloco de linhas vira texto e é enviado ao navegador por uma
+   'StreamingHttpResponse' (ver a view 'exportar_mensagens'). O cabeçalho
+   sai antes da primeira consulta, então o download começa na hora.
+
+Recebidas e enviadas são consultas separadas (cada uma usa o seu índice,
+'contato_recebidas_idx' e 'contato_enviadas_idx'), assim como as mensagens
+já arquivadas ('MensagemArquivada', ver 'arquivo.py'). Todas são
+intercaladas por data com 'heapq.merge', sem carregar nenhuma das listas.
+
+Uso:
+    linhas = exportacao.linhas_csv(user)     # ou linhas_jsonl(user)
+    StreamingHttpResponse(linhas, content_type=exportacao.FORMATOS['csv'])
+"""
+
+import csv
+import heapq
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ContactProfessor, MensagemArquivada
+
+# Linhas buscadas no banco (e enviadas ao navegador) por vez
+TAMANHO_LOTE = 1000
+
+# Formatos aceitos -> "Content-Type" da resposta
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Colunas do arquivo, na ordem
+COLUNAS = ['data_envio', 'direcao', 'aluno', 'professor', 'assunto', 'mensagem', 'lida', 'email_resposta']
+
+# Campos lidos do banco ('values' evita montar um objeto por mensagem)
+_CAMPOS = ['pk', 'data_envio', 'aluno__username', 'professor__username', 'assunto', 'mensagem', 'lida', 'email_resposta']
+
+
+def _mensagens(queryset, direcao):
+    """Percorre as mensagens (mais novas primeiro) em lotes, como dicionários."""
+    for linha in queryset.order_by('-data_envio', '-pk').values(*_CAMPOS).iterator(chunk_size=TAMANHO_LOTE):
+        linha['direcao'] = direcao
+        yield linha
+
+
+def mensagens_do_usuario(user):
+    """
+    Todas as mensagens recebidas e enviadas por 'user' (recentes e
+    arquivadas), da mais nova para a mais antiga, sem carregar a lista inteira.
+    """
+    fontes = [
+        _mensagens(modelo.objects.filter(**{campo: user}), direcao)
+        for modelo in (ContactProfessor, MensagemArquivada)
+        for campo, direcao in (('professor', 'recebida'), ('aluno', 'enviada'))
+    ]
+    return heapq.merge(
+        *fontes, key=lambda linha: (linha['data_envio'], linha['pk']), reverse=True
+    )
+
+
+def _valores(linha):
+    """Uma mensagem -> valores das COLUNAS."""
+    return [
+        linha['data_envio'].isoformat(),
+        linha['direcao'],
+        linha['aluno__username'] or '',  # Aluno excluído
+        linha['professor__username'],
+        linha['assunto'],
+        linha['mensagem'],
+        linha['lida'],
+        linha['email_resposta'],
+    ]
+
+
+def _em_blocos(user, formatar):
+    """Junta TAMANHO_LOTE linhas já formatadas em um único pedaço de texto."""
+    bloco = []
+    for linha in mensagens_do_usuario(user):
+        bloco.append(formatar(linha))
+        if len(bloco) >= TAMANHO_LOTE:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+class _Eco:
+    """
+    "Arquivo" falso para o 'csv.writer': em vez de guardar o texto, devolve
+    a linha escrita (padrão da documentação do Django para CSV em streaming).
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def _protegido(valor):
+    """
+    Evita "injeção de fórmula" ao abrir o CSV no Excel/Planilhas: um texto
+    escrito por outro usuário que começa com '=', '+', '-' ou '@' seria
+    executado como fórmula. O apóstrofo faz a planilha tratá-lo como texto.
+    """
+    if isinstance(valor, str) and valor[:1] in ('=', '+', '-', '@'):
+        return "'" + valor
+    return valor
+
+
+def linhas_csv(user):
+    """Gera o CSV (com BOM, para o Excel reconhecer o UTF-8) em pedaços."""
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(COLUNAS)
+    yield from _em_blocos(
+        user,
+        lambda linha: escritor.writerow([_protegido(valor) for valor in _valores(linha)]),
+    )
+
+
+def linhas_jsonl(user):
+    """Gera o JSONL (um objeto JSON por linha) em pedaços."""
+    yield from _em_blocos(
+        user,
+        lambda linha: json.dumps(
+            dict(zip(COLUNAS, _valores(linha))), cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n',
+    )
+
+
+GERADORES = {
+    'csv': linhas_csv,
+    'jsonl': linhas_jsonl,
+}
@@ -0,0 +1,191 @@
+"""
+Navegação por Facetas (Filtros com Contagem) da listagem de professores.
+
+Uma "faceta" é um filtro que mostra, ao lado de cada opção, quantos
+professores serão encontrados ao escolhê-la (ex: "Online (12)").
+
+Para não multiplicar consultas a cada filtro novo:
+1. Todas as facetas de valores fixos (modalidade, voluntário, online, grupo)
+   são contadas em UMA única consulta agregada (COUNT ... FILTER). Cada
+   faceta ignora o próprio filtro (contagem "disjuntiva", ver '_calcular').
+2. A faceta de cidade (valores livres) é contada em uma consulta GROUP BY.
+3. O resultado é guardado no cache, com a chave montada a partir da
+   combinação NORMALIZADA de filtros. A chave inclui a geração 'listagem'
+   (ver 'geracoes.py'), que avança sempre que um professor da listagem muda.
+"""
+
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from . import geracoes
+from .models import ProfessorProfile
+
+# Quantas cidades aparecem na faceta de cidade (as com mais professores)
+LIMITE_CIDADES = 10
+
+# Tempo máximo no cache. Na prática, a invalidação é feita pela geração.
+TEMPO_CACHE = 60 * 60 * 24
+
+# Facetas booleanas: nome na URL -> coluna de 'ProfessorListing'
+FACETAS_BOOLEANAS = {
+    'voluntario': 'is_voluntario',
+    'online': 'aceita_online',
+    'grupo': 'aceita_grupo',
+}
+
+
+# ==============================================================================
+# 1. LEITURA E APLICAÇÃO DOS FILTROS
+# ==============================================================================
+
+def filtros_da_url(parametros):
+    """
+    Lê os filtros de facetas da URL e os normaliza, descartando valores
+    inválidos (ex: /?modalidade=XX).
+
+    Ex: ?modalidade=P&online=1&cidade=Recife -> {'modalidade': 'P', 'online': True, 'cidade': 'Recife'}
+        ?min_preco=50 -> {'min_preco': '50.00'}
+    """
+    filtros = {}
+
+    modalidade = parametros.get('modalidade')
+    if modalidade in dict(ProfessorProfile.MODALIDADE_CHOICES):
+        filtros['modalidade'] = modalidade
+
+    cidade = (parametros.get('cidade') or '').strip()
+    if cidade:
+        filtros['cidade'] = cidade
+
+    for nome in FACETAS_BOOLEANAS:
+        if parametros.get(nome) == '1':
+            filtros[nome] = True
+
+    # Faixa de preço (ex: ?min_preco=30&max_preco=80,50). Guardada como
+    # texto normalizado ("30.00") para a chave do cache ser sempre a mesma.
+    for nome in ('min_preco', 'max_preco'):
+        valor = _preco(parametros.get(nome))
+        if valor is not None:
+            filtros[nome] = valor
+
+    return filtros
+
+
+def _preco(texto):
+    """Converte um preço digitado ("80,50", "80") em texto normalizado, ou None."""
+    try:
+        valor = Decimal((texto or '').strip().replace(',', '.'))
+    except InvalidOperation:
+        return None
+    if not valor.is_finite() or valor < 0 or valor >= 10000:
+        return None
+    return str(valor.quantize(Decimal('0.01')))
+
+
+def condicoes(filtros):
+    """
+    Converte os filtros de facetas em condições (Q), uma por filtro ativo.
+
+    Ex: {'modalidade': 'P', 'online': True} -> {'modalidade': Q(modalidades='P'), 'online': Q(aceita_online=True)}
+    """
+    resultado = {}
+    if 'modalidade' in filtros:
+        resultado['modalidade'] = Q(modalidades=filtros['modalidade'])
+    if 'cidade' in filtros:
+        resultado['cidade'] = Q(cidade=filtros['cidade'])
+    for nome, coluna in FACETAS_BOOLEANAS.items():
+        if filtros.get(nome):
+            resultado[nome] = Q(**{coluna: True})
+    # Professores com tarifa "a negociar" (vazia) ficam fora da faixa de preço
+    if 'min_preco' in filtros:
+        resultado['min_preco'] = Q(tarifa_hora__gte=Decimal(filtros['min_preco']))
+    if 'max_preco' in filtros:
+        resultado['max_preco'] = Q(tarifa_hora__lte=Decimal(filtros['max_preco']))
+    return resultado
+
+
+def _juntar(condicoes_ativas, exceto=None):
+    """Une (E) todas as condições, menos a da faceta 'exceto'."""
+    resultado = Q()
+    for nome, condicao in condicoes_ativas.items():
+        if nome != exceto:
+            resultado &= condicao
+    return resultado
+
+
+def aplicar_filtros(professores, filtros):
+    """
+    Aplica os filtros de facetas a um queryset de 'ProfessorListing'.
+    """
+    return professores.filter(_juntar(condicoes(filtros)))
+
+
+# ==============================================================================
+# 2. CONTAGEM (COM CACHE)
+# ==============================================================================
+
+def _calcular(professores, filtros):
+    """
+    Executa as consultas de contagem sobre o queryset SEM os filtros de facetas.
+
+    Contagem "disjuntiva": cada faceta é contada com todos os filtros
+    ativos, MENOS o dela mesma. Assim, com "Presencial" escolhido, as outras
+    modalidades continuam mostrando quantos professores o aluno encontraria
+    ao trocar de modalidade (e não zero). O 'total' usa todos os filtros.
+    """
+    ativas = condicoes(filtros)
+
+    # Consulta 1: todas as facetas de valores fixos de uma só vez
+    agregados = {'total': Count('pk', filter=_juntar(ativas))}
+    sem_modalidade = _juntar(ativas, exceto='modalidade')
+    for codigo, _rotulo in ProfessorProfile.MODALIDADE_CHOICES:
+        agregados[f'modalidade_{codigo}'] = Count('pk', filter=Q(modalidades=codigo) & sem_modalidade)
+    for nome, coluna in FACETAS_BOOLEANAS.items():
+        agregados[nome] = Count('pk', filter=Q(**{coluna: True}) & _juntar(ativas, exceto=nome))
+    contagens = professores.aggregate(**agregados)
+
+    # Consulta 2: as cidades com mais professores
+    cidades = (
+        professores.filter(_juntar(ativas, exceto='cidade'))
+        .exclude(cidade='')
+        .values('cidade')
+        .annotate(total=Count('pk'))
+        .order_by('-total', 'cidade')[:LIMITE_CIDADES]
+    )
+
+    return {
+        'total': contagens['total'],
+        'modalidade': [
+            {'valor': codigo, 'rotulo': rotulo, 'total': contagens[f'modalidade_{codigo}']}
+            for codigo, rotulo in ProfessorProfile.MODALIDADE_CHOICES
+        ],
+        'booleanas': {nome: contagens[nome] for nome in FACETAS_BOOLEANAS},
+        'cidade': [{'valor': c['cidade'], 'total': c['total']} for c in cidades],
+    }
+
+
+def contar(professores, filtros, chave_consulta):
+    """
+    Retorna as contagens de facetas do queryset, usando o cache.
+
+    Parâmetros:
+        professores (QuerySet): Os professores filtrados pela busca, disciplina
+            etc., mas AINDA SEM os filtros de facetas (ver '_calcular').
+        filtros (dict): Os filtros de facetas ativos ('filtros_da_url').
+        chave_consulta (dict): Tudo o que define esse queryset (filtros, termo
+            de busca, página de voluntários...). Serve para montar a chave do cache.
+    """
+    # Normaliza a combinação de filtros: a mesma combinação, em qualquer
+    # ordem na URL, gera sempre a mesma chave.
+    normalizada = json.dumps(chave_consulta, sort_keys=True, ensure_ascii=False)
+    resumo = hashlib.md5(normalizada.encode()).hexdigest()
+    chave = f"facetas:{geracoes.atual('listagem')}:{resumo}"
+
+    facetas = cache.get(chave)
+    if facetas is None:
+        facetas = _calcular(professores, filtros)
+        cache.set(chave, facetas, TEMPO_CACHE)
+    return facetas
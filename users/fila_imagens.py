@@ -0,0 +1,161 @@
+"""
+Processamento da Fila de Imagens ('TarefaImagem').
+
+Cada rodada do worker ('process_image_jobs'):
+1. RESERVA um lote de tarefas pendentes com 'SELECT ... FOR UPDATE SKIP
+   LOCKED', empurrando 'proxima_tentativa' para frente (como na fila de
+   e-mails, ver 'emails.py'): vários workers podem rodar ao mesmo tempo e
+   uma tarefa de um worker que morreu volta sozinha para a fila.
+2. PROCESSA as fotos em paralelo num 'ProcessPoolExecutor' (um processo por
+   núcleo): decodificar e redimensionar é trabalho de CPU, que threads do
+   Python não paralelizam. Os processos só recebem o nome do arquivo e
+   devolvem o nome do original limpo e o resumo das variantes; não
+   acessam o banco.
+3. GRAVA o resultado no registro, se a foto ainda for a mesma (se o usuário
+   enviou outra nesse meio tempo, o resultado é descartado: a tarefa da
+   foto nova cuida dela). Falhas são tentadas de novo com espera crescente.
+
+Uso:
+    with fila_imagens.criar_executor(4) as executor:
+        processadas, falhas = fila_imagens.processar_lote(executor, 8)
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import imagens
+from .models import TarefaImagem
+
+# Por quanto tempo uma tarefa reservada fica fora da fila
+TEMPO_RESERVA = timedelta(minutes=5)
+
+# Uma foto que falha 3 vezes dificilmente vai funcionar (arquivo corrompido)
+MAXIMO_TENTATIVAS = 3
+
+# Campo da foto -> campo do resumo das variantes
+CAMPOS_VARIANTES = {
+    'foto_perfil': 'foto_perfil_variantes',
+    'foto_profissional': 'foto_profissional_variantes',
+}
+
+
+def criar_executor(processos):
+    """
+    Cria o pool de processos. Usa 'spawn' (processos novos, em vez de cópias
+    do worker com 'fork'), para que as conexões abertas com o banco não
+    sejam herdadas e compartilhadas pelos filhos.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=imagens.iniciar_processo,
+    )
+
+
+def reservar_lote(tamanho):
+    """
+    Reserva até 'tamanho' tarefas pendentes e retorna a lista delas.
+    A transação dura só o tempo do SELECT + UPDATE.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            TarefaImagem.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=TarefaImagem.Status.PENDENTE, proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa')
+            .values_list('pk', flat=True)[:tamanho]
+        )
+        if not ids:
+            return []
+        TarefaImagem.objects.filter(pk__in=ids).update(
+            proxima_tentativa=agora + TEMPO_RESERVA,
+            tentativas=F('tentativas') + 1,
+        )
+    return list(TarefaImagem.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _finalizar(tarefa, status, variantes, erro='', arquivo=None):
+    """
+    Encerra a tarefa e grava no registro o resumo das variantes e o nome do
+    original limpo ('arquivo'), com o 'save()' e 'update_fields' (os signals
+    atualizam a listagem e invalidam as páginas em cache).
+
+    Se outra foto foi enviada durante o processamento, 'TarefaImagem.enfileirar'
+    trocou o 'arquivo' da tarefa: ela continua pendente (e volta para a fila)
+    para processar a foto nova, e o resultado antigo é descartado.
+    """
+    modelo = apps.get_model(tarefa.modelo)
+    with transaction.atomic():
+        # Trava o registro ANTES da tarefa: a mesma ordem do 'save()' que
+        # cria a tarefa (registro -> tarefa), para evitar "deadlocks"
+        registro = modelo.objects.select_for_update().filter(pk=tarefa.objeto_id).first()
+        encerrada = TarefaImagem.objects.filter(
+            pk=tarefa.pk, status=TarefaImagem.Status.PENDENTE, arquivo=tarefa.arquivo
+        ).update(status=status, data_conclusao=timezone.now(), ultimo_erro=erro)
+        if encerrada and registro is not None and getattr(registro, tarefa.campo).name == tarefa.arquivo:
+            campo_variantes = CAMPOS_VARIANTES[tarefa.campo]
+            setattr(registro, campo_variantes, variantes)
+            campos = [campo_variantes]
+            if arquivo and arquivo != tarefa.arquivo:
+                setattr(registro, tarefa.campo, arquivo)
+                campos.append(tarefa.campo)
+            registro.save(update_fields=campos)
+
+
+def _registrar_falha(tarefa, erro):
+    mensagem = str(erro) or erro.__class__.__name__
+    if tarefa.tentativas < MAXIMO_TENTATIVAS:
+        TarefaImagem.objects.filter(pk=tarefa.pk).update(
+            proxima_tentativa=timezone.now() + timedelta(minutes=2 ** (tarefa.tentativas - 1)),
+            ultimo_erro=mensagem,
+        )
+    else:
+        # Desistiu: o original (ainda com o EXIF) não pode ser exibido, os
+        # templates mostram o "placeholder" (ver 'imagens.FALHOU')
+        _finalizar(tarefa, TarefaImagem.Status.FALHOU, dict(imagens.FALHOU), mensagem)
+
+
+def processar_lote(executor, tamanho):
+    """
+    Reserva e processa um lote. Retorna (processadas, falhas).
+
+    'executor' é o pool de 'criar_executor'; com None, as fotos são
+    processadas no próprio processo (útil para depurar).
+    """
+    lote = reservar_lote(tamanho)
+    if not lote:
+        return 0, 0
+
+    if executor is None:
+        resultados = []
+        for tarefa in lote:
+            try:
+                resultados.append(imagens.processar_arquivo(tarefa.arquivo))
+            except Exception as erro:
+                resultados.append(erro)
+    else:
+        futuros = [executor.submit(imagens.processar_arquivo, tarefa.arquivo) for tarefa in lote]
+        resultados = [futuro.exception() or futuro.result() for futuro in futuros]
+
+    processadas = 0
+    for tarefa, resultado in zip(lote, resultados):
+        if isinstance(resultado, Exception):
+            _registrar_falha(tarefa, resultado)
+        else:
+            _finalizar(tarefa, TarefaImagem.Status.CONCLUIDA, resultado['variantes'], arquivo=resultado['arquivo'])
+            processadas += 1
+
+    # Um processo do pool morreu (ex: sem memória): o pool não aceita mais
+    # tarefas e precisa ser recriado pelo comando.
+    quebrado = next((resultado for resultado in resultados if isinstance(resultado, BrokenProcessPool)), None)
+    if quebrado is not None:
+        raise quebrado
+    return processadas, len(lote) - processadas
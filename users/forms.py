@@ -9,7 +9,7 @@ salvos no banco de dados.
 
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from .models import CustomUser, ProfessorProfile, ContactProfessor
+from .models import CustomUser, ProfessorProfile, ContactProfessor, Avaliacao
 from django.utils.translation import gettext_lazy as _
 
 # ==============================================================================
@@ -159,9 +159,14 @@ class ProfessorProfileForm(forms.ModelForm):
         model = ProfessorProfile
         # Exclui campos que são gerenciados automaticamente pelo sistema
         # 'user' é vinculado pela view/signal.
-        # 'media_avaliacoes' é calculada (futuramente).
+        # 'media_avaliacoes', 'total_avaliacoes' e 'soma_notas' são calculadas
+        # a partir das avaliações dos alunos (ver 'ProfessorProfile.registrar_avaliacao').
         # 'data_validacao' é definida pelo admin (futuramente).
-        exclude = ('user', 'media_avaliacoes', 'data_validacao')
+        # 'lista_disciplinas' é gerada a partir do texto de 'disciplinas' (signal).
+        exclude = (
+            'user', 'media_avaliacoes', 'total_avaliacoes', 'soma_notas',
+            'data_validacao', 'lista_disciplinas',
+        )
         
         # Widgets para melhorar a aparência de campos de texto
         widgets = {
@@ -222,4 +227,25 @@ class ContactProfessorForm(forms.ModelForm):
         # 3. Lógica para pré-preencher o e-mail
         #    (Se a view passou 'initial={'confirmar_email': ...}')
         if 'initial' in kwargs and 'confirmar_email' in kwargs['initial']:
-                self.fields['confirmar_email'].initial = kwargs['initial']['confirmar_email']
\ No newline at end of file
+                self.fields['confirmar_email'].initial = kwargs['initial']['confirmar_email']
+
+
+# ==============================================================================
+# 5. Formulário de Avaliação do Professor
+# ==============================================================================
+
+class AvaliacaoForm(forms.ModelForm):
+    """
+    Formulário usado por alunos para avaliar um professor (nota de 1 a 5
+    e comentário opcional). A view preenche 'aluno' e 'professor'.
+    """
+    NOTAS = [(nota, f"{nota} estrela{'s' if nota > 1 else ''}") for nota in range(5, 0, -1)]
+
+    nota = forms.TypedChoiceField(label=_('Nota'), choices=NOTAS, coerce=int, widget=forms.RadioSelect)
+
+    class Meta:
+        model = Avaliacao
+        fields = ('nota', 'comentario')
+        widgets = {
+            'comentario': forms.Textarea(attrs={'rows': 3}),
+        }
@@ -0,0 +1,95 @@
+"""
+Busca Geográfica ("Perto de Mim") para a listagem de professores.
+
+Calcular a distância até TODOS os professores a cada busca seria caro (uma
+conta trigonométrica por linha da tabela). Em vez disso, a busca é feita
+em duas etapas:
+
+1. Caixa delimitadora: converte o raio (ex: 10 km) em uma faixa de
+   latitude e longitude ao redor do CEP do aluno. Esse filtro é uma simples
+   comparação de intervalos, resolvida pelo índice (latitude, longitude)
+   de 'ProfessorListing', e já descarta quase todos os professores.
+2. Distância real: só para os professores DENTRO da caixa, calcula a
+   distância (fórmula de Haversine), descarta os cantos da caixa que ficam
+   fora do círculo e ordena do mais perto para o mais longe.
+
+Uso:
+    coordenadas = CepCoordenada.localizar('50030-230')
+    professores = geo.filtrar_proximos(professores, *coordenadas, raio_km=10)
+    # Cada professor ganha o atributo 'distancia' (em km)
+"""
+
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+# Raio médio da Terra, em km
+RAIO_TERRA_KM = 6371.0
+
+# Distância (em km) correspondente a 1 grau de latitude
+KM_POR_GRAU = math.pi * RAIO_TERRA_KM / 180
+
+# Opções de raio oferecidas na página (em km) e o raio padrão
+RAIOS_KM = (5, 10, 25, 50, 100)
+RAIO_PADRAO_KM = 10
+
+
+def raio_da_url(valor):
+    """
+    Lê o raio da URL, aceitando apenas as opções de 'RAIOS_KM'.
+    Ex: '25' -> 25 | 'abc' -> RAIO_PADRAO_KM
+    """
+    try:
+        raio = int(valor)
+    except (TypeError, ValueError):
+        return RAIO_PADRAO_KM
+    return raio if raio in RAIOS_KM else RAIO_PADRAO_KM
+
+
+def caixa_delimitadora(latitude, longitude, raio_km):
+    """
+    Retorna (lat_min, lat_max, lon_min, lon_max) do retângulo que contém o
+    círculo de 'raio_km' ao redor do ponto.
+
+    Um grau de longitude "encolhe" à medida que se afasta do Equador
+    (multiplica-se pelo cosseno da latitude), por isso a faixa de longitude
+    é mais larga que a de latitude.
+    """
+    delta_lat = raio_km / KM_POR_GRAU
+    # Evita divisão por zero perto dos polos (irrelevante no Brasil)
+    cosseno = max(math.cos(math.radians(latitude)), 0.01)
+    delta_lon = raio_km / (KM_POR_GRAU * cosseno)
+    return (latitude - delta_lat, latitude + delta_lat, longitude - delta_lon, longitude + delta_lon)
+
+
+def expressao_distancia(latitude, longitude):
+    """
+    Expressão do ORM com a distância (em km, fórmula de Haversine) entre o
+    ponto informado e as colunas 'latitude'/'longitude' de cada linha.
+    """
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    metade_dlat = (Radians(F('latitude')) - Value(lat)) / 2
+    metade_dlon = (Radians(F('longitude')) - Value(lon)) / 2
+    a = Power(Sin(metade_dlat), 2) + Value(math.cos(lat)) * Cos(Radians(F('latitude'))) * Power(Sin(metade_dlon), 2)
+    return Value(2 * RAIO_TERRA_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def filtrar_proximos(professores, latitude, longitude, raio_km):
+    """
+    Filtra um queryset de 'ProfessorListing' aos professores a até
+    'raio_km' do ponto, anotando a 'distancia' (km) de cada um.
+
+    A ordenação por distância fica a cargo de quem chama (ex: a paginação
+    por cursor, com ('distancia', 'pk')).
+    """
+    lat_min, lat_max, lon_min, lon_max = caixa_delimitadora(latitude, longitude, raio_km)
+    return (
+        professores
+        # Etapa 1: caixa delimitadora (índice; nenhuma conta por linha)
+        .filter(latitude__range=(lat_min, lat_max), longitude__range=(lon_min, lon_max))
+        # Etapa 2: distância real, só para quem está dentro da caixa
+        .annotate(distancia=expressao_distancia(latitude, longitude))
+        .filter(distancia__lte=raio_km)
+    )
@@ -0,0 +1,63 @@
+"""
+Contadores de Geração para invalidação de cache.
+
+Em vez de procurar e apagar cada chave de cache afetada por uma mudança
+(o que exigiria saber todas as combinações já guardadas), cada grupo de
+dados tem um número de "geração" guardado no próprio cache. As chaves
+incluem esse número; quando um dado muda, basta AVANÇAR a geração e todas
+as chaves antigas deixam de ser consultadas (e expiram sozinhas depois).
+
+A geração NUNCA volta atrás: se a chave do contador for expulsa do cache
+(ex: o 'cull' do DatabaseCache ao passar de MAX_ENTRIES), ele recomeça do
+relógio ('time.time_ns()'), sempre maior que qualquer geração anterior. Se
+recomeçasse em 1, chaves antigas ainda válidas (páginas, facetas) com o
+mesmo número voltariam a ser servidas.
+
+Uso:
+    chave = f"facetas:{geracoes.atual('listagem')}:{filtros}"
+    ...
+    geracoes.avancar_no_commit('listagem')  # Ex: em um signal, quando um perfil muda
+"""
+
+import functools
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _chave(nome):
+    return f'geracao:{nome}'
+
+
+def atual(nome):
+    """
+    Retorna a geração atual do grupo 'nome'.
+    """
+    return cache.get_or_set(_chave(nome), time.time_ns, timeout=None)
+
+
+def avancar(nome):
+    """
+    Avança a geração do grupo 'nome', invalidando todas as chaves que
+    foram montadas com a geração anterior.
+    """
+    try:
+        return cache.incr(_chave(nome))
+    except ValueError:
+        # A chave ainda não existia (ou foi expulsa do cache): recomeça
+        # pelo relógio, acima de qualquer geração já usada.
+        geracao = time.time_ns()
+        cache.set(_chave(nome), geracao, timeout=None)
+        return geracao
+
+
+def avancar_no_commit(nome):
+    """
+    Avança a geração do grupo 'nome' só depois do COMMIT da transação atual
+    (na hora, se não houver transação). Use quando a mudança acontece numa
+    transação (signals, 'update()'): avançando antes, uma requisição
+    simultânea ainda leria as linhas antigas e as guardaria no cache já com
+    a geração nova, servindo dados velhos até a chave expirar.
+    """
+    transaction.on_commit(functools.partial(avancar, nome))
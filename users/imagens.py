@@ -0,0 +1,262 @@
+"""
+Processamento das Fotos Enviadas ("Variantes" em vários tamanhos e formatos).
+
+As fotos de perfil chegam do celular com vários megabytes e eram exibidas
+como vieram, reduzidas pelo navegador. Cada foto enviada passa por:
+1. LIMPEZA do original: a orientação do EXIF é aplicada aos pixels (a foto
+   "deitada" fica em pé), os metadados são descartados (EXIF pode conter a
+   localização GPS de onde a foto foi tirada) e fotos enormes são reduzidas
+   a LADO_MAXIMO_ORIGINAL.
+2. VARIANTES: recortes quadrados em larguras fixas (as caixas dos cards, da
+   página de perfil e do menu, em 1x/2x/3x para telas de alta densidade),
+   em AVIF e WebP (bem menores) e JPEG (para navegadores antigos).
+
+Isso NÃO acontece durante a requisição: o 'save()' do modelo grava o
+original, marca a foto como PENDENTE e cria uma 'TarefaImagem'; o worker
+('process_image_jobs', ver 'fila_imagens.py') chama 'processar_arquivo'
+em outro processo. Até lá, os templates mostram um "placeholder".
+
+Os arquivos das variantes têm nomes DETERMINADOS pelo nome do original, por
+exemplo 'profile_pics/sha256/3f9c....jpg' ->
+'variantes/profile_pics/sha256/3f9c.../288.webp'. O
+modelo guarda apenas quais larguras e formatos existem (campo JSON
+'..._variantes'), então montar o '<picture>' não exige nenhuma consulta
+(ver a tag 'foto_responsiva' em 'templatetags/foto_tags.py').
+
+Uso (no 'save()' do modelo):
+    variantes = imagens.variantes_no_envio(self.foto_perfil)
+    if variantes is not None:
+        self.foto_perfil_variantes = variantes
+"""
+
+import base64
+import io
+import posixpath
+
+import django
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Caixas (em pixels CSS, sempre quadradas) em que as fotos são exibidas e as
+# densidades de tela atendidas em cada uma. Ex: 'card' -> 288, 576 pixels.
+# As variantes são compartilhadas: o 'card' e o 'detalhe' usam os mesmos arquivos.
+TAMANHOS = {
+    'card': (288, (1, 2)),       # 'h-72 w-72' da listagem
+    'detalhe': (288, (1, 2, 3)),  # 'h-72 w-72' da página de perfil
+    'navbar': (32, (1, 2)),      # Avatar do menu
+}
+
+# Lado maior do original guardado (fotos maiores são reduzidas na limpeza)
+LADO_MAXIMO_ORIGINAL = 2048
+
+# Formatos das variantes, do preferido ao de reserva. O JPEG é sempre o
+# último: é o 'src' do '<img>', para os navegadores que não entendem os outros.
+# Os parâmetros de cada formato equilibram tamanho e tempo de codificação.
+FORMATOS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 55, 'speed': 6}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+PASTA_VARIANTES = 'variantes'
+
+# Lado (em pixels) da miniatura embutida no HTML como "placeholder": o
+# navegador a amplia (borrada) no fundo do '<img>' enquanto a foto carrega
+LADO_MINIATURA = 8
+
+# Formatos em que o original limpo é regravado (os demais viram JPEG)
+FORMATOS_ORIGINAL = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+# Resumo das variantes de uma foto enviada e ainda não processada. Enquanto
+# isso, os templates mostram um "placeholder" (o original ainda tem EXIF).
+PENDENTE = {'pendente': True}
+
+# Resumo de uma foto que o worker desistiu de processar (ver 'fila_imagens.py').
+# O original nunca foi limpo, então os templates também mostram o "placeholder"
+FALHOU = {'falhou': True}
+
+
+def formatos_disponiveis():
+    """Formatos que o Pillow instalado consegue gravar (o JPEG sempre)."""
+    return [
+        extensao for extensao in FORMATOS
+        if extensao == 'jpg' or features.check(extensao)
+    ]
+
+
+def larguras_de(tamanho):
+    """Larguras (em pixels reais) usadas pela caixa 'tamanho'."""
+    lado, densidades = TAMANHOS[tamanho]
+    return [lado * densidade for densidade in densidades]
+
+
+def nome_variante(nome_original, largura, extensao):
+    """'profile_pics/sha256/3f9c....jpg' -> 'variantes/profile_pics/sha256/3f9c.../288.webp'"""
+    base, _extensao = posixpath.splitext(nome_original)
+    return f'{PASTA_VARIANTES}/{base}/{largura}.{extensao}'
+
+
+def _rgb(imagem):
+    """Converte para RGB, com fundo branco no lugar da transparência."""
+    if imagem.mode in ('RGBA', 'LA') or (imagem.mode == 'P' and 'transparency' in imagem.info):
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        return fundo
+    return imagem.convert('RGB')
+
+
+def limpar(arquivo):
+    """
+    Abre a imagem e devolve (imagem, conteúdo, formato, extensão): a imagem
+    já "em pé" (orientação do EXIF aplicada), em RGB, com no máximo
+    LADO_MAXIMO_ORIGINAL, e o novo arquivo original, SEM metadados.
+    """
+    arquivo.seek(0)
+    imagem = Image.open(arquivo)
+    formato = imagem.format if imagem.format in FORMATOS_ORIGINAL else 'JPEG'
+    # Para JPEGs grandes, decodifica direto numa escala menor (bem mais rápido)
+    imagem.draft('RGB', (LADO_MAXIMO_ORIGINAL, LADO_MAXIMO_ORIGINAL))
+    imagem = ImageOps.exif_transpose(imagem)
+    imagem = _rgb(imagem)
+    imagem.thumbnail((LADO_MAXIMO_ORIGINAL, LADO_MAXIMO_ORIGINAL), Image.Resampling.LANCZOS)
+
+    conteudo = io.BytesIO()
+    imagem.save(conteudo, formato, **({'quality': 90} if formato == 'JPEG' else {}))
+    return imagem, conteudo.getvalue(), formato, FORMATOS_ORIGINAL[formato]
+
+
+def _codificar(imagem, extensao):
+    formato, _tipo, opcoes = FORMATOS[extensao]
+    saida = io.BytesIO()
+    imagem.save(saida, formato, **opcoes)
+    return saida.getvalue()
+
+
+def placeholder(imagem):
+    """
+    Calcula o "placeholder" do recorte quadrado de 'imagem', exibido antes
+    da foto chegar: {'cor': cor média em '#rrggbb', 'miniatura': data URI
+    de uma miniatura WebP de LADO_MINIATURA pixels (uns 100 bytes)}. Sem
+    suporte a WebP no Pillow, só a cor.
+    """
+    miniatura = ImageOps.fit(imagem, (LADO_MINIATURA, LADO_MINIATURA), Image.Resampling.BOX)
+    vermelho, verde, azul = miniatura.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    resumo = {'cor': f'#{vermelho:02x}{verde:02x}{azul:02x}'}
+    if features.check('webp'):
+        saida = io.BytesIO()
+        miniatura.save(saida, 'WEBP', quality=50)
+        resumo['miniatura'] = 'data:image/webp;base64,' + base64.b64encode(saida.getvalue()).decode('ascii')
+    return resumo
+
+
+def gerar_variantes(imagem, nome_original, storage):
+    """
+    Grava todas as variantes de 'imagem' (já limpa) e retorna o resumo que
+    fica no modelo: {'larguras': [...], 'formatos': [...]}, mais o
+    "placeholder" (ver 'placeholder').
+
+    Larguras maiores que a foto não são geradas (não há detalhe a ganhar),
+    exceto a de densidade 1x de cada caixa, que sempre existe.
+    """
+    lado_menor = min(imagem.size)
+    larguras = sorted({
+        largura
+        for tamanho in TAMANHOS
+        for indice, largura in enumerate(larguras_de(tamanho))
+        if indice == 0 or largura <= lado_menor
+    })
+    formatos = formatos_disponiveis()
+
+    for largura in larguras:
+        recorte = ImageOps.fit(imagem, (largura, largura), Image.Resampling.LANCZOS)
+        for extensao in formatos:
+            nome = nome_variante(nome_original, largura, extensao)
+            # O nome precisa ser exatamente este: apaga uma variante antiga
+            # (ex: gerada antes com outros parâmetros) antes de gravar.
+            if storage.exists(nome):
+                storage.delete(nome)
+            storage.save(nome, ContentFile(_codificar(recorte, extensao)))
+
+    return {'larguras': larguras, 'formatos': formatos, **placeholder(imagem)}
+
+
+def variantes_no_envio(campo):
+    """
+    Chamado no 'save()' do modelo, ANTES do 'super().save()'. Não abre a
+    imagem (o processamento é feito depois, pelo worker de imagens).
+
+    Retorna o novo valor do resumo das variantes: PENDENTE se 'campo' (um
+    ImageField) recebeu um arquivo novo, {} se a foto foi removida, ou None
+    se nada mudou (o resumo deve ficar como está).
+    """
+    if not campo:
+        return {}
+    if getattr(campo, '_committed', True):
+        return None # O arquivo já estava no storage
+    return dict(PENDENTE)
+
+
+def iniciar_processo():
+    """
+    Prepara o Django em cada processo do worker de imagens (settings e
+    storage). Fica neste módulo, e não em 'fila_imagens.py', porque os
+    processos novos importam o módulo antes do Django estar pronto, e este
+    não importa os modelos.
+    """
+    django.setup()
+
+
+def processar_arquivo(nome):
+    """
+    Limpa o original 'nome' e gera as variantes. Retorna
+    {'arquivo': nome do original limpo, 'variantes': resumo das variantes}.
+
+    O original limpo é SEMPRE gravado como um arquivo NOVO, com a extensão
+    do formato limpo (ex: um MPO, GIF ou TIFF do celular vira JPEG, sem o
+    EXIF); com o armazenamento por conteúdo (ver 'armazenamento.py'), o nome
+    é o hash do conteúdo limpo. O enviado fica sem uso e é removido pelo
+    'gc_media'.
+
+    Roda nos processos do worker de imagens (ver 'fila_imagens.py'): recebe
+    e devolve só valores simples e não acessa o banco.
+    """
+    with default_storage.open(nome, 'rb') as arquivo:
+        original = io.BytesIO(arquivo.read())
+    imagem, conteudo, _formato, extensao = limpar(original)
+
+    base, _extensao = posixpath.splitext(nome)
+    nome = default_storage.save(f'{base}.{extensao}', ContentFile(conteudo))
+
+    return {'arquivo': nome, 'variantes': gerar_variantes(imagem, nome, default_storage)}
+
+
+def urls(nome_original, storage, variantes, tamanho):
+    """
+    Monta os dados do '<picture>' de uma caixa: uma lista de (tipo MIME,
+    srcset) por formato, a URL da variante 1x em JPEG e o "placeholder"
+    ('cor' e 'miniatura', ausentes nas fotos processadas antes dele). Retorna None se a
+    foto ainda não tem variantes (o template usa o original).
+    """
+    if not variantes:
+        return None
+    existentes = set(variantes.get('larguras', []))
+    lado, densidades = TAMANHOS[tamanho]
+    pares = [(lado * densidade, densidade) for densidade in densidades if lado * densidade in existentes]
+    if not pares:
+        return None
+
+    fontes = []
+    for extensao in variantes.get('formatos', []):
+        srcset = ', '.join(
+            f'{storage.url(nome_variante(nome_original, largura, extensao))} {densidade}x'
+            for largura, densidade in pares
+        )
+        fontes.append((FORMATOS[extensao][1], srcset))
+    return {
+        'fontes': fontes,
+        'src': storage.url(nome_variante(nome_original, pares[0][0], 'jpg')),
+        'cor': variantes.get('cor'),
+        'miniatura': variantes.get('miniatura'),
+    }
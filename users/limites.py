@@ -0,0 +1,217 @@
+"""
+Limite de Taxa ("Rate Limit") para Views.
+
+Protege ações que podem ser abusadas (ex: enviar mensagens de contato) sem
+contar linhas no banco a cada requisição. Os limites de cada rota ficam no
+'settings.py', em LIMITES_DE_TAXA:
+
+    LIMITES_DE_TAXA = {
+        'contato_professor': [
+            # Mesmo usuário para o MESMO professor (parâmetro da URL)
+            {'limite': 3, 'janela': 60 * 60, 'por': 'professor_pk'},
+            # Mesmo usuário para TODOS os professores somados
+            {'limite': 20, 'janela': 60 * 60},
+        ],
+    }
+
+Como a contagem funciona (janela deslizante aproximada):
+1. O tempo é dividido em janelas fixas (ex: de hora em hora) e cada janela
+   tem um contador no cache.
+2. O total "da última hora" é estimado somando o contador da janela atual
+   com a parte proporcional da janela anterior que ainda está dentro da
+   última hora. Ex: 15 minutos dentro da janela atual -> atual + 75% da
+   anterior. Isso evita a "rajada" na virada de uma janela fixa.
+3. Se falta um dos dois contadores no cache (primeiro acesso da janela,
+   reinício do servidor, chave expulsa) ou ele está fora do ar, a contagem
+   vem do BANCO, pela função 'contar_no_banco' da view (que deve usar um
+   índice). O resultado reabastece os dois contadores de forma que a
+   estimativa seja igual a ela; daí em diante a contagem segue pelo cache.
+
+Só as ações que a view confirma com 'acao_concluida(request)' (ex: a
+mensagem foi de fato enviada) consomem o limite; GETs e formulários com
+erro apenas conferem se o limite já foi atingido.
+
+Envios simultâneos: o 'cache.incr' do 'DatabaseCache' (produção) é uma
+leitura seguida de uma gravação, não atômico. Por isso, num POST, conferir
+o limite, executar a view e contar a ação acontecem com uma TRAVA por
+usuário e rota, criada com 'cache.add' (atômico em todos os backends: no
+'DatabaseCache' ele depende da chave primária da tabela). Um POST que
+chega enquanto outro do mesmo usuário está em andamento é bloqueado.
+
+Uso:
+    @login_required
+    @limite_de_taxa('contato_professor', contar_no_banco=..., ao_bloquear=...)
+    def contato_professor(request, professor_pk):
+        ...
+        acao_concluida(request) # A mensagem foi enviada: conta para o limite
+"""
+
+import functools
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Quanto tempo a trava dos POSTs de um usuário dura se o processo morrer
+# sem liberá-la
+DURACAO_TRAVA = 30
+
+
+def _identificador(request):
+    """Quem está fazendo a requisição: o usuário logado ou o IP."""
+    if request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    return f"ip{request.META.get('REMOTE_ADDR', '')}"
+
+
+class Regra:
+    """
+    Uma regra de limite de uma rota: no máximo 'limite' ações a cada
+    'janela' segundos, contadas separadamente por usuário e, se 'por' for
+    informado, também por valor daquele parâmetro da URL.
+    """
+
+    def __init__(self, rota, limite, janela, por=None):
+        self.rota = rota
+        self.limite = limite
+        self.janela = janela
+        self.por = por
+
+    def filtros(self, kwargs):
+        """Parâmetros da URL que separam os contadores (ex: {'professor_pk': 7})."""
+        return {self.por: kwargs[self.por]} if self.por else {}
+
+    def _chave(self, request, kwargs, numero_janela):
+        escopo = f':{self.por}={kwargs[self.por]}' if self.por else ''
+        return f'taxa:{self.rota}:{_identificador(request)}{escopo}:{self.janela}:{numero_janela}'
+
+    def _janelas(self, agora):
+        numero = int(agora // self.janela)
+        decorrido = (agora % self.janela) / self.janela
+        return numero, decorrido
+
+    def estimar(self, request, kwargs, contar_no_banco=None):
+        """
+        Retorna o número estimado de ações nos últimos 'janela' segundos.
+        """
+        numero, decorrido = self._janelas(time.time())
+        chave_atual = self._chave(request, kwargs, numero)
+        chave_anterior = self._chave(request, kwargs, numero - 1)
+        try:
+            contadores = cache.get_many([chave_atual, chave_anterior])
+        except Exception:
+            logger.warning("Cache indisponível para o limite de taxa '%s'.", self.rota, exc_info=True)
+            contadores = None
+
+        if contadores is not None and chave_atual in contadores and chave_anterior in contadores:
+            return contadores[chave_atual] + contadores[chave_anterior] * (1 - decorrido)
+
+        # Falta um dos contadores (expulso do cache, ou o primeiro acesso da
+        # janela) ou o cache está fora do ar: o banco é a fonte da verdade
+        if contar_no_banco is None:
+            contadores = contadores or {}
+            return contadores.get(chave_atual, 0) + contadores.get(chave_anterior, 0) * (1 - decorrido)
+        total = contar_no_banco(request, time.time() - self.janela, **self.filtros(kwargs))
+        if contadores is not None:
+            # Reabastece o cache de forma que a estimativa seja exatamente a
+            # contagem do banco: a parte que o contador anterior já cobre
+            # fica nele, o resto vai para o contador atual
+            anterior = contadores.get(chave_anterior, 0)
+            atual = max(math.ceil(total - anterior * (1 - decorrido)), 0)
+            cache.set_many({chave_anterior: anterior, chave_atual: atual}, timeout=self.janela * 2)
+        return total
+
+    def registrar(self, request, kwargs):
+        """Conta uma ação. Deve ser chamado com a trava do usuário (ver 'limite_de_taxa')."""
+        numero, _decorrido = self._janelas(time.time())
+        chave = self._chave(request, kwargs, numero)
+        try:
+            # 'add' só cria a chave se ela não existir; depois o 'incr' soma 1
+            cache.add(chave, 0, timeout=self.janela * 2)
+            cache.incr(chave)
+        except ValueError:
+            # A chave expirou entre o 'add' e o 'incr'
+            cache.set(chave, 1, timeout=self.janela * 2)
+        except Exception:
+            logger.warning("Cache indisponível para o limite de taxa '%s'.", self.rota, exc_info=True)
+
+
+def regras_da_rota(rota):
+    """Lê as regras da rota em settings.LIMITES_DE_TAXA."""
+    configuracao = getattr(settings, 'LIMITES_DE_TAXA', {}).get(rota, [])
+    return [Regra(rota, **regra) for regra in configuracao]
+
+
+def _bloqueio_padrao(request, *args, **kwargs):
+    return HttpResponse("Muitas requisições. Tente novamente mais tarde.", status=429)
+
+
+def acao_concluida(request):
+    """
+    Chamado pela view quando a ação limitada foi de fato feita (ex: a
+    mensagem foi gravada). Só então ela conta para o limite.
+    """
+    request._acao_limitada_concluida = True
+
+
+def _travar(rota, request):
+    """
+    Trava (rota, usuário) no cache. Retorna a chave da trava, None se o
+    cache está fora do ar (segue sem trava, como o resto do módulo) ou
+    False se outro POST do mesmo usuário ainda está em andamento (não
+    espera por ele: esperar prenderia o worker do Gunicorn).
+    """
+    chave = f'taxa:trava:{rota}:{_identificador(request)}'
+    try:
+        if not cache.add(chave, 1, timeout=DURACAO_TRAVA):
+            return False
+    except Exception:
+        logger.warning("Cache indisponível para a trava do limite de taxa '%s'.", rota, exc_info=True)
+        return None
+    return chave
+
+
+def limite_de_taxa(rota, contar_no_banco=None, ao_bloquear=_bloqueio_padrao):
+    """
+    Decorador que aplica à view os limites de 'rota' definidos no settings.
+    A view chama 'acao_concluida(request)' quando a ação deve ser contada.
+
+    Parâmetros:
+        rota (str): Nome da rota em settings.LIMITES_DE_TAXA.
+        contar_no_banco (callable): Opcional. Recebe (request, inicio,
+            **filtros) e conta no banco as ações desde 'inicio' (timestamp).
+            Usado quando o cache não tem o contador.
+        ao_bloquear (callable): Recebe os mesmos argumentos da view e
+            retorna a resposta para quem atingiu o limite (padrão: 429).
+    """
+    def decorador(view):
+        @functools.wraps(view)
+        def _view(request, *args, **kwargs):
+            regras = regras_da_rota(rota)
+            trava = None
+            if request.method == 'POST' and regras:
+                trava = _travar(rota, request)
+                if trava is False:
+                    # Outro POST do mesmo usuário em andamento: trata como excesso
+                    return ao_bloquear(request, *args, **kwargs)
+            try:
+                for regra in regras:
+                    if regra.estimar(request, kwargs, contar_no_banco) >= regra.limite:
+                        return ao_bloquear(request, *args, **kwargs)
+
+                response = view(request, *args, **kwargs)
+
+                if getattr(request, '_acao_limitada_concluida', False):
+                    for regra in regras:
+                        regra.registrar(request, kwargs)
+                return response
+            finally:
+                if trava:
+                    cache.delete(trava)
+        return _view
+    return decorador
@@ -0,0 +1,133 @@
+"""
+Coleta dos Arquivos de Mídia sem Uso ("Garbage Collection" do MEDIA_ROOT).
+
+Com o armazenamento por conteúdo (ver 'armazenamento.py') um arquivo pode
+ser usado por vários registros, então trocar a foto ou excluir a conta não
+apaga nada do disco. Este módulo percorre as pastas das fotos e apaga os
+arquivos que nenhum registro usa mais:
+- originais ('profile_pics/sha256/', 'professor_pics/sha256/'): sem
+  nenhuma referência em REFERENCIAS. Só os gravados pelo armazenamento
+  por conteúdo: as fotos antigas, com o nome original, não são tocadas;
+- variantes ('variantes/<original sem extensão>/...'): o original de onde
+  vieram não é mais usado.
+
+Nada é carregado inteiro na memória: os arquivos são lidos da pasta um a
+um ('os.scandir') e conferidos no banco em LOTES (uma consulta por modelo
+para cada lote de nomes).
+
+Arquivos mais novos que 'idade_minima' nunca são apagados: uma foto recém-
+enviada pode ainda não estar no banco (transação em andamento), e o worker
+de imagens grava o original limpo e as variantes antes de gravar o nome
+novo no registro.
+
+Uso:
+    for nome in limpeza_midia.sem_uso(timedelta(hours=24), 500):
+        default_storage.delete(nome)
+"""
+
+import os
+import posixpath
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from .armazenamento import NOME_POR_CONTEUDO, PASTA_CONTEUDO
+from .imagens import PASTA_VARIANTES
+from .models import CustomUser, ProfessorListing, ProfessorProfile, TarefaImagem
+
+# (queryset, campo) que podem apontar para um arquivo do MEDIA_ROOT
+REFERENCIAS = [
+    (CustomUser.objects.all(), 'foto_perfil'),
+    (ProfessorProfile.objects.all(), 'foto_profissional'),
+    (ProfessorListing.objects.all(), 'foto_perfil'),
+    # Foto enviada e ainda não processada pelo worker de imagens
+    (TarefaImagem.objects.filter(status=TarefaImagem.Status.PENDENTE), 'arquivo'),
+]
+
+# Pastas dos originais (o 'upload_to' dos campos de foto)
+PASTAS_ORIGINAIS = [
+    CustomUser._meta.get_field('foto_perfil').upload_to.rstrip('/'),
+    ProfessorProfile._meta.get_field('foto_profissional').upload_to.rstrip('/'),
+]
+
+
+def arquivos(pasta, idade_minima):
+    """
+    Gera os nomes (relativos ao MEDIA_ROOT) dos arquivos de 'pasta' e das
+    subpastas modificados há mais de 'idade_minima'.
+    """
+    limite = (timezone.now() - idade_minima).timestamp()
+    pendentes = [pasta]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            entradas = os.scandir(default_storage.path(atual))
+        except FileNotFoundError:
+            continue
+        with entradas:
+            for entrada in entradas:
+                nome = posixpath.join(atual, entrada.name)
+                if entrada.is_dir(follow_symlinks=False):
+                    pendentes.append(nome)
+                elif entrada.is_file(follow_symlinks=False) and entrada.stat().st_mtime < limite:
+                    yield nome
+
+
+def _lotes(iteravel, tamanho):
+    iterador = iter(iteravel)
+    while lote := list(islice(iterador, tamanho)):
+        yield lote
+
+
+def referenciados(nomes):
+    """Quais dos 'nomes' algum registro ainda usa."""
+    usados = set()
+    for queryset, campo in REFERENCIAS:
+        usados.update(queryset.filter(**{f'{campo}__in': nomes}).values_list(campo, flat=True))
+    return usados
+
+
+def bases_referenciadas(bases):
+    """
+    Quais das 'bases' (nome do original sem a extensão, como nas pastas das
+    variantes) ainda têm o original em uso.
+    """
+    usadas = set()
+    for queryset, campo in REFERENCIAS:
+        condicao = reduce(or_, (Q(**{f'{campo}__startswith': f'{base}.'}) for base in bases))
+        for nome in queryset.filter(condicao).values_list(campo, flat=True):
+            usadas.add(posixpath.splitext(nome)[0])
+    return usadas
+
+
+def sem_uso(idade_minima, tamanho_lote):
+    """Gera os nomes dos arquivos (originais e variantes) que podem ser apagados."""
+    for pasta in PASTAS_ORIGINAIS:
+        originais = (
+            nome for nome in arquivos(posixpath.join(pasta, PASTA_CONTEUDO), idade_minima)
+            if NOME_POR_CONTEUDO.match(nome)
+        )
+        for lote in _lotes(originais, tamanho_lote):
+            usados = referenciados(lote)
+            yield from (nome for nome in lote if nome not in usados)
+
+    prefixo = f'{PASTA_VARIANTES}/'
+    for lote in _lotes(arquivos(PASTA_VARIANTES, idade_minima), tamanho_lote):
+        bases = {posixpath.dirname(nome).removeprefix(prefixo) for nome in lote}
+        usadas = bases_referenciadas(bases)
+        yield from (
+            nome for nome in lote
+            if posixpath.dirname(nome).removeprefix(prefixo) not in usadas
+        )
+
+
+def remover_pasta_vazia(nome):
+    """Remove a pasta de 'nome' se ela ficou vazia (ex: as variantes de uma foto)."""
+    try:
+        os.rmdir(os.path.dirname(default_storage.path(nome)))
+    except OSError:
+        pass # Ainda tem arquivos
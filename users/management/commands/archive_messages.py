@@ -0,0 +1,58 @@
+"""
+Comando de Gerenciamento: archive_messages
+
+Move as mensagens de contato mais antigas que a retenção
+(settings.RETENCAO_MENSAGENS_MESES, ou '--meses') para a tabela de arquivo
+'MensagemArquivada', em lotes por faixa de chave primária. Ver
+'users/arquivo.py' para os detalhes.
+
+Cada lote é uma transação curta; '--pausa' dá um respiro ao banco entre
+os lotes. Pode ser interrompido e executado de novo sem problemas.
+
+Deve ser agendado (ex: Cron Job do Render, uma vez por dia ou semana):
+    python manage.py archive_messages
+    python manage.py archive_messages --meses 12 --lote 5000 --pausa 0.1
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users import arquivo
+
+
+class Command(BaseCommand):
+    help = "Arquiva as mensagens de contato mais antigas que a retenção."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses', type=int, default=settings.RETENCAO_MENSAGENS_MESES,
+            help=f"Retenção em meses (padrão: {settings.RETENCAO_MENSAGENS_MESES})."
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Tamanho de cada faixa de chaves primárias (padrão: 1000)."
+        )
+        parser.add_argument(
+            '--pausa', type=float, default=0,
+            help="Segundos de espera entre dois lotes (padrão: 0)."
+        )
+
+    def handle(self, *args, **options):
+        limite = arquivo.limite_de_retencao(options['meses'])
+        self.stdout.write(f"Arquivando mensagens enviadas antes de {limite:%d/%m/%Y %H:%M}...")
+
+        total = 0
+        try:
+            for inicio, fim in arquivo.faixas(limite, options['lote']):
+                movidas = arquivo.arquivar_faixa(inicio, fim, limite)
+                if movidas:
+                    total += movidas
+                    self.stdout.write(f"Faixa {inicio}-{fim - 1}: {movidas} mensagens arquivadas.")
+                    if options['pausa']:
+                        time.sleep(options['pausa'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{total} mensagens arquivadas."))
@@ -0,0 +1,143 @@
+"""
+Comando de Gerenciamento: carregar_ceps
+
+Carrega a tabela de referência 'CepCoordenada' (CEP -> latitude/longitude)
+a partir de um arquivo CSV local, sem depender de nenhuma API externa.
+
+O arquivo deve ter um cabeçalho com as colunas 'cep', 'latitude' e
+'longitude' (outras colunas são ignoradas). O CEP pode ter 8 dígitos ou
+só os 5 da região, com ou sem pontuação:
+
+    cep,latitude,longitude
+    50030-230,-8.0631,-34.8711
+    01310,-23.5614,-46.6559
+
+Depois de carregar a tabela, o comando atualiza as coordenadas já
+gravadas nos usuários e na listagem de professores (os signals só fazem
+isso quando o usuário é salvo).
+
+Uso:
+    python manage.py carregar_ceps ceps.csv
+    python manage.py carregar_ceps ceps.csv --delimitador ";" --lote 5000
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users import geracoes
+from users.models import CepCoordenada, CustomUser, ProfessorListing
+
+
+class Command(BaseCommand):
+    help = "Carrega a tabela de coordenadas de CEPs a partir de um arquivo CSV local."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo CSV.")
+        parser.add_argument(
+            '--delimitador', default=',',
+            help="Separador de colunas do CSV (padrão: ',')."
+        )
+        parser.add_argument(
+            '--lote', type=int, default=2000,
+            help="Quantidade de linhas gravadas por vez (padrão: 2000)."
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        try:
+            arquivo = open(options['arquivo'], newline='', encoding='utf-8-sig')
+        except OSError as erro:
+            raise CommandError(f"Não foi possível abrir o arquivo: {erro}")
+
+        carregados = 0
+        ignorados = 0
+        linhas = []
+        with arquivo:
+            leitor = csv.DictReader(arquivo, delimiter=options['delimitador'])
+            colunas = {nome.strip().lower() for nome in (leitor.fieldnames or [])}
+            if not {'cep', 'latitude', 'longitude'} <= colunas:
+                raise CommandError("O arquivo precisa das colunas 'cep', 'latitude' e 'longitude'.")
+
+            for registro in leitor:
+                registro = {(chave or '').strip().lower(): valor for chave, valor in registro.items()}
+                linha = self._converter(registro)
+                if linha is None:
+                    ignorados += 1
+                    continue
+                linhas.append(linha)
+                if len(linhas) >= lote:
+                    carregados += self._gravar(linhas)
+                    linhas = []
+        if linhas:
+            carregados += self._gravar(linhas)
+
+        atualizados = self._materializar_coordenadas(lote)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{carregados} CEPs carregados ({ignorados} linhas ignoradas); "
+            f"coordenadas de {atualizados} usuários atualizadas."
+        ))
+
+    def _converter(self, registro):
+        """Valida uma linha do CSV. Retorna None se ela for inválida."""
+        cep = CepCoordenada.normalizar(registro.get('cep'))
+        try:
+            latitude = float(registro['latitude'].replace(',', '.'))
+            longitude = float(registro['longitude'].replace(',', '.'))
+        except (AttributeError, ValueError):
+            return None
+        if not cep or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return None
+        return CepCoordenada(cep=cep, latitude=latitude, longitude=longitude)
+
+    def _gravar(self, linhas):
+        """Insere ou atualiza ("upsert") um lote de CEPs em uma única consulta."""
+        with transaction.atomic():
+            CepCoordenada.objects.bulk_create(
+                linhas,
+                update_conflicts=True,
+                unique_fields=['cep'],
+                update_fields=['latitude', 'longitude'],
+            )
+        return len(linhas)
+
+    def _materializar_coordenadas(self, lote):
+        """
+        Recalcula as coordenadas de todos os usuários com CEP, em lotes:
+        uma consulta à tabela de referência e dois UPDATEs por lote.
+        """
+        usuarios = (
+            CustomUser.objects.exclude(cep='')
+            .only('pk', 'cep', 'latitude', 'longitude')
+            .order_by('pk')
+        )
+        total = 0
+        pendentes = []
+        for user in usuarios.iterator(chunk_size=lote):
+            pendentes.append(user)
+            if len(pendentes) >= lote:
+                total += self._atualizar_lote(pendentes)
+                pendentes = []
+        if pendentes:
+            total += self._atualizar_lote(pendentes)
+
+        # O 'bulk_update' não dispara signals: invalida os caches manualmente
+        geracoes.avancar('listagem')
+        return total
+
+    def _atualizar_lote(self, usuarios):
+        coordenadas = CepCoordenada.localizar_varios([user.cep for user in usuarios])
+        for user in usuarios:
+            user.latitude, user.longitude = coordenadas.get(user.cep, (None, None))
+
+        with transaction.atomic():
+            CustomUser.objects.bulk_update(usuarios, ['latitude', 'longitude'])
+            # Linhas de quem não está na listagem simplesmente não são afetadas
+            ProfessorListing.objects.bulk_update(
+                [ProfessorListing(pk=user.pk, latitude=user.latitude, longitude=user.longitude) for user in usuarios],
+                ['latitude', 'longitude'],
+            )
+        return len(usuarios)
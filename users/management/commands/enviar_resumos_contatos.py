@@ -0,0 +1,119 @@
+"""
+Comando de Gerenciamento: enviar_resumos_contatos
+
+Envia os resumos de mensagens dos professores que preferem receber as
+mensagens agrupadas ('ProfessorProfile.frequencia_notificacoes').
+
+Para cada professor com mensagens ainda não avisadas, monta UM e-mail com
+todas elas ('emails/resumo_professor.html'), grava na fila ('EmailOutbox')
+e marca as mensagens como notificadas, na mesma transação. As mensagens são
+antes RESERVADAS ('SELECT ... FOR UPDATE SKIP LOCKED', só as ainda não
+avisadas): duas execuções sobrepostas (ex: um cron de hora em hora que
+demorou) nunca colocam a mesma mensagem em dois resumos. Em seguida envia
+a fila em lotes, cada lote por uma única conexão SMTP (ver 'emails.py').
+Assim o custo cresce com o número de PROFESSORES, não de mensagens.
+
+Deve ser agendado (ex: Cron Job do Render):
+    python manage.py enviar_resumos_contatos --frequencia hora   # a cada hora
+    python manage.py enviar_resumos_contatos --frequencia dia    # uma vez por dia
+"""
+
+from itertools import groupby
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from users import emails
+from users.models import ContactProfessor, EmailOutbox, ProfessorProfile
+
+Frequencia = ProfessorProfile.FrequenciaNotificacao
+
+# Preferências atendidas por cada execução. A execução de hora em hora
+# também avisa quem mudou para "imediato" com mensagens ainda pendentes.
+FREQUENCIAS = {
+    'hora': [Frequencia.HORA, Frequencia.IMEDIATA],
+    'dia': [Frequencia.DIA],
+}
+
+
+class Command(BaseCommand):
+    help = "Envia os resumos de novas mensagens aos professores."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequencia', choices=sorted(FREQUENCIAS), required=True,
+            help="Quais resumos enviar: 'hora' ou 'dia'."
+        )
+        parser.add_argument(
+            '--lote', type=int, default=emails.TAMANHO_LOTE,
+            help=f"Quantidade de e-mails enviados por conexão (padrão: {emails.TAMANHO_LOTE})."
+        )
+
+    def handle(self, *args, **options):
+        pendentes = (
+            ContactProfessor.objects
+            .filter(
+                notificado_em__isnull=True,
+                professor__professorprofile__frequencia_notificacoes__in=FREQUENCIAS[options['frequencia']],
+            )
+            .select_related('aluno', 'professor')
+            .order_by('professor_id', 'data_envio')
+        )
+        link_mensagens = settings.SITE_URL + reverse('users:minhas_mensagens')
+
+        resumos = 0
+        for _professor_id, grupo in groupby(pendentes.iterator(), key=lambda contato: contato.professor_id):
+            if self._enfileirar_resumo(list(grupo), link_mensagens):
+                resumos += 1
+
+        # Envia tudo o que está na fila: uma conexão SMTP por lote
+        enviados = falhas = 0
+        while True:
+            lote_enviados, lote_falhas = emails.processar_lote(options['lote'])
+            if not (lote_enviados or lote_falhas):
+                break
+            enviados += lote_enviados
+            falhas += lote_falhas
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumos} resumos gerados; {enviados} e-mails enviados, {falhas} falhas (serão tentados de novo)."
+        ))
+
+    def _enfileirar_resumo(self, contatos, link_mensagens):
+        """
+        Reserva as mensagens de 'contatos' ainda não avisadas e coloca o
+        resumo delas na fila. Retorna False se outra execução já reservou todas.
+        """
+        professor = contatos[0].professor
+        nome = professor.como_deseja_ser_chamado or professor.username
+        with transaction.atomic():
+            # Só as mensagens que ESTA execução conseguiu travar e que ainda
+            # não foram avisadas (outra execução pode ter enviado o resumo)
+            reservadas = set(
+                ContactProfessor.objects
+                .select_for_update(skip_locked=True)
+                .filter(pk__in=[contato.pk for contato in contatos], notificado_em__isnull=True)
+                .values_list('pk', flat=True)
+            )
+            contatos = [contato for contato in contatos if contato.pk in reservadas]
+            if not contatos:
+                return False
+
+            ContactProfessor.objects.filter(pk__in=reservadas, notificado_em__isnull=True).update(
+                notificado_em=timezone.now()
+            )
+            EmailOutbox.enfileirar(
+                assunto=f"Resumo: {len(contatos)} nova(s) mensagem(ns) de alunos",
+                corpo=render_to_string('emails/resumo_professor.html', {
+                    'professor_nome': nome,
+                    'contatos': contatos,
+                    'link_mensagens': link_mensagens,
+                }),
+                html=True,
+                destinatarios=[professor.email],
+            )
+        return True
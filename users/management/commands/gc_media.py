@@ -0,0 +1,63 @@
+"""
+Comando de Gerenciamento: gc_media
+
+Apaga do MEDIA_ROOT as fotos (e as variantes delas) que nenhum registro
+usa mais: fotos trocadas, de contas excluídas, ou os originais enviados
+que o worker de imagens já substituiu pela versão limpa. Ver
+'users/limpeza_midia.py' para os detalhes.
+
+Com '--simular', só lista o que seria apagado.
+
+Deve ser agendado (ex: Cron Job do Render, uma vez por dia ou semana):
+    python manage.py gc_media
+    python manage.py gc_media --simular --idade-minima 48 --lote 1000
+"""
+
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from users import limpeza_midia
+from users.imagens import PASTA_VARIANTES
+
+
+class Command(BaseCommand):
+    help = "Apaga os arquivos de mídia que nenhum registro usa mais."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idade-minima', type=float, default=24,
+            help="Só apaga arquivos modificados há mais destas horas (padrão: 24)."
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Quantos arquivos são conferidos no banco por consulta (padrão: 500)."
+        )
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Só lista os arquivos, sem apagar nada."
+        )
+
+    def handle(self, *args, **options):
+        idade_minima = timedelta(hours=options['idade_minima'])
+        total = 0
+        liberados = 0
+        for nome in limpeza_midia.sem_uso(idade_minima, options['lote']):
+            try:
+                tamanho = default_storage.size(nome)
+                if not options['simular']:
+                    default_storage.delete(nome)
+                    if nome.startswith(f'{PASTA_VARIANTES}/'):
+                        limpeza_midia.remover_pasta_vazia(nome)
+            except FileNotFoundError:
+                continue # Apagado por outra execução
+            total += 1
+            liberados += tamanho
+            if options['verbosity'] > 1 or options['simular']:
+                self.stdout.write(nome)
+
+        acao = "seriam apagados" if options['simular'] else "apagados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} arquivos {acao} ({liberados / 1024 / 1024:.1f} MB)."
+        ))
@@ -0,0 +1,57 @@
+"""
+Comando de Gerenciamento: gerar_variantes_fotos
+
+Coloca na fila de imagens ('TarefaImagem') as fotos enviadas ANTES do
+pipeline de imagens (ver 'users/imagens.py'), para que o worker
+'process_image_jobs' limpe o original (orientação do EXIF aplicada e
+metadados removidos, gravado como um arquivo novo) e gere as versões
+reduzidas em AVIF/WebP/JPEG.
+
+Por padrão só agenda as fotos que ainda não têm variantes (inclusive as
+que o worker desistiu de processar, ver 'imagens.FALHOU'); com '--todas'
+agenda todas (ex: depois de mudar os tamanhos em 'imagens.TAMANHOS', ou
+para calcular o "placeholder" das fotos processadas antes dele).
+Enquanto a tarefa não é processada, a foto antiga continua sendo exibida
+como antes.
+
+Uso:
+    python manage.py gerar_variantes_fotos
+    python manage.py process_image_jobs
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from users import imagens
+from users.models import CustomUser, ProfessorProfile, TarefaImagem
+
+# (modelo, campo da foto, campo do resumo das variantes)
+FOTOS = [
+    (CustomUser, 'foto_perfil', 'foto_perfil_variantes'),
+    (ProfessorProfile, 'foto_profissional', 'foto_profissional_variantes'),
+]
+
+
+class Command(BaseCommand):
+    help = "Agenda a geração das versões reduzidas (variantes) das fotos já enviadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas', action='store_true',
+            help="Agenda todas as fotos, não só as que ainda não têm variantes."
+        )
+
+    def handle(self, *args, **options):
+        for modelo, campo, campo_variantes in FOTOS:
+            registros = modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            if not options['todas']:
+                registros = registros.filter(Q(**{campo_variantes: {}}) | Q(**{campo_variantes: imagens.FALHOU}))
+
+            agendadas = 0
+            for registro in registros.only('pk', campo).order_by('pk').iterator(chunk_size=500):
+                TarefaImagem.enfileirar(registro, campo)
+                agendadas += 1
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{modelo.__name__}.{campo}: {agendadas} fotos agendadas."
+            ))
@@ -0,0 +1,61 @@
+"""
+Comando de Gerenciamento: process_email_outbox
+
+Envia os e-mails gravados na fila ('EmailOutbox') pelas views. Ver
+'users/emails.py' para os detalhes da reserva, do envio em lote e das
+novas tentativas.
+
+Pode rodar de duas formas:
+- Uma vez (ex: agendado pelo cron a cada minuto): esvazia a fila e sai.
+- Como worker contínuo (ex: um "Background Worker" do Render), com
+  '--continuo': depois de esvaziar a fila, espera '--intervalo' segundos
+  e confere de novo.
+
+Uso:
+    python manage.py process_email_outbox
+    python manage.py process_email_outbox --continuo --intervalo 5 --lote 100
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from users import emails
+
+
+class Command(BaseCommand):
+    help = "Envia os e-mails pendentes da fila (EmailOutbox)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=emails.TAMANHO_LOTE,
+            help=f"Quantidade de e-mails enviados por conexão (padrão: {emails.TAMANHO_LOTE})."
+        )
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help="Continua rodando e conferindo a fila (worker)."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=5,
+            help="Segundos de espera quando a fila está vazia, no modo contínuo (padrão: 5)."
+        )
+
+    def handle(self, *args, **options):
+        total_enviados = total_falhas = 0
+        try:
+            while True:
+                enviados, falhas = emails.processar_lote(options['lote'])
+                total_enviados += enviados
+                total_falhas += falhas
+                if enviados or falhas:
+                    self.stdout.write(f"Lote processado: {enviados} enviados, {falhas} falhas.")
+                    continue # Pode haver mais e-mails esperando
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fila processada: {total_enviados} e-mails enviados, {total_falhas} falhas."
+        ))
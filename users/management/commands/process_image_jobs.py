@@ -0,0 +1,84 @@
+"""
+Comando de Gerenciamento: process_image_jobs
+
+Processa as fotos enviadas pelos usuários (fila 'TarefaImagem'): limpa o
+original e gera as versões reduzidas. Ver 'users/fila_imagens.py' e
+'users/imagens.py'.
+
+As fotos são processadas em paralelo num pool de processos, por padrão um
+por núcleo da máquina ('--processos'). Com '--processos 0', tudo roda no
+próprio processo do comando (útil para depurar).
+
+Pode rodar de duas formas (como o 'process_email_outbox'):
+- Uma vez (ex: agendado pelo cron): esvazia a fila e sai.
+- Como worker contínuo (ex: um "Background Worker" do Render), com
+  '--continuo': depois de esvaziar a fila, espera '--intervalo' segundos
+  e confere de novo.
+
+Uso:
+    python manage.py process_image_jobs
+    python manage.py process_image_jobs --continuo --intervalo 2 --processos 4
+"""
+
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+
+from users import fila_imagens
+
+
+class Command(BaseCommand):
+    help = "Processa as fotos pendentes da fila (TarefaImagem)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos', type=int, default=os.cpu_count() or 1,
+            help="Quantidade de processos que tratam as fotos (padrão: um por núcleo)."
+        )
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help="Continua rodando e conferindo a fila (worker)."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2,
+            help="Segundos de espera quando a fila está vazia, no modo contínuo (padrão: 2)."
+        )
+
+    def handle(self, *args, **options):
+        processos = options['processos']
+        # Duas fotos por processo em cada lote: nenhum processo fica parado
+        # esperando o mais lento do lote terminar sozinho
+        tamanho_lote = max(processos, 1) * 2
+
+        total_processadas = total_falhas = 0
+        executor = fila_imagens.criar_executor(processos) if processos else None
+        try:
+            while True:
+                try:
+                    processadas, falhas = fila_imagens.processar_lote(executor, tamanho_lote)
+                except BrokenProcessPool:
+                    # Um processo morreu: as tarefas do lote já foram marcadas
+                    # para nova tentativa; recria o pool e continua
+                    self.stderr.write("Um processo do pool morreu; recriando o pool.")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = fila_imagens.criar_executor(processos)
+                    continue
+                total_processadas += processadas
+                total_falhas += falhas
+                if processadas or falhas:
+                    self.stdout.write(f"Lote processado: {processadas} fotos, {falhas} falhas.")
+                    continue # Pode haver mais fotos esperando
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fila processada: {total_processadas} fotos, {total_falhas} falhas."
+        ))
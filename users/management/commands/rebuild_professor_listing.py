@@ -0,0 +1,78 @@
+"""
+Comando de Gerenciamento: rebuild_professor_listing
+
+Reconstrói a tabela desnormalizada 'ProfessorListing' a partir de
+'CustomUser' + 'ProfessorProfile'. Normalmente os signals mantêm a tabela
+atualizada sozinhos; este comando serve para o preenchimento inicial
+(backfill) e para corrigir qualquer divergência.
+
+Uso:
+    python manage.py rebuild_professor_listing
+    python manage.py rebuild_professor_listing --lote 1000
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users import busca, geracoes
+from users.models import CustomUser, ProfessorListing
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a tabela de listagem de professores (ProfessorListing)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Quantidade de professores gravados por vez (padrão: 500)."
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        # Professores que DEVEM aparecer na listagem
+        ativos = (
+            CustomUser.objects
+            .filter(is_professor=True, professorprofile__status_ativo=True)
+            .select_related('professorprofile')
+            .order_by('pk')
+        )
+
+        campos = [f.name for f in ProfessorListing._meta.concrete_fields if not f.primary_key]
+        total = 0
+        linhas = []
+
+        # '.iterator()' percorre o banco em blocos, sem carregar todos os
+        # professores na memória de uma vez.
+        for user in ativos.iterator(chunk_size=lote):
+            linhas.append(ProfessorListing(user=user, **ProfessorListing.dados_do_professor(user, user.professorprofile)))
+            if len(linhas) >= lote:
+                total += self._gravar(linhas, campos)
+                linhas = []
+        if linhas:
+            total += self._gravar(linhas, campos)
+
+        # Remove linhas de quem não deve mais aparecer (inativos, ex-professores)
+        removidos, _detalhes = ProfessorListing.objects.exclude(
+            user__is_professor=True, user__professorprofile__status_ativo=True
+        ).delete()
+
+        # O 'bulk_create' não dispara signals: atualiza o índice de trigramas
+        # da busca aproximada e invalida os caches manualmente
+        busca.reconstruir_trigramas()
+        geracoes.avancar('listagem')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listagem reconstruída: {total} professores gravados, {removidos} linhas removidas."
+        ))
+
+    def _gravar(self, linhas, campos):
+        """Insere ou atualiza ("upsert") um lote de linhas em uma única consulta."""
+        with transaction.atomic():
+            ProfessorListing.objects.bulk_create(
+                linhas,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=campos,
+            )
+        return len(linhas)
@@ -0,0 +1,91 @@
+"""
+Comando de Gerenciamento: recalcular_avaliacoes
+
+Recalcula do zero a média, o total e a soma das notas de TODOS os
+professores a partir da tabela 'Avaliacao', e copia os resultados para a
+listagem ('ProfessorListing').
+
+No dia a dia essas métricas são mantidas de forma incremental (ver
+'ProfessorProfile.registrar_avaliacao'); este comando serve para a
+reconciliação periódica ou para corrigir qualquer divergência (ex: após
+uma edição manual no banco).
+
+Uso:
+    python manage.py recalcular_avaliacoes
+    python manage.py recalcular_avaliacoes --lote 1000
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from users import geracoes
+from users.models import Avaliacao, ProfessorListing, ProfessorProfile
+
+
+class Command(BaseCommand):
+    help = "Recalcula a média de avaliações de todos os professores."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Quantidade de perfis atualizados por vez (padrão: 500)."
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        # UMA consulta agregada (GROUP BY professor) para todas as avaliações
+        metricas = {
+            linha['professor']: (linha['total'], linha['soma'])
+            for linha in Avaliacao.objects.values('professor').annotate(total=Count('pk'), soma=Sum('nota')).order_by()
+        }
+
+        perfis = ProfessorProfile.objects.only('pk', 'user_id', *ProfessorProfile.CAMPOS_DE_AVALIACAO).order_by('pk')
+        corrigidos = 0
+        pendentes = []
+        for perfil in perfis.iterator(chunk_size=lote):
+            total, soma = metricas.get(perfil.user_id, (0, 0))
+            media = (Decimal(soma) / total).quantize(Decimal('0.01')) if total else Decimal('0.00')
+            if (perfil.total_avaliacoes, perfil.soma_notas, perfil.media_avaliacoes) != (total, soma, media):
+                perfil.total_avaliacoes, perfil.soma_notas, perfil.media_avaliacoes = total, soma, media
+                pendentes.append(perfil)
+            if len(pendentes) >= lote:
+                corrigidos += self._gravar(pendentes)
+                pendentes = []
+        if pendentes:
+            corrigidos += self._gravar(pendentes)
+
+        # O 'bulk_update' não dispara signals: invalida os caches manualmente
+        geracoes.avancar('listagem')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Avaliações recalculadas: {len(metricas)} professores avaliados, {corrigidos} perfis corrigidos."
+        ))
+
+    def _gravar(self, perfis):
+        """Atualiza um lote de perfis e as linhas correspondentes da listagem."""
+        # O 'bulk_update' não preenche os campos 'auto_now': a nova versão
+        # (que invalida os cards em cache) é definida aqui.
+        agora = timezone.now()
+        for perfil in perfis:
+            perfil.atualizado_em = agora
+        with transaction.atomic():
+            ProfessorProfile.objects.bulk_update(perfis, [*ProfessorProfile.CAMPOS_DE_AVALIACAO, 'atualizado_em'])
+            # Linhas de quem não está na listagem simplesmente não são afetadas
+            ProfessorListing.objects.bulk_update(
+                [
+                    ProfessorListing(
+                        pk=perfil.user_id,
+                        media_avaliacoes=perfil.media_avaliacoes,
+                        total_avaliacoes=perfil.total_avaliacoes,
+                        atualizado_em=agora,
+                    )
+                    for perfil in perfis
+                ],
+                ['media_avaliacoes', 'total_avaliacoes', 'atualizado_em'],
+            )
+        return len(perfis)
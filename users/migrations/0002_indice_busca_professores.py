@@ -0,0 +1,81 @@
+"""
+Cria o índice de busca textual dos professores (ver 'users/busca.py').
+
+- PostgreSQL: tabela com coluna 'tsvector' + índice GIN (dicionário 'portuguese').
+- SQLite: tabela virtual FTS5 (sem acentos, busca por prefixo).
+
+Também preenche o índice com os professores que já existem no banco.
+"""
+
+from django.db import migrations
+
+
+SQL_POSTGRES = [
+    """
+    CREATE TABLE users_professor_busca (
+        user_id bigint PRIMARY KEY REFERENCES users_customuser (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        documento tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX users_professor_busca_documento_gin ON users_professor_busca USING gin (documento)",
+]
+
+SQL_SQLITE = [
+    """
+    CREATE VIRTUAL TABLE users_professor_busca USING fts5(
+        disciplinas, nome, cidade,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+
+def criar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    comandos = {'postgresql': SQL_POSTGRES, 'sqlite': SQL_SQLITE}.get(vendor, [])
+    for sql in comandos:
+        schema_editor.execute(sql)
+    if not comandos:
+        return
+
+    # Preenche o índice com os professores existentes
+    CustomUser = apps.get_model('users', 'CustomUser')
+    ProfessorProfile = apps.get_model('users', 'ProfessorProfile')
+    disciplinas = dict(ProfessorProfile.objects.values_list('user_id', 'disciplinas'))
+
+    for user in CustomUser.objects.filter(is_professor=True).iterator():
+        nome = ' '.join(filter(None, [user.username, user.nome_completo, user.como_deseja_ser_chamado]))
+        params = [user.pk, disciplinas.get(user.pk) or '', nome, user.cidade or '']
+        if vendor == 'postgresql':
+            schema_editor.execute(
+                """
+                INSERT INTO users_professor_busca (user_id, documento) VALUES (
+                    %s,
+                    setweight(to_tsvector('portuguese', %s), 'A') ||
+                    setweight(to_tsvector('portuguese', %s), 'B') ||
+                    setweight(to_tsvector('portuguese', %s), 'C')
+                )
+                """,
+                params,
+            )
+        else:
+            schema_editor.execute(
+                "INSERT INTO users_professor_busca (rowid, disciplinas, nome, cidade) VALUES (%s, %s, %s, %s)",
+                params,
+            )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS users_professor_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
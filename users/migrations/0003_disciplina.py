@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_indice_busca_professores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Disciplina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('slug', models.SlugField(max_length=100, unique=True, verbose_name='Identificador')),
+            ],
+            options={
+                'verbose_name': 'Disciplina',
+                'verbose_name_plural': 'Disciplinas',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='professorprofile',
+            name='bio_profissional',
+            field=models.TextField(blank=True, help_text='Breve descrição da sua experiência e qualificações.', verbose_name='Bio Profissional'),
+        ),
+        migrations.AlterField(
+            model_name='professorprofile',
+            name='foto_profissional',
+            field=models.ImageField(blank=True, help_text='Uma foto específica para seu perfil profissional.', null=True, upload_to='professor_pics/', verbose_name='Foto Profissional'),
+        ),
+        migrations.AddField(
+            model_name='professorprofile',
+            name='lista_disciplinas',
+            field=models.ManyToManyField(blank=True, related_name='professores', to='users.disciplina', verbose_name='Disciplinas (Normalizadas)'),
+        ),
+    ]
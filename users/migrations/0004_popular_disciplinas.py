@@ -0,0 +1,50 @@
+"""
+Migração de dados: converte o texto livre 'ProfessorProfile.disciplinas'
+(ex: "Matemática, Física") em linhas do catálogo 'Disciplina' e vincula
+cada perfil às suas disciplinas através de 'lista_disciplinas'.
+
+A lógica de separação é copiada aqui (em vez de importada do models.py)
+para que a migração continue funcionando mesmo se o modelo mudar no futuro.
+"""
+
+import re
+
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def separar_texto(texto):
+    vistos = {}
+    for parte in re.split(r'[,;\n]', texto or ''):
+        nome = ' '.join(parte.split())
+        slug = slugify(nome)[:100]
+        if slug and slug not in vistos:
+            vistos[slug] = nome[:100]
+    return list(vistos.items())
+
+
+def popular_disciplinas(apps, schema_editor):
+    Disciplina = apps.get_model('users', 'Disciplina')
+    ProfessorProfile = apps.get_model('users', 'ProfessorProfile')
+    Vinculo = ProfessorProfile.lista_disciplinas.through
+
+    catalogo = {}
+    vinculos = []
+    for perfil_id, texto in ProfessorProfile.objects.values_list('id', 'disciplinas').iterator():
+        for slug, nome in separar_texto(texto):
+            if slug not in catalogo:
+                catalogo[slug], _criada = Disciplina.objects.get_or_create(slug=slug, defaults={'nome': nome})
+            vinculos.append(Vinculo(professorprofile_id=perfil_id, disciplina_id=catalogo[slug].pk))
+
+    Vinculo.objects.bulk_create(vinculos, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_disciplina'),
+    ]
+
+    operations = [
+        migrations.RunPython(popular_disciplinas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_popular_disciplinas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfessorListing',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listagem', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('username', models.CharField(max_length=150, verbose_name='Username')),
+                ('nome_exibicao', models.CharField(max_length=150, verbose_name='Nome de Exibição')),
+                ('foto_perfil', models.ImageField(blank=True, upload_to='', verbose_name='Foto de Perfil')),
+                ('cidade', models.CharField(blank=True, max_length=100, verbose_name='Cidade')),
+                ('disciplinas', models.JSONField(blank=True, default=list, verbose_name='Disciplinas')),
+                ('modalidades', models.CharField(blank=True, choices=[('P', 'Presencial'), ('O', 'Online'), ('AD', 'Domicílio do Aluno'), ('AP', 'Domicílio do Professor'), ('TO', 'Todos (Presencial e Online)')], max_length=2, verbose_name='Modalidades de Aula')),
+                ('tarifa_hora', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Tarifa por Hora (R$)')),
+                ('is_voluntario', models.BooleanField(default=False, verbose_name='É Voluntário')),
+                ('aceita_online', models.BooleanField(default=False, verbose_name='Aceita Aulas Online')),
+                ('aceita_grupo', models.BooleanField(default=False, verbose_name='Aceita Aulas em Grupo')),
+            ],
+            options={
+                'verbose_name': 'Professor (Listagem)',
+                'verbose_name_plural': 'Professores (Listagem)',
+                'indexes': [models.Index(fields=['username', 'user'], name='listagem_username_idx'), models.Index(fields=['is_voluntario', 'username', 'user'], name='listagem_voluntario_idx')],
+            },
+        ),
+    ]
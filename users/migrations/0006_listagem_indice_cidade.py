@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_professor_listing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='professorlisting',
+            index=models.Index(fields=['cidade', 'username', 'user'], name='listagem_cidade_idx'),
+        ),
+    ]
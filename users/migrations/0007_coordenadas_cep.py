@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_listagem_indice_cidade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CepCoordenada',
+            fields=[
+                ('cep', models.CharField(max_length=8, primary_key=True, serialize=False, verbose_name='CEP')),
+                ('latitude', models.FloatField(verbose_name='Latitude')),
+                ('longitude', models.FloatField(verbose_name='Longitude')),
+            ],
+            options={
+                'verbose_name': 'Coordenada de CEP',
+                'verbose_name_plural': 'Coordenadas de CEPs',
+            },
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddField(
+            model_name='professorlisting',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='professorlisting',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='professorlisting',
+            index=models.Index(fields=['latitude', 'longitude'], name='listagem_coordenadas_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_coordenadas_cep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professorlisting',
+            name='media_avaliacoes',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3, verbose_name='Média de Avaliações'),
+        ),
+        migrations.AddIndex(
+            model_name='professorlisting',
+            index=models.Index(fields=['tarifa_hora', 'user'], name='listagem_preco_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professorlisting',
+            index=models.Index(fields=['media_avaliacoes', 'user'], name='listagem_avaliacao_idx'),
+        ),
+    ]
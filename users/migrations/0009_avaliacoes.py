@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:55
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_listagem_preco_avaliacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professorlisting',
+            name='total_avaliacoes',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total de Avaliações'),
+        ),
+        migrations.AddField(
+            model_name='professorprofile',
+            name='soma_notas',
+            field=models.PositiveIntegerField(default=0, verbose_name='Soma das Notas'),
+        ),
+        migrations.AddField(
+            model_name='professorprofile',
+            name='total_avaliacoes',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total de Avaliações'),
+        ),
+        migrations.CreateModel(
+            name='Avaliacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nota', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Nota')),
+                ('comentario', models.TextField(blank=True, verbose_name='Comentário')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data da Avaliação')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última Edição')),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avaliacoes_feitas', to=settings.AUTH_USER_MODEL, verbose_name='Aluno')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avaliacoes_recebidas', to=settings.AUTH_USER_MODEL, verbose_name='Professor Avaliado')),
+            ],
+            options={
+                'verbose_name': 'Avaliação',
+                'verbose_name_plural': 'Avaliações',
+                'ordering': ['-data_criacao'],
+                'indexes': [models.Index(fields=['professor', '-data_criacao'], name='avaliacao_professor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('aluno', 'professor'), name='avaliacao_unica_por_aluno'), models.CheckConstraint(condition=models.Q(('nota__gte', 1), ('nota__lte', 5)), name='avaliacao_nota_1_a_5')],
+            },
+        ),
+    ]
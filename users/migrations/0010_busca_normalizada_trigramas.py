@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:59
+
+"""
+Busca sem acentos e tolerante a erros de digitação (ver 'users/busca.py').
+
+1. Cria e preenche 'ProfessorListing.texto_busca' (texto normalizado).
+2. PostgreSQL: ativa a extensão 'pg_trgm', cria o índice GIN de trigramas
+   na nova coluna e reindexa a busca textual com o texto sem acentos.
+3. SQLite: cria a tabela virtual FTS5 de trigramas 'users_professor_trigramas'.
+
+A normalização é copiada aqui (em vez de importada) para que a migração
+continue funcionando mesmo se o código da busca mudar no futuro.
+"""
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def preparar_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    ProfessorListing = apps.get_model('users', 'ProfessorListing')
+    CustomUser = apps.get_model('users', 'CustomUser')
+    ProfessorProfile = apps.get_model('users', 'ProfessorProfile')
+
+    # 1. Preenche a coluna normalizada
+    linhas = []
+    for linha in ProfessorListing.objects.select_related('user').iterator(chunk_size=500):
+        user = linha.user
+        linha.texto_busca = normalizar(' '.join([
+            user.username, user.nome_completo or '', user.como_deseja_ser_chamado or '', user.cidade or '',
+            *[item['nome'] for item in linha.disciplinas],
+        ]))
+        linhas.append(linha)
+    ProfessorListing.objects.bulk_update(linhas, ['texto_busca'], batch_size=500)
+
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX listagem_texto_busca_trgm ON users_professorlisting USING gin (texto_busca gin_trgm_ops)"
+        )
+        # O índice textual passa a guardar o texto sem acentos
+        disciplinas = dict(ProfessorProfile.objects.values_list('user_id', 'disciplinas'))
+        for user in CustomUser.objects.filter(is_professor=True).iterator():
+            nome = ' '.join(filter(None, [user.username, user.nome_completo, user.como_deseja_ser_chamado]))
+            schema_editor.execute(
+                """
+                INSERT INTO users_professor_busca (user_id, documento) VALUES (
+                    %s,
+                    setweight(to_tsvector('portuguese', %s), 'A') ||
+                    setweight(to_tsvector('portuguese', %s), 'B') ||
+                    setweight(to_tsvector('portuguese', %s), 'C')
+                )
+                ON CONFLICT (user_id) DO UPDATE SET documento = EXCLUDED.documento
+                """,
+                [user.pk, normalizar(disciplinas.get(user.pk)), normalizar(nome), normalizar(user.cidade)],
+            )
+
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE users_professor_trigramas USING fts5(texto, tokenize = 'trigram')"
+        )
+        schema_editor.execute(
+            "INSERT INTO users_professor_trigramas (rowid, texto) "
+            "SELECT user_id, texto_busca FROM users_professorlisting"
+        )
+
+
+def desfazer_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS listagem_texto_busca_trgm")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS users_professor_trigramas")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_avaliacoes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professorlisting',
+            name='texto_busca',
+            field=models.TextField(blank=True, default='', verbose_name='Texto de Busca (Normalizado)'),
+        ),
+        migrations.RunPython(preparar_busca, desfazer_busca),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_versao_registros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assunto', models.CharField(max_length=255, verbose_name='Assunto')),
+                ('corpo', models.TextField(verbose_name='Corpo')),
+                ('html', models.BooleanField(default=False, verbose_name='Corpo em HTML')),
+                ('remetente', models.CharField(max_length=254, verbose_name='Remetente')),
+                ('destinatarios', models.JSONField(default=list, verbose_name='Destinatários')),
+                ('responder_para', models.JSONField(blank=True, default=list, verbose_name='Responder Para')),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('E', 'Enviado'), ('F', 'Falhou (desistiu)')], default='P', max_length=1, verbose_name='Status')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_envio', models.DateTimeField(blank=True, null=True, verbose_name='Data de Envio')),
+            ],
+            options={
+                'verbose_name': 'E-mail na Fila',
+                'verbose_name_plural': 'Fila de E-mails',
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='outbox_pendentes_idx')],
+            },
+        ),
+    ]
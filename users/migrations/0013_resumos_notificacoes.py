@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:04
+
+"""
+Preferência de notificação dos professores e controle de aviso das mensagens.
+
+As mensagens que já existiam foram avisadas por e-mail na hora do envio:
+elas são marcadas como notificadas, para não entrarem no primeiro resumo.
+"""
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def marcar_notificadas(apps, schema_editor):
+    ContactProfessor = apps.get_model('users', 'ContactProfessor')
+    ContactProfessor.objects.filter(notificado_em__isnull=True).update(notificado_em=F('data_envio'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_fila_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactprofessor',
+            name='email_resposta',
+            field=models.EmailField(blank=True, max_length=254, verbose_name='E-mail para Resposta'),
+        ),
+        migrations.AddField(
+            model_name='contactprofessor',
+            name='notificado_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Professor Notificado em'),
+        ),
+        migrations.AddField(
+            model_name='professorprofile',
+            name='frequencia_notificacoes',
+            field=models.CharField(choices=[('I', 'Um e-mail a cada mensagem'), ('H', 'Resumo a cada hora'), ('D', 'Resumo diário')], default='I', help_text='Com o resumo, você recebe todas as mensagens do período em um só e-mail.', max_length=1, verbose_name='Avisos de Novas Mensagens'),
+        ),
+        migrations.RunPython(marcar_notificadas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contactprofessor',
+            index=models.Index(condition=models.Q(('notificado_em__isnull', True)), fields=['professor', 'data_envio'], name='contato_sem_aviso_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_resumos_notificacoes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactprofessor',
+            index=models.Index(fields=['aluno', 'professor', 'data_envio'], name='contato_aluno_professor_idx'),
+        ),
+    ]
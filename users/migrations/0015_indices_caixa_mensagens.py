@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_indice_limite_contatos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactprofessor',
+            index=models.Index(fields=['professor', '-data_envio'], name='contato_recebidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactprofessor',
+            index=models.Index(fields=['aluno', '-data_envio'], name='contato_enviadas_idx'),
+        ),
+    ]
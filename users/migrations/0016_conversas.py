@@ -0,0 +1,90 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:09
+
+"""
+Conversas (uma por dupla aluno + professor) e o vínculo das mensagens.
+
+As conversas das mensagens já existentes são criadas a partir do
+histórico: uma consulta agregada (GROUP BY aluno, professor) e um UPDATE
+por conversa para ligar as mensagens a ela.
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def criar_conversas(apps, schema_editor):
+    ContactProfessor = apps.get_model('users', 'ContactProfessor')
+    Conversa = apps.get_model('users', 'Conversa')
+
+    duplas = (
+        ContactProfessor.objects.values('aluno_id', 'professor_id')
+        .annotate(total=Count('pk'), nao_lidas=Count('pk', filter=Q(lida=False)), ultima=Max('data_envio'))
+        .order_by()
+    )
+    for dupla in duplas.iterator():
+        mensagens = ContactProfessor.objects.filter(
+            aluno_id=dupla['aluno_id'], professor_id=dupla['professor_id']
+        )
+        ultima = mensagens.order_by('-data_envio', '-pk').first()
+        conversa = Conversa.objects.create(
+            aluno_id=dupla['aluno_id'],
+            professor_id=dupla['professor_id'],
+            ultima_mensagem_em=dupla['ultima'],
+            ultimo_assunto=ultima.assunto,
+            previa=ultima.mensagem[:140],
+            total_mensagens=dupla['total'],
+            nao_lidas_professor=dupla['nao_lidas'],
+        )
+        mensagens.update(conversa=conversa)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_indices_caixa_mensagens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_mensagem_em', models.DateTimeField(blank=True, null=True, verbose_name='Última Mensagem em')),
+                ('ultimo_assunto', models.CharField(blank=True, max_length=150, verbose_name='Último Assunto')),
+                ('previa', models.CharField(blank=True, max_length=140, verbose_name='Prévia')),
+                ('total_mensagens', models.PositiveIntegerField(default=0, verbose_name='Total de Mensagens')),
+                ('nao_lidas_professor', models.PositiveIntegerField(default=0, verbose_name='Não Lidas pelo Professor')),
+                ('nao_lidas_aluno', models.PositiveIntegerField(default=0, verbose_name='Não Lidas pelo Aluno')),
+                ('aluno', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='conversas_como_aluno', to=settings.AUTH_USER_MODEL, verbose_name='Aluno')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversas_como_professor', to=settings.AUTH_USER_MODEL, verbose_name='Professor')),
+            ],
+            options={
+                'verbose_name': 'Conversa',
+                'verbose_name_plural': 'Conversas',
+            },
+        ),
+        migrations.AddField(
+            model_name='contactprofessor',
+            name='conversa',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mensagens', to='users.conversa', verbose_name='Conversa'),
+        ),
+        migrations.RunPython(criar_conversas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contactprofessor',
+            index=models.Index(fields=['conversa', '-data_envio'], name='contato_conversa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversa',
+            index=models.Index(fields=['professor', '-ultima_mensagem_em'], name='conversa_professor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversa',
+            index=models.Index(fields=['aluno', '-ultima_mensagem_em'], name='conversa_aluno_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversa',
+            constraint=models.UniqueConstraint(fields=('aluno', 'professor'), name='conversa_unica_por_dupla'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:10
+
+"""
+Contador desnormalizado de mensagens não lidas no usuário (menu).
+
+O valor inicial é calculado em UM UPDATE com subconsulta (COUNT das
+mensagens não lidas de cada professor), sem carregar os usuários.
+"""
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def calcular_nao_lidas(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    ContactProfessor = apps.get_model('users', 'ContactProfessor')
+
+    nao_lidas = (
+        ContactProfessor.objects.filter(professor=OuterRef('pk'), lida=False)
+        .order_by().values('professor').annotate(total=Count('pk')).values('total')
+    )
+    com_nao_lidas = ContactProfessor.objects.filter(lida=False).values('professor_id')
+    CustomUser.objects.filter(pk__in=com_nao_lidas).update(
+        mensagens_nao_lidas=Coalesce(Subquery(nao_lidas, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_conversas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='mensagens_nao_lidas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Mensagens Não Lidas'),
+        ),
+        migrations.RunPython(calcular_nao_lidas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_contador_nao_lidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MensagemArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('assunto', models.CharField(max_length=150, verbose_name='Assunto')),
+                ('mensagem', models.TextField(verbose_name='Mensagem')),
+                ('lida', models.BooleanField(default=True, verbose_name='Lida pelo Professor')),
+                ('data_envio', models.DateTimeField(verbose_name='Data de Envio')),
+                ('email_resposta', models.EmailField(blank=True, max_length=254, verbose_name='E-mail para Resposta')),
+                ('notificado_em', models.DateTimeField(blank=True, null=True, verbose_name='Professor Notificado em')),
+                ('arquivada_em', models.DateTimeField(verbose_name='Arquivada em')),
+            ],
+            options={
+                'verbose_name': 'Mensagem Arquivada',
+                'verbose_name_plural': 'Mensagens Arquivadas',
+                'ordering': ['-data_envio'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contactprofessor',
+            index=models.Index(fields=['data_envio'], name='contato_data_envio_idx'),
+        ),
+        migrations.AddField(
+            model_name='mensagemarquivada',
+            name='aluno',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mensagens_arquivadas_enviadas', to=settings.AUTH_USER_MODEL, verbose_name='Aluno Remetente'),
+        ),
+        migrations.AddField(
+            model_name='mensagemarquivada',
+            name='conversa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mensagens_arquivadas', to='users.conversa', verbose_name='Conversa'),
+        ),
+        migrations.AddField(
+            model_name='mensagemarquivada',
+            name='professor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mensagens_arquivadas_recebidas', to=settings.AUTH_USER_MODEL, verbose_name='Professor Destinatário'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagemarquivada',
+            index=models.Index(fields=['conversa', '-data_envio'], name='arquivada_conversa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagemarquivada',
+            index=models.Index(fields=['professor', '-data_envio'], name='arquivada_recebidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagemarquivada',
+            index=models.Index(fields=['aluno', '-data_envio'], name='arquivada_enviadas_idx'),
+        ),
+    ]
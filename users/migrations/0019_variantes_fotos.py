@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_arquivo_mensagens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='foto_perfil_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da Foto de Perfil'),
+        ),
+        migrations.AddField(
+            model_name='professorlisting',
+            name='foto_perfil_variantes',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Variantes da Foto de Perfil'),
+        ),
+        migrations.AddField(
+            model_name='professorprofile',
+            name='foto_profissional_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da Foto Profissional'),
+        ),
+    ]
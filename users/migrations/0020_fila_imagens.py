@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0019_variantes_fotos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaImagem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID do Registro')),
+                ('campo', models.CharField(max_length=50, verbose_name='Campo')),
+                ('arquivo', models.CharField(max_length=255, verbose_name='Arquivo')),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('C', 'Concluída'), ('F', 'Falhou (desistiu)')], default='P', max_length=1, verbose_name='Status')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Data de Conclusão')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Imagem',
+                'verbose_name_plural': 'Fila de Imagens',
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='imagem_pendentes_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'P')), fields=('modelo', 'objeto_id', 'campo'), name='imagem_pendente_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:44
+
+"""
+'Conversa.ultima_mensagem_em' passa a ser obrigatório (NOT NULL).
+
+Antes de alterar a coluna, as conversas sem data recebem a data da última
+mensagem delas (ou a data atual, se não tiverem nenhuma).
+"""
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+
+
+def preencher_datas(apps, schema_editor):
+    Conversa = apps.get_model('users', 'Conversa')
+    ContactProfessor = apps.get_model('users', 'ContactProfessor')
+    ultima = (
+        ContactProfessor.objects.filter(conversa_id=OuterRef('pk'))
+        .order_by().values('conversa_id').annotate(ultima=Max('data_envio')).values('ultima')
+    )
+    Conversa.objects.filter(ultima_mensagem_em__isnull=True).update(
+        ultima_mensagem_em=Coalesce(Subquery(ultima), Now())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_fila_imagens'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_datas, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='conversa',
+            name='ultima_mensagem_em',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Última Mensagem em'),
+        ),
+    ]
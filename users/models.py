@@ -5,15 +5,31 @@ Este arquivo contém a estrutura de todo o banco de dados do aplicativo:
 1. CustomUserManager: Gerencia a criação de usuários.
 2. CustomUser: A tabela central de usuários (alunos e professores).
 3. ProfessorProfile: Uma extensão do CustomUser com dados de professor.
-4. ContactProfessor: A tabela que armazena as mensagens de contato.
+4. Disciplina: O catálogo normalizado de disciplinas lecionadas.
+5. ProfessorListing: Cópia "achatada" dos professores ativos, só para leitura.
+6. CepCoordenada: Tabela de referência CEP -> latitude/longitude (busca "perto de mim").
+7. ContactProfessor: A tabela que armazena as mensagens de contato.
+8. Conversa: O resumo de cada conversa (aluno + professor) da caixa de mensagens.
+9. Avaliacao: As avaliações (nota de 1 a 5 + comentário) dos alunos aos professores.
+10. EmailOutbox: A fila de e-mails a enviar (entregues em segundo plano).
 """
 
-from django.db import models
+import re
+
+from django.db import models, transaction
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast, Greatest, Now, Round
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.conf import settings
+from django.core.mail import EmailMessage
+from django.utils import timezone
+from django.utils.text import Truncator, slugify
+
+from . import busca, cache_paginas, geracoes, imagens
 
 # ==============================================================================
 # 1. CUSTOM USER MANAGER
@@ -89,9 +105,18 @@ class CustomUser(AbstractUser):
     # --- Localização ---
     cidade = models.CharField(_('Cidade'), max_length=100, blank=True)
     cep = models.CharField(_('CEP'), max_length=10, blank=True)
+    # Coordenadas do CEP, copiadas da tabela 'CepCoordenada' a cada 'save()'.
+    # Ficam vazias se o CEP não estiver na tabela de referência.
+    latitude = models.FloatField(_('Latitude'), null=True, blank=True, editable=False)
+    longitude = models.FloatField(_('Longitude'), null=True, blank=True, editable=False)
     
     # --- Campos de Perfil Detalhado (Aluno/Geral) ---
     foto_perfil = models.ImageField(_('Foto de Perfil'), upload_to='profile_pics/', null=True, blank=True)
+    # Larguras e formatos das versões reduzidas da foto (ver 'imagens.py'),
+    # preenchido pelo worker de imagens ('TarefaImagem'); {'pendente': True}
+    # enquanto a foto enviada espera, {'falhou': True} se o worker desistiu.
+    # Ex: {'larguras': [32, 64, 288], 'formatos': ['webp', 'jpg']}
+    foto_perfil_variantes = models.JSONField(_('Variantes da Foto de Perfil'), default=dict, blank=True, editable=False)
     escolaridade = models.TextField(_('Escolaridade'), blank=True)
     interesses = models.TextField(_('Interesses e Hobbies'), blank=True)
     historico_aprendizagem = models.TextField(_('Histórico de Aprendizagem (Aluno)'), blank=True)
@@ -102,6 +127,18 @@ class CustomUser(AbstractUser):
     is_professor = models.BooleanField(_('É Professor'), default=False, 
         help_text=_('Designa se este usuário ativou a modalidade professor.')
     )
+
+    # --- Versão ---
+    # Atualizado automaticamente a cada 'save()' (serve de "versão" do registro)
+    atualizado_em = models.DateTimeField(_('Atualizado em'), auto_now=True)
+
+    # --- Contador de Mensagens Não Lidas ---
+    # Cópia "desnormalizada" da quantidade de mensagens recebidas e ainda não
+    # lidas, mostrada no menu de TODAS as páginas. Como a linha do usuário já
+    # é carregada a cada requisição (login), ler o contador não custa nenhuma
+    # consulta. É mantido só por UPDATEs atômicos (ver 'Conversa'), nunca
+    # pelo 'save()' de um objeto carregado antes.
+    mensagens_nao_lidas = models.PositiveIntegerField(_('Mensagens Não Lidas'), default=0, editable=False)
     
     # --- Configuração do Modelo ---
     objects = CustomUserManager() # Usa o gerenciador customizado
@@ -120,6 +157,42 @@ class CustomUser(AbstractUser):
     def get_full_name(self):
         # Método usado pelo Django para obter o nome principal
         return self.nome_completo
+
+    # Campos mantidos só por UPDATEs atômicos (nunca pelo 'save()')
+    CAMPOS_CONTADORES = ('mensagens_nao_lidas',)
+    # Preenchido pelo worker de imagens; só é gravado quando a foto muda
+    CAMPOS_DE_VARIANTES = ('foto_perfil_variantes',)
+
+    def save(self, *args, **kwargs):
+        # Um usuário carregado ANTES de uma nova mensagem (ou do fim do
+        # processamento da foto) ainda tem os valores antigos em memória:
+        # os saves completos não gravam esses campos.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_CONTADORES + self.CAMPOS_DE_VARIANTES
+            ]
+
+        # Materializa as coordenadas do CEP. Saves parciais que não incluem
+        # o 'cep' (ex: o 'last_login' a cada login) não fazem a consulta.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'cep' in update_fields:
+            self.latitude, self.longitude = CepCoordenada.localizar(self.cep) or (None, None)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'latitude', 'longitude'}
+
+        # Foto nova: o original é gravado agora e as versões reduzidas ficam
+        # para o worker de imagens (ver 'TarefaImagem')
+        variantes = None
+        if update_fields is None or 'foto_perfil' in update_fields:
+            variantes = imagens.variantes_no_envio(self.foto_perfil)
+            if variantes is not None:
+                self.foto_perfil_variantes = variantes
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(kwargs['update_fields']) | {'foto_perfil_variantes'}
+        super().save(*args, **kwargs)
+        if variantes == imagens.PENDENTE:
+            TarefaImagem.enfileirar(self, 'foto_perfil')
     
 # ==============================================================================
 # 3. PERFIL DE EXTENSÃO: PROFESSOR PROFILE
@@ -142,9 +215,18 @@ class ProfessorProfile(models.Model):
     )
     
     # --- Informações Profissionais ---
+    # 'disciplinas' é o texto livre digitado pelo professor.
+    # 'lista_disciplinas' é a versão normalizada (uma linha por disciplina),
+    # gerada automaticamente a partir do texto pelo signal 'sincronizar_disciplinas'.
     disciplinas = models.TextField(_('Disciplinas Lecionadas'), 
         help_text=_('Ex: Matemática, Física, Português. Separe por vírgulas.')
     )
+    lista_disciplinas = models.ManyToManyField(
+        'Disciplina',
+        blank=True,
+        related_name='professores', # Permite acesso reverso: disciplina.professores
+        verbose_name=_('Disciplinas (Normalizadas)')
+    )
     tarifa_hora = models.DecimalField(_('Tarifa por Hora (R$)'), max_digits=6, decimal_places=2, null=True, blank=True)
     curriculum = models.TextField(_('Conteúdo do Currículo'), blank=True, 
         help_text=_('Experiência profissional relevante, certificações, etc.')
@@ -160,6 +242,8 @@ class ProfessorProfile(models.Model):
     foto_profissional = models.ImageField(_('Foto Profissional'), upload_to='professor_pics/', null=True, blank=True, 
         help_text=_('Uma foto específica para seu perfil profissional.')
     )
+    # Versões reduzidas da foto profissional (ver 'imagens.py')
+    foto_profissional_variantes = models.JSONField(_('Variantes da Foto Profissional'), default=dict, blank=True, editable=False)
 
     # --- Configurações e Status ---
     MODALIDADE_CHOICES = (
@@ -174,10 +258,33 @@ class ProfessorProfile(models.Model):
     aceita_online = models.BooleanField(_('Aceita Aulas Online'), default=False)
     aceita_grupo = models.BooleanField(_('Aceita Aulas em Grupo'), default=False)
     status_ativo = models.BooleanField(_('Ativamente Aceitando Alunos'), default=True)
+
+    # --- Notificações de Novas Mensagens ---
+    # Com um resumo, as mensagens do período chegam juntas em UM e-mail
+    # (ver o comando 'enviar_resumos_contatos').
+    class FrequenciaNotificacao(models.TextChoices):
+        IMEDIATA = 'I', _('Um e-mail a cada mensagem')
+        HORA = 'H', _('Resumo a cada hora')
+        DIA = 'D', _('Resumo diário')
+
+    frequencia_notificacoes = models.CharField(
+        _('Avisos de Novas Mensagens'), max_length=1,
+        choices=FrequenciaNotificacao.choices, default=FrequenciaNotificacao.IMEDIATA,
+        help_text=_('Com o resumo, você recebe todas as mensagens do período em um só e-mail.')
+    )
     data_validacao = models.DateField(_('Data de Ativação do Perfil'), null=True, blank=True)
     
-    # --- Métricas (a serem calculadas por outra lógica) ---
+    # --- Métricas das Avaliações ---
+    # Mantidas de forma INCREMENTAL a cada avaliação criada, editada ou
+    # excluída (ver 'registrar_avaliacao'), nunca com um AVG() por página.
+    # Podem ser recalculadas do zero com: python manage.py recalcular_avaliacoes
     media_avaliacoes = models.DecimalField(_('Média de Avaliações'), max_digits=3, decimal_places=2, default=0.00)
+    total_avaliacoes = models.PositiveIntegerField(_('Total de Avaliações'), default=0)
+    soma_notas = models.PositiveIntegerField(_('Soma das Notas'), default=0)
+
+    # --- Versão ---
+    # Atualizado automaticamente a cada 'save()' e em 'registrar_avaliacao'
+    atualizado_em = models.DateTimeField(_('Atualizado em'), auto_now=True)
 
     class Meta:
         verbose_name = _('Perfil de Professor')
@@ -186,9 +293,332 @@ class ProfessorProfile(models.Model):
     def __str__(self):
         return f"Perfil de {self.user.get_full_name()}"
 
+    # Campos mantidos só por 'registrar_avaliacao' (nunca pelo formulário)
+    CAMPOS_DE_AVALIACAO = ('media_avaliacoes', 'total_avaliacoes', 'soma_notas')
+
+    def save(self, *args, **kwargs):
+        # Um perfil carregado ANTES de uma nova avaliação ainda tem a média
+        # antiga em memória. Para que salvar o formulário não sobrescreva a
+        # métrica recém-atualizada, os saves completos não gravam esses
+        # campos e relêem os valores atuais (usados pelos signals da listagem).
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            self.refresh_from_db(fields=self.CAMPOS_DE_AVALIACAO)
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_DE_AVALIACAO
+                and campo.name != 'foto_profissional_variantes' # Preenchido pelo worker de imagens
+            ]
+
+        # Foto nova: o original é gravado agora e as versões reduzidas ficam
+        # para o worker de imagens (ver 'TarefaImagem')
+        variantes = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'foto_profissional' in update_fields:
+            variantes = imagens.variantes_no_envio(self.foto_profissional)
+            if variantes is not None:
+                self.foto_profissional_variantes = variantes
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'foto_profissional_variantes'}
+        super().save(*args, **kwargs)
+        if variantes == imagens.PENDENTE:
+            TarefaImagem.enfileirar(self, 'foto_profissional')
+
+    @classmethod
+    def registrar_avaliacao(cls, user_id, delta_soma, delta_total):
+        """
+        Aplica a variação de uma avaliação às métricas do professor, em um
+        único UPDATE atômico (sem ler o valor antigo em Python, então duas
+        avaliações simultâneas não se sobrescrevem).
+
+        Ex: nova nota 4 -> (4, +1) | nota editada de 2 para 5 -> (3, 0)
+            avaliação excluída com nota 3 -> (-3, -1)
+
+        Também copia a nova média para a linha da listagem ('ProfessorListing').
+        Deve ser chamado dentro da mesma transação que grava a avaliação.
+        """
+        soma = F('soma_notas') + delta_soma
+        total = F('total_avaliacoes') + delta_total
+        # No SQL, o lado direito do SET usa os valores ANTIGOS da linha.
+        # Por isso "novo total > 0" é escrito como "total antigo > -delta".
+        media = Case(
+            When(total_avaliacoes__gt=-delta_total, then=Round(Cast(soma, FloatField()) / Cast(total, FloatField()), 2)),
+            default=Value(0.0),
+        )
+        cls.objects.filter(user_id=user_id).update(
+            soma_notas=soma,
+            total_avaliacoes=total,
+            media_avaliacoes=Cast(media, models.DecimalField(max_digits=3, decimal_places=2)),
+            atualizado_em=Now(),
+        )
+        ProfessorListing.objects.filter(user_id=user_id).update(
+            media_avaliacoes=Subquery(cls.objects.filter(user_id=OuterRef('user_id')).values('media_avaliacoes')[:1]),
+            total_avaliacoes=Subquery(cls.objects.filter(user_id=OuterRef('user_id')).values('total_avaliacoes')[:1]),
+            atualizado_em=Now(), # Nova versão do card (ver 'cards.py')
+        )
+        # O 'update()' não dispara signals: invalida os caches da listagem
+        geracoes.avancar_no_commit('listagem')
+
+
+# ==============================================================================
+# 4. CATÁLOGO DE DISCIPLINAS
+# ==============================================================================
+
+class Disciplina(models.Model):
+    """
+    Uma disciplina lecionada na plataforma (ex: "Física").
+
+    O 'slug' é a forma normalizada do nome (sem acentos, minúsculo), usada
+    para deduplicar variações ("Física", "fisica", " FÍSICA ") e como
+    filtro na URL (ex: /?disciplina=fisica). Como é único, ele é indexado.
+    """
+    nome = models.CharField(_('Nome'), max_length=100)
+    slug = models.SlugField(_('Identificador'), max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = _('Disciplina')
+        verbose_name_plural = _('Disciplinas')
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+    @staticmethod
+    def separar_texto(texto):
+        """
+        Divide o texto livre de disciplinas em uma lista de (slug, nome),
+        sem repetições e na ordem em que foram digitadas.
+
+        Ex: "Matemática, Física; matematica" -> [('matematica', 'Matemática'), ('fisica', 'Física')]
+        """
+        vistos = {}
+        for parte in re.split(r'[,;\n]', texto or ''):
+            nome = ' '.join(parte.split()) # Remove espaços duplicados
+            slug = slugify(nome)[:100]
+            if slug and slug not in vistos:
+                vistos[slug] = nome[:100]
+        return list(vistos.items())
+
+    @classmethod
+    def a_partir_do_texto(cls, texto):
+        """
+        Retorna as instâncias de 'Disciplina' citadas no texto, criando as
+        que ainda não existem no catálogo.
+        """
+        itens = cls.separar_texto(texto)
+        existentes = {d.slug: d for d in cls.objects.filter(slug__in=[slug for slug, _nome in itens])}
+        disciplinas = []
+        for slug, nome in itens:
+            if slug not in existentes:
+                existentes[slug], _criada = cls.objects.get_or_create(slug=slug, defaults={'nome': nome})
+            disciplinas.append(existentes[slug])
+        return disciplinas
+
+
+# ==============================================================================
+# 5. LISTAGEM DESNORMALIZADA: PROFESSOR LISTING
+# ==============================================================================
+
+class ProfessorListing(models.Model):
+    """
+    Documento de leitura da listagem pública de professores.
+
+    Cada linha é uma cópia "achatada" de um professor ATIVO, com apenas os
+    campos que o card exibe e as colunas usadas em filtros. Assim, as
+    páginas de listagem e de voluntários leem uma única tabela, sem juntar
+    'CustomUser' com 'ProfessorProfile' a cada requisição.
+
+    IMPORTANTE: Esta tabela NÃO deve ser editada diretamente. Ela é mantida
+    pelos signals no final deste arquivo e pode ser reconstruída a qualquer
+    momento com: python manage.py rebuild_professor_listing
+    """
+
+    # A chave primária é o próprio usuário (ProfessorListing.pk == CustomUser.pk)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listagem'
+    )
+
+    # --- Campos do Card ---
+    username = models.CharField(_('Username'), max_length=150)
+    nome_exibicao = models.CharField(_('Nome de Exibição'), max_length=150)
+    foto_perfil = models.ImageField(_('Foto de Perfil'), blank=True)
+    foto_perfil_variantes = models.JSONField(_('Variantes da Foto de Perfil'), default=dict, blank=True)
+    cidade = models.CharField(_('Cidade'), max_length=100, blank=True)
+    # Lista de {'nome': ..., 'slug': ...}, na ordem digitada pelo professor
+    disciplinas = models.JSONField(_('Disciplinas'), default=list, blank=True)
+    modalidades = models.CharField(_('Modalidades de Aula'), max_length=2, choices=ProfessorProfile.MODALIDADE_CHOICES, blank=True)
+    tarifa_hora = models.DecimalField(_('Tarifa por Hora (R$)'), max_digits=6, decimal_places=2, null=True, blank=True)
+    media_avaliacoes = models.DecimalField(_('Média de Avaliações'), max_digits=3, decimal_places=2, default=0)
+    total_avaliacoes = models.PositiveIntegerField(_('Total de Avaliações'), default=0)
+
+    # --- Colunas de Filtro ---
+    is_voluntario = models.BooleanField(_('É Voluntário'), default=False)
+    aceita_online = models.BooleanField(_('Aceita Aulas Online'), default=False)
+    aceita_grupo = models.BooleanField(_('Aceita Aulas em Grupo'), default=False)
+    # Nome, cidade e disciplinas em minúsculas e sem acentos, para a busca
+    # aproximada por trigramas (ver 'busca.py')
+    texto_busca = models.TextField(_('Texto de Busca (Normalizado)'), blank=True, default='')
+    latitude = models.FloatField(_('Latitude'), null=True, blank=True)
+    longitude = models.FloatField(_('Longitude'), null=True, blank=True)
+
+    # --- Versão do Card ---
+    # Muda sempre que a linha é gravada; faz parte da chave do card
+    # renderizado no cache (ver 'cards.py'), então um card antigo nunca é reusado.
+    atualizado_em = models.DateTimeField(_('Atualizado em'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Professor (Listagem)')
+        verbose_name_plural = _('Professores (Listagem)')
+        indexes = [
+            # Ordenação padrão da listagem (username, pk)
+            models.Index(fields=['username', 'user'], name='listagem_username_idx'),
+            # Página de voluntários: filtra e ordena pelo mesmo índice
+            models.Index(fields=['is_voluntario', 'username', 'user'], name='listagem_voluntario_idx'),
+            # Faceta de cidade: filtro por cidade e contagem agrupada (GROUP BY)
+            models.Index(fields=['cidade', 'username', 'user'], name='listagem_cidade_idx'),
+            # Busca "perto de mim": a faixa de latitude da caixa delimitadora
+            # é lida direto do índice (ver 'geo.py')
+            models.Index(fields=['latitude', 'longitude'], name='listagem_coordenadas_idx'),
+            # Filtro por faixa de preço e ordenação por preço (nos dois
+            # sentidos, percorrendo o índice de trás para frente)
+            models.Index(fields=['tarifa_hora', 'user'], name='listagem_preco_idx'),
+            # Ordenação pelos mais bem avaliados
+            models.Index(fields=['media_avaliacoes', 'user'], name='listagem_avaliacao_idx'),
+        ]
+
+    def __str__(self):
+        return self.nome_exibicao
+
+    @staticmethod
+    def dados_do_professor(user, perfil):
+        """
+        Monta os valores de uma linha da listagem a partir do usuário e do
+        seu perfil de professor (usado pelos signals e pelo comando de rebuild).
+        """
+        disciplinas = Disciplina.separar_texto(perfil.disciplinas)
+        return {
+            'username': user.username,
+            'nome_exibicao': user.como_deseja_ser_chamado or user.username,
+            'foto_perfil': user.foto_perfil.name or '',
+            'foto_perfil_variantes': user.foto_perfil_variantes,
+            'cidade': user.cidade,
+            'disciplinas': [{'nome': nome, 'slug': slug} for slug, nome in disciplinas],
+            'modalidades': perfil.modalidades,
+            'tarifa_hora': perfil.tarifa_hora,
+            'media_avaliacoes': perfil.media_avaliacoes,
+            'total_avaliacoes': perfil.total_avaliacoes,
+            'is_voluntario': perfil.is_voluntario,
+            'aceita_online': perfil.aceita_online,
+            'aceita_grupo': perfil.aceita_grupo,
+            'latitude': user.latitude,
+            'longitude': user.longitude,
+            'texto_busca': busca.texto_busca(user, [nome for _slug, nome in disciplinas]),
+        }
+
+    @classmethod
+    def sincronizar(cls, user):
+        """
+        Cria, atualiza ou remove a linha de um professor, conforme ele
+        deva (ou não) aparecer na listagem pública.
+        """
+        try:
+            perfil = user.professorprofile
+        except ProfessorProfile.DoesNotExist:
+            perfil = None
+
+        if not (user.is_professor and perfil is not None and perfil.status_ativo):
+            cls.objects.filter(user=user).delete()
+            return
+
+        dados = cls.dados_do_professor(user, perfil)
+        linha = cls.objects.filter(user=user).first()
+        if linha is None:
+            cls.objects.create(user=user, **dados)
+        elif any(getattr(linha, campo) != valor for campo, valor in dados.items()):
+            # Só grava se algo visível mudou. Saves que não alteram o card
+            # (ex: o 'last_login' atualizado a cada login) não tocam a tabela
+            # e, portanto, não invalidam os caches da listagem.
+            for campo, valor in dados.items():
+                setattr(linha, campo, valor)
+            linha.save()
+
+
+# ==============================================================================
+# 6. REFERÊNCIA GEOGRÁFICA: CEP -> COORDENADAS
+# ==============================================================================
+
+class CepCoordenada(models.Model):
+    """
+    Tabela de referência (offline) com a latitude/longitude de cada CEP.
+
+    É preenchida a partir de um arquivo local com:
+        python manage.py carregar_ceps caminho/para/ceps.csv
+
+    O 'cep' guardado tem apenas dígitos: 8 (CEP completo) ou 5 (região,
+    usado quando o arquivo só traz a coordenada aproximada da região).
+    """
+    cep = models.CharField(_('CEP'), max_length=8, primary_key=True)
+    latitude = models.FloatField(_('Latitude'))
+    longitude = models.FloatField(_('Longitude'))
+
+    class Meta:
+        verbose_name = _('Coordenada de CEP')
+        verbose_name_plural = _('Coordenadas de CEPs')
+
+    def __str__(self):
+        return f"{self.cep} ({self.latitude}, {self.longitude})"
+
+    @staticmethod
+    def normalizar(cep):
+        """
+        Mantém só os dígitos do CEP. Retorna '' se não sobrar um CEP
+        completo (8 dígitos) ou uma região (5 dígitos).
+
+        Ex: "50.030-230" -> "50030230"
+        """
+        digitos = re.sub(r'\D', '', cep or '')
+        return digitos if len(digitos) in (5, 8) else ''
+
+    @classmethod
+    def localizar_varios(cls, ceps):
+        """
+        Retorna {cep: (latitude, longitude)} para os CEPs encontrados, em
+        UMA consulta. Se o CEP completo não estiver na tabela, usa a
+        coordenada da sua região (os 5 primeiros dígitos).
+        """
+        normalizados = {cep: cls.normalizar(cep) for cep in ceps}
+        chaves = set()
+        for digitos in normalizados.values():
+            if digitos:
+                chaves.update((digitos, digitos[:5]))
+        if not chaves:
+            return {}
+
+        linhas = {
+            cep: (latitude, longitude)
+            for cep, latitude, longitude in cls.objects.filter(cep__in=chaves).values_list('cep', 'latitude', 'longitude')
+        }
+        resultado = {}
+        for cep, digitos in normalizados.items():
+            coordenadas = linhas.get(digitos) or linhas.get(digitos[:5])
+            if coordenadas:
+                resultado[cep] = coordenadas
+        return resultado
+
+    @classmethod
+    def localizar(cls, cep):
+        """
+        Retorna (latitude, longitude) de um CEP, ou None se desconhecido.
+        """
+        if not cls.normalizar(cep):
+            return None
+        return cls.localizar_varios([cep]).get(cep)
+
 
 # ==============================================================================
-# 4. MODELO DE CONTATO: CONTACT PROFESSOR
+# 7. MODELO DE CONTATO: CONTACT PROFESSOR
 # ==============================================================================
 
 class ContactProfessor(models.Model):
@@ -225,23 +655,511 @@ class ContactProfessor(models.Model):
     assunto = models.CharField(_('Assunto'), max_length=150)
     mensagem = models.TextField(_('Mensagem'))
     
+    # 'conversa': A conversa (aluno + professor) à qual a mensagem pertence.
+    # Preenchida automaticamente no 'save()' (ver 'Conversa.registrar_mensagem').
+    conversa = models.ForeignKey(
+        'Conversa',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='mensagens',
+        verbose_name=_('Conversa')
+    )
+    
     # --- Metadados ---
     lida = models.BooleanField(_('Lida pelo Professor'), default=False)
     data_envio = models.DateTimeField(_('Data de Envio'), auto_now_add=True) # Preenchido automaticamente
+
+    # --- Notificação do Professor ---
+    # 'email_resposta': o e-mail confirmado pelo aluno no formulário (usado
+    # no "Responder" e nos resumos, que são montados depois da requisição).
+    # 'notificado_em': quando o professor recebeu o aviso por e-mail. Fica
+    # vazio até o próximo resumo, se o professor preferir resumos.
+    email_resposta = models.EmailField(_('E-mail para Resposta'), blank=True)
+    notificado_em = models.DateTimeField(_('Professor Notificado em'), null=True, blank=True)
     
     class Meta:
         verbose_name = _('Mensagem de Contato')
         verbose_name_plural = _('Mensagens de Contato')
         # Ordena as mensagens da mais nova para a mais antiga por padrão
         ordering = ['-data_envio']
+        indexes = [
+            # Abas "Recebidas" e "Enviadas" de 'minhas_mensagens' (mais novas primeiro)
+            models.Index(fields=['professor', '-data_envio'], name='contato_recebidas_idx'),
+            models.Index(fields=['aluno', '-data_envio'], name='contato_enviadas_idx'),
+            # Contagem do limite de mensagens (ver 'limites.py'), quando o cache está frio
+            models.Index(fields=['aluno', 'professor', 'data_envio'], name='contato_aluno_professor_idx'),
+            # Mensagens de uma conversa aberta (mais novas primeiro)
+            models.Index(fields=['conversa', '-data_envio'], name='contato_conversa_idx'),
+            # Mensagens antigas a arquivar (ver 'arquivo.py')
+            models.Index(fields=['data_envio'], name='contato_data_envio_idx'),
+            # Índice parcial: só as mensagens que ainda esperam um resumo
+            models.Index(
+                fields=['professor', 'data_envio'], name='contato_sem_aviso_idx',
+                condition=models.Q(notificado_em__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         aluno_str = self.aluno.username if self.aluno else _("Usuário Excluído")
         return f"Mensagem de {aluno_str} para {self.professor.username}"
 
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            return super().save(*args, **kwargs)
+        # Mensagem nova: grava e atualiza o resumo da conversa na MESMA transação
+        with transaction.atomic():
+            self.conversa = Conversa.da_dupla(self.aluno_id, self.professor_id)
+            super().save(*args, **kwargs)
+            Conversa.registrar_mensagem(self)
+
+
+class MensagemArquivada(models.Model):
+    """
+    Arquivo "frio" das mensagens antigas de 'ContactProfessor'.
+
+    O comando 'archive_messages' move para cá (em lotes, ver 'arquivo.py')
+    as mensagens mais velhas que settings.RETENCAO_MENSAGENS_MESES. Assim a
+    tabela principal, usada pela caixa de mensagens, pelo limite de taxa e
+    pelo Admin, guarda só as mensagens recentes.
+
+    As colunas têm os MESMOS nomes das de 'ContactProfessor' (o
+    'INSERT ... SELECT' do arquivamento depende disso) e a chave primária é
+    a mesma da mensagem original. As mensagens arquivadas continuam legíveis
+    na conversa ("Ver mensagens arquivadas") e na exportação, por consultas
+    separadas e mais lentas.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+
+    aluno = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='mensagens_arquivadas_enviadas',
+        verbose_name=_('Aluno Remetente')
+    )
+    professor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='mensagens_arquivadas_recebidas',
+        verbose_name=_('Professor Destinatário')
+    )
+    conversa = models.ForeignKey(
+        'Conversa',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='mensagens_arquivadas',
+        verbose_name=_('Conversa')
+    )
+
+    assunto = models.CharField(_('Assunto'), max_length=150)
+    mensagem = models.TextField(_('Mensagem'))
+    lida = models.BooleanField(_('Lida pelo Professor'), default=True)
+    data_envio = models.DateTimeField(_('Data de Envio'))
+    email_resposta = models.EmailField(_('E-mail para Resposta'), blank=True)
+    notificado_em = models.DateTimeField(_('Professor Notificado em'), null=True, blank=True)
+
+    # Quando a mensagem saiu da tabela principal
+    arquivada_em = models.DateTimeField(_('Arquivada em'))
+
+    class Meta:
+        verbose_name = _('Mensagem Arquivada')
+        verbose_name_plural = _('Mensagens Arquivadas')
+        ordering = ['-data_envio']
+        indexes = [
+            # Mensagens arquivadas de uma conversa (mais novas primeiro)
+            models.Index(fields=['conversa', '-data_envio'], name='arquivada_conversa_idx'),
+            # Exportação do histórico (ver 'exportacao.py')
+            models.Index(fields=['professor', '-data_envio'], name='arquivada_recebidas_idx'),
+            models.Index(fields=['aluno', '-data_envio'], name='arquivada_enviadas_idx'),
+        ]
+
+    def __str__(self):
+        aluno_str = self.aluno.username if self.aluno else _("Usuário Excluído")
+        return f"Mensagem arquivada de {aluno_str} para {self.professor.username}"
+
 
 # ==============================================================================
-# 5. SIGNALS (Automação entre Modelos)
+# 8. CONVERSAS: CONVERSA
+# ==============================================================================
+
+# Tamanho da prévia da última mensagem mostrada na caixa de mensagens
+TAMANHO_PREVIA = 140
+
+
+class Conversa(models.Model):
+    """
+    Resumo de uma conversa: todas as mensagens entre UM aluno e UM professor.
+
+    A caixa de mensagens lista as conversas (uma linha por dupla, já com a
+    data e a prévia da última mensagem e os contadores de não lidas), sem
+    agrupar o histórico inteiro a cada página. Os campos são atualizados
+    de forma INCREMENTAL a cada mensagem salva ('registrar_mensagem') ou
+    lida ('marcar_como_lida'); os textos completos só são carregados
+    quando a conversa é aberta.
+    """
+    # 'aluno' fica nulo se o aluno excluir a conta (as mensagens são mantidas)
+    aluno = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='conversas_como_aluno',
+        verbose_name=_('Aluno')
+    )
+    professor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='conversas_como_professor',
+        verbose_name=_('Professor')
+    )
+
+    # --- Resumo da última mensagem ---
+    # Nunca nulo (a paginação da caixa de mensagens ordena por ele): uma
+    # conversa nova recebe a data da criação, logo substituída pela da
+    # primeira mensagem em 'registrar_mensagem', na mesma transação.
+    ultima_mensagem_em = models.DateTimeField(_('Última Mensagem em'), default=timezone.now)
+    ultimo_assunto = models.CharField(_('Último Assunto'), max_length=150, blank=True)
+    previa = models.CharField(_('Prévia'), max_length=TAMANHO_PREVIA, blank=True)
+    total_mensagens = models.PositiveIntegerField(_('Total de Mensagens'), default=0)
+
+    # --- Não lidas, por lado da conversa ---
+    # Mensagens ainda não lidas por cada participante. Hoje só o aluno
+    # escreve (as respostas do professor são por e-mail), então o lado do
+    # aluno permanece em 0 até o site ter respostas.
+    nao_lidas_professor = models.PositiveIntegerField(_('Não Lidas pelo Professor'), default=0)
+    nao_lidas_aluno = models.PositiveIntegerField(_('Não Lidas pelo Aluno'), default=0)
+
+    class Meta:
+        verbose_name = _('Conversa')
+        verbose_name_plural = _('Conversas')
+        constraints = [
+            models.UniqueConstraint(fields=['aluno', 'professor'], name='conversa_unica_por_dupla'),
+        ]
+        indexes = [
+            # Caixa de mensagens: conversas de cada lado, mais recentes primeiro
+            models.Index(fields=['professor', '-ultima_mensagem_em'], name='conversa_professor_idx'),
+            models.Index(fields=['aluno', '-ultima_mensagem_em'], name='conversa_aluno_idx'),
+        ]
+
+    def __str__(self):
+        aluno_str = self.aluno.username if self.aluno else _("Usuário Excluído")
+        return f"Conversa entre {aluno_str} e {self.professor.username}"
+
+    @classmethod
+    def da_dupla(cls, aluno_id, professor_id):
+        """Retorna a conversa da dupla, criando-a se ainda não existir."""
+        if aluno_id is None:
+            # Sem aluno (conta excluída) não há dupla para agrupar
+            return cls.objects.create(aluno_id=None, professor_id=professor_id)
+        conversa, _criada = cls.objects.get_or_create(aluno_id=aluno_id, professor_id=professor_id)
+        return conversa
+
+    @classmethod
+    def registrar_mensagem(cls, contato):
+        """
+        Atualiza o resumo da conversa com uma mensagem nova, em UM UPDATE
+        (com expressões F, seguro para envios simultâneos), e o contador de
+        não lidas do professor.
+
+        Ordem das travas (evita "deadlocks"): sempre a linha do USUÁRIO
+        antes da linha da CONVERSA, como em 'marcar_todas_como_lidas'.
+        """
+        if not contato.lida:
+            CustomUser.objects.filter(pk=contato.professor_id).update(
+                mensagens_nao_lidas=F('mensagens_nao_lidas') + 1
+            )
+        cls.objects.filter(pk=contato.conversa_id).update(
+            ultima_mensagem_em=contato.data_envio,
+            ultimo_assunto=contato.assunto,
+            previa=Truncator(contato.mensagem).chars(TAMANHO_PREVIA),
+            total_mensagens=F('total_mensagens') + 1,
+            nao_lidas_professor=F('nao_lidas_professor') + (0 if contato.lida else 1),
+        )
+
+    def marcar_como_lida(self, user):
+        """
+        Marca como lidas as mensagens desta conversa endereçadas a 'user'
+        e zera o contador daquele lado. Retorna quantas foram marcadas.
+        """
+        if user.pk != self.professor_id or not self.nao_lidas_professor:
+            return 0
+        with transaction.atomic():
+            # Trava o usuário antes da conversa (mesma ordem das outras escritas)
+            CustomUser.objects.select_for_update().filter(pk=user.pk).exists()
+            marcadas = self.mensagens.filter(lida=False).update(lida=True)
+            Conversa.objects.filter(pk=self.pk).update(
+                nao_lidas_professor=Greatest(F('nao_lidas_professor') - marcadas, 0)
+            )
+            _descontar_nao_lidas(user, marcadas)
+        self.nao_lidas_professor = max(self.nao_lidas_professor - marcadas, 0)
+        return marcadas
+
+    @classmethod
+    def marcar_todas_como_lidas(cls, user):
+        """
+        Marca como lidas TODAS as mensagens recebidas por 'user' com um único
+        UPDATE em 'ContactProfessor' (mais um para zerar as conversas e um
+        para o contador do usuário). Retorna quantas foram marcadas.
+        """
+        with transaction.atomic():
+            # Trava a linha do usuário primeiro: uma mensagem que chegar agora
+            # espera, e não é zerada sem ter sido marcada como lida.
+            CustomUser.objects.select_for_update().filter(pk=user.pk).exists()
+            marcadas = ContactProfessor.objects.filter(professor=user, lida=False).update(lida=True)
+            if marcadas:
+                cls.objects.filter(professor=user, nao_lidas_professor__gt=0).update(nao_lidas_professor=0)
+                _descontar_nao_lidas(user, marcadas)
+        return marcadas
+
+
+def _descontar_nao_lidas(user, quantidade):
+    """Desconta 'quantidade' do contador de não lidas (no banco e no objeto)."""
+    CustomUser.objects.filter(pk=user.pk).update(
+        mensagens_nao_lidas=Greatest(F('mensagens_nao_lidas') - quantidade, 0)
+    )
+    user.mensagens_nao_lidas = max(user.mensagens_nao_lidas - quantidade, 0)
+
+
+# ==============================================================================
+# 9. AVALIAÇÕES: AVALIACAO
+# ==============================================================================
+
+class Avaliacao(models.Model):
+    """
+    Avaliação de um Aluno para um Professor: uma nota de 1 a 5 e um
+    comentário opcional. Cada aluno tem no máximo UMA avaliação por
+    professor (uma nova avaliação substitui a anterior).
+
+    A média e o total do professor ('ProfessorProfile.media_avaliacoes' /
+    'total_avaliacoes') são atualizados na MESMA transação em que a
+    avaliação é criada, editada ('save') ou excluída (signal
+    'descontar_avaliacao_excluida').
+    """
+    aluno = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='avaliacoes_feitas',
+        verbose_name=_('Aluno')
+    )
+    professor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='avaliacoes_recebidas',
+        verbose_name=_('Professor Avaliado')
+    )
+    nota = models.PositiveSmallIntegerField(
+        _('Nota'), validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
+    comentario = models.TextField(_('Comentário'), blank=True)
+    data_criacao = models.DateTimeField(_('Data da Avaliação'), auto_now_add=True)
+    data_atualizacao = models.DateTimeField(_('Última Edição'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Avaliação')
+        verbose_name_plural = _('Avaliações')
+        ordering = ['-data_criacao']
+        constraints = [
+            models.UniqueConstraint(fields=['aluno', 'professor'], name='avaliacao_unica_por_aluno'),
+            models.CheckConstraint(condition=models.Q(nota__gte=1, nota__lte=5), name='avaliacao_nota_1_a_5'),
+        ]
+        indexes = [
+            # Avaliações mais recentes de um professor (página de perfil)
+            models.Index(fields=['professor', '-data_criacao'], name='avaliacao_professor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nota}/5 para {self.professor.username}"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            anterior = None
+            if self.pk:
+                # Trava a linha antiga para que duas edições simultâneas não
+                # contem a mesma diferença de nota duas vezes.
+                anterior = (
+                    Avaliacao.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('professor_id', 'nota')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+
+            if anterior is None:
+                ProfessorProfile.registrar_avaliacao(self.professor_id, self.nota, 1)
+            elif anterior[0] == self.professor_id:
+                if anterior[1] != self.nota:
+                    ProfessorProfile.registrar_avaliacao(self.professor_id, self.nota - anterior[1], 0)
+            else:
+                # Caso raro (ex: correção pelo Admin): a avaliação mudou de professor
+                ProfessorProfile.registrar_avaliacao(anterior[0], -anterior[1], -1)
+                ProfessorProfile.registrar_avaliacao(self.professor_id, self.nota, 1)
+
+
+# ==============================================================================
+# 10. FILA DE E-MAILS: EMAIL OUTBOX
+# ==============================================================================
+
+class EmailOutbox(models.Model):
+    """
+    Fila de e-mails a enviar ("Transactional Outbox").
+
+    As views não falam com o servidor de e-mail: elas só gravam o e-mail
+    nesta tabela, na MESMA transação dos dados que o originaram (ex: a
+    mensagem de contato). Assim a resposta ao usuário não espera pelo
+    SendGrid, e nenhum e-mail é perdido nem enviado para dados que não
+    chegaram a ser salvos.
+
+    A entrega é feita pelo comando 'process_email_outbox' (ver 'emails.py'),
+    que tenta de novo, com espera crescente, os envios que falharem.
+    """
+
+    class Status(models.TextChoices):
+        PENDENTE = 'P', _('Pendente')
+        ENVIADO = 'E', _('Enviado')
+        FALHOU = 'F', _('Falhou (desistiu)')
+
+    assunto = models.CharField(_('Assunto'), max_length=255)
+    corpo = models.TextField(_('Corpo'))
+    html = models.BooleanField(_('Corpo em HTML'), default=False)
+    remetente = models.CharField(_('Remetente'), max_length=254)
+    destinatarios = models.JSONField(_('Destinatários'), default=list)
+    responder_para = models.JSONField(_('Responder Para'), default=list, blank=True)
+
+    # --- Controle de entrega ---
+    status = models.CharField(_('Status'), max_length=1, choices=Status.choices, default=Status.PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(_('Tentativas'), default=0)
+    # Quando o e-mail pode ser (re)tentado. Também funciona como "reserva":
+    # o worker empurra esta data para frente ao pegar o e-mail, e se ele
+    # morrer no meio do envio, o e-mail volta para a fila sozinho.
+    proxima_tentativa = models.DateTimeField(_('Próxima Tentativa'), default=timezone.now)
+    ultimo_erro = models.TextField(_('Último Erro'), blank=True)
+    data_criacao = models.DateTimeField(_('Data de Criação'), auto_now_add=True)
+    data_envio = models.DateTimeField(_('Data de Envio'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('E-mail na Fila')
+        verbose_name_plural = _('Fila de E-mails')
+        indexes = [
+            # A consulta do worker: pendentes cuja vez já chegou
+            models.Index(fields=['status', 'proxima_tentativa'], name='outbox_pendentes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.assunto} -> {', '.join(self.destinatarios)} ({self.get_status_display()})"
+
+    @classmethod
+    def enfileirar(cls, assunto, corpo, destinatarios, html=False, responder_para=None, remetente=None):
+        """
+        Grava um e-mail na fila. Deve ser chamado dentro da transação que
+        salva os dados relacionados (ex: 'transaction.atomic()' da view).
+        """
+        return cls.objects.create(
+            assunto=assunto,
+            corpo=corpo,
+            html=html,
+            remetente=remetente or settings.DEFAULT_FROM_EMAIL,
+            destinatarios=list(destinatarios),
+            responder_para=list(responder_para or []),
+        )
+
+    def como_email(self, conexao=None):
+        """Monta o 'EmailMessage' do Django correspondente a esta linha."""
+        email = EmailMessage(
+            subject=self.assunto,
+            body=self.corpo,
+            from_email=self.remetente,
+            to=self.destinatarios,
+            reply_to=self.responder_para or None,
+            connection=conexao,
+        )
+        if self.html:
+            email.content_subtype = 'html'
+        return email
+
+
+# ==============================================================================
+# 11. FILA DE IMAGENS: TAREFA IMAGEM
+# ==============================================================================
+
+class TarefaImagem(models.Model):
+    """
+    Fila de fotos a processar (limpeza do original e versões reduzidas, ver
+    'imagens.py').
+
+    Decodificar e redimensionar uma foto de celular ocupa a CPU por
+    centenas de milissegundos; no 'save()' isso prenderia o worker do
+    Gunicorn durante o envio do formulário. O 'save()' só grava o original
+    e cria uma tarefa aqui; o comando 'process_image_jobs' (ver
+    'fila_imagens.py') processa as tarefas em vários processos.
+
+    A tarefa aponta para o CAMPO de um registro (ex: 'foto_perfil' do
+    usuário 7) e guarda o nome do arquivo enviado: se outra foto for
+    enviada antes do processamento, o resultado antigo é descartado.
+    """
+
+    class Status(models.TextChoices):
+        PENDENTE = 'P', _('Pendente')
+        CONCLUIDA = 'C', _('Concluída')
+        FALHOU = 'F', _('Falhou (desistiu)')
+
+    # Registro e campo da foto (ex: 'users.customuser', 7, 'foto_perfil')
+    modelo = models.CharField(_('Modelo'), max_length=100)
+    objeto_id = models.BigIntegerField(_('ID do Registro'))
+    campo = models.CharField(_('Campo'), max_length=50)
+    arquivo = models.CharField(_('Arquivo'), max_length=255)
+
+    # --- Controle de processamento (mesma ideia da 'EmailOutbox') ---
+    status = models.CharField(_('Status'), max_length=1, choices=Status.choices, default=Status.PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(_('Tentativas'), default=0)
+    proxima_tentativa = models.DateTimeField(_('Próxima Tentativa'), default=timezone.now)
+    ultimo_erro = models.TextField(_('Último Erro'), blank=True)
+    data_criacao = models.DateTimeField(_('Data de Criação'), auto_now_add=True)
+    data_conclusao = models.DateTimeField(_('Data de Conclusão'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Tarefa de Imagem')
+        verbose_name_plural = _('Fila de Imagens')
+        indexes = [
+            # A consulta do worker: pendentes cuja vez já chegou
+            models.Index(fields=['status', 'proxima_tentativa'], name='imagem_pendentes_idx'),
+        ]
+        constraints = [
+            # No máximo UMA tarefa pendente por foto (envios repetidos reaproveitam a tarefa)
+            models.UniqueConstraint(
+                fields=['modelo', 'objeto_id', 'campo'], name='imagem_pendente_unica',
+                condition=models.Q(status='P'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}.{self.campo} ({self.get_status_display()})"
+
+    @classmethod
+    def enfileirar(cls, registro, campo):
+        """
+        Agenda o processamento da foto atual de 'registro.<campo>'. Se já
+        houver uma tarefa pendente para essa foto, ela passa a apontar para
+        o arquivo novo.
+        """
+        tarefa, criada = cls.objects.get_or_create(
+            modelo=registro._meta.label_lower,
+            objeto_id=registro.pk,
+            campo=campo,
+            status=cls.Status.PENDENTE,
+            defaults={'arquivo': getattr(registro, campo).name},
+        )
+        if not criada:
+            cls.objects.filter(pk=tarefa.pk).update(
+                arquivo=getattr(registro, campo).name, proxima_tentativa=timezone.now(), tentativas=0
+            )
+        return tarefa
+
+
+# ==============================================================================
+# 12. SIGNALS (Automação entre Modelos)
 # ==============================================================================
 
 @receiver(post_save, sender=CustomUser)
@@ -255,4 +1173,196 @@ def ensure_professor_profile(sender, instance, **kwargs):
     """
     if instance.is_professor:
         # Tenta buscar o perfil; se não existir, cria um novo.
-        ProfessorProfile.objects.get_or_create(user=instance)
\ No newline at end of file
+        ProfessorProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def sincronizar_listagem_usuario(sender, instance, **kwargs):
+    """
+    Signal (disparado após 'CustomUser' ser salvo) que mantém a linha do
+    professor em 'ProfessorListing' atualizada (nome, cidade, foto...).
+    Roda DEPOIS de 'ensure_professor_profile', então o perfil já existe.
+    """
+    ProfessorListing.sincronizar(instance)
+
+
+@receiver(post_save, sender=ProfessorProfile)
+def sincronizar_listagem_perfil(sender, instance, **kwargs):
+    """
+    Signal (disparado após 'ProfessorProfile' ser salvo) que atualiza a
+    linha do professor em 'ProfessorListing'. Também cuida da entrada e
+    saída da listagem quando 'status_ativo' muda.
+    """
+    ProfessorListing.sincronizar(instance.user)
+
+
+@receiver(post_save, sender=ProfessorListing)
+@receiver(post_delete, sender=ProfessorListing)
+def invalidar_caches_listagem(sender, **kwargs):
+    """
+    Signal (disparado quando uma linha de 'ProfessorListing' muda) que
+    avança a geração 'listagem', invalidando de uma vez todos os caches
+    derivados dela (ex: contagens de facetas), depois do commit. Ver 'geracoes.py'.
+    """
+    geracoes.avancar_no_commit('listagem')
+
+
+@receiver(post_save, sender=ProfessorListing)
+def atualizar_trigramas_listagem(sender, instance, **kwargs):
+    """
+    Signal (disparado quando uma linha de 'ProfessorListing' é salva) que
+    atualiza o índice de trigramas da busca aproximada (só no SQLite).
+    """
+    busca.indexar_trigramas(instance.pk, instance.texto_busca)
+
+
+@receiver(post_delete, sender=ProfessorListing)
+def remover_trigramas_listagem(sender, instance, **kwargs):
+    """
+    Signal (disparado quando uma linha de 'ProfessorListing' é excluída)
+    que a retira do índice de trigramas (só no SQLite).
+    """
+    busca.remover_trigramas(instance.pk)
+
+
+@receiver(post_delete, sender=ProfessorProfile)
+def remover_listagem_perfil(sender, instance, **kwargs):
+    """
+    Signal (disparado após 'ProfessorProfile' ser excluído) que retira o
+    professor da listagem. (A exclusão do 'CustomUser' já remove a linha
+    em cascata, pois ela é a chave primária de 'ProfessorListing'.)
+    """
+    ProfessorListing.objects.filter(user_id=instance.user_id).delete()
+
+
+@receiver(post_save, sender=CustomUser)
+def atualizar_indice_busca_usuario(sender, instance, **kwargs):
+    """
+    Signal (disparado após 'CustomUser' ser salvo) que mantém o índice de
+    busca (ver 'busca.py') em sincronia com o nome, username e cidade.
+    Se o usuário deixou de ser professor, ele é removido do índice.
+    """
+    busca.indexar_professor(instance)
+
+
+@receiver(post_save, sender=ProfessorProfile)
+def atualizar_indice_busca_perfil(sender, instance, **kwargs):
+    """
+    Signal (disparado após 'ProfessorProfile' ser salvo) que reindexa o
+    professor quando as suas disciplinas mudam.
+    """
+    busca.indexar_professor(instance.user)
+
+
+@receiver(post_save, sender=ProfessorProfile)
+def sincronizar_disciplinas(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal (disparado após 'ProfessorProfile' ser salvo) que converte o
+    texto livre de 'disciplinas' nas linhas normalizadas de 'lista_disciplinas'.
+
+    Saves parciais que não tocam o texto (ex: update_fields=['status_ativo'])
+    são ignorados, evitando consultas desnecessárias.
+    """
+    if update_fields is not None and 'disciplinas' not in update_fields:
+        return
+    instance.lista_disciplinas.set(Disciplina.a_partir_do_texto(instance.disciplinas))
+
+
+@receiver(post_delete, sender=CustomUser)
+def remover_indice_busca(sender, instance, **kwargs):
+    """
+    Signal (disparado após 'CustomUser' ser excluído) que remove o
+    professor do índice de busca.
+    """
+    busca.remover_professor(instance.pk)
+
+
+@receiver(post_delete, sender=Avaliacao)
+def descontar_avaliacao_excluida(sender, instance, **kwargs):
+    """
+    Signal (disparado após uma 'Avaliacao' ser excluída, inclusive em
+    cascata) que retira a nota da média do professor. Roda dentro da
+    mesma transação da exclusão.
+    """
+    ProfessorProfile.registrar_avaliacao(instance.professor_id, -instance.nota, -1)
+
+
+# --- Cache de página inteira (ver 'cache_paginas.py') ---
+# Cada página de perfil tem a sua própria geração: uma mudança em um
+# professor invalida SÓ a página dele. As páginas da listagem dependem da
+# geração 'listagem', já avançada por 'invalidar_caches_listagem'.
+
+def _invalidar_perfis(usernames):
+    for username in set(usernames):
+        if username:
+            geracoes.avancar_no_commit(cache_paginas.grupo_perfil(username))
+
+
+@receiver(pre_save, sender=CustomUser)
+def guardar_username_anterior(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal (disparado ANTES de 'CustomUser' ser salvo) que guarda o
+    username antigo, para que a página do endereço antigo também seja
+    invalidada quando o username mudar.
+    """
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._username_anterior = (
+            CustomUser.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidar_paginas_usuario(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal (disparado quando um 'CustomUser' muda) que invalida a página de
+    perfil dele e as páginas dos professores que ele avaliou (o nome do
+    aluno aparece nas avaliações).
+
+    O login só atualiza 'last_login', que não aparece em nenhuma página.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    _invalidar_perfis([
+        instance.username,
+        getattr(instance, '_username_anterior', None),
+        *Avaliacao.objects.filter(aluno_id=instance.pk).values_list('professor__username', flat=True),
+    ])
+
+
+@receiver(post_save, sender=ProfessorProfile)
+@receiver(post_delete, sender=ProfessorProfile)
+def invalidar_pagina_perfil(sender, instance, **kwargs):
+    """
+    Signal (disparado quando um 'ProfessorProfile' muda) que invalida a
+    página de perfil do professor.
+    """
+    _invalidar_perfis(CustomUser.objects.filter(pk=instance.user_id).values_list('username', flat=True))
+
+
+@receiver(post_save, sender=Avaliacao)
+@receiver(post_delete, sender=Avaliacao)
+def invalidar_pagina_avaliada(sender, instance, **kwargs):
+    """
+    Signal (disparado quando uma 'Avaliacao' muda) que invalida a página
+    do professor avaliado (média, total e últimas avaliações).
+    """
+    _invalidar_perfis(CustomUser.objects.filter(pk=instance.professor_id).values_list('username', flat=True))
+
+
+@receiver(post_delete, sender=ContactProfessor)
+def descontar_mensagem_excluida(sender, instance, **kwargs):
+    """
+    Signal (disparado após uma 'ContactProfessor' ser excluída) que
+    retira a mensagem dos contadores da sua conversa e do professor.
+    """
+    if not instance.lida:
+        CustomUser.objects.filter(pk=instance.professor_id).update(
+            mensagens_nao_lidas=Greatest(F('mensagens_nao_lidas') - 1, 0)
+        )
+    if instance.conversa_id is None:
+        return
+    Conversa.objects.filter(pk=instance.conversa_id).update(
+        total_mensagens=Greatest(F('total_mensagens') - 1, 0),
+        nao_lidas_professor=Greatest(F('nao_lidas_professor') - (0 if instance.lida else 1), 0),
+    )
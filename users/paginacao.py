@@ -0,0 +1,245 @@
+"""
+Paginação por Cursor (Keyset Pagination) para o aplicativo 'users'.
+
+A paginação tradicional ('?page=50') usa 'OFFSET': para mostrar a página 50,
+o banco precisa ler e descartar todas as linhas das 49 páginas anteriores.
+Quanto mais fundo o usuário rola, mais lenta a consulta fica.
+
+A paginação por cursor evita isso: o "cursor" guarda os valores de
+ordenação do ÚLTIMO item mostrado (ex: username='joao', id=42), e a próxima
+página é simplesmente "os itens que vêm depois deste", uma condição WHERE
+que o banco resolve direto pelo índice, em qualquer profundidade.
+
+Uso:
+    pagina = paginar(professores, ('username', 'pk'), request.GET.get('cursor'), 24)
+    pagina.itens           # Lista com os itens da página
+    pagina.proximo_cursor  # String para pedir a próxima página (ou None)
+
+    # União de consultas (ex: mensagens recebidas + enviadas), ver 'paginar_uniao'
+    pagina = paginar_uniao([recebidas, enviadas], ('-data_envio', '-pk'), cursor, 20)
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import F, Q
+
+
+class Pagina:
+    """
+    Resultado de uma consulta paginada.
+
+    Atributos:
+        itens (list): Os objetos da página atual.
+        proximo_cursor (str): Cursor da próxima página (None se for a última).
+    """
+
+    def __init__(self, itens, proximo_cursor):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+
+# ==============================================================================
+# 1. CODIFICAÇÃO DO CURSOR
+# ==============================================================================
+
+class _CodificadorCursor(DjangoJSONEncoder):
+    """
+    Igual ao 'DjangoJSONEncoder', mas sem cortar os microssegundos das
+    datas: duas mensagens enviadas no mesmo milissegundo ficariam com o
+    mesmo valor no cursor, e uma delas seria pulada na próxima página.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def codificar_cursor(valores):
+    """
+    Transforma a lista de valores de ordenação em uma string segura para URL.
+    Ex: ['joao', 42] -> 'WyJqb2FvIiwgNDJd'
+    """
+    dados = json.dumps(valores, cls=_CodificadorCursor, separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, quantidade):
+    """
+    Faz o caminho inverso de 'codificar_cursor'.
+    Retorna None se o cursor for inválido (ex: adulterado na URL), o que
+    faz a listagem simplesmente recomeçar da primeira página.
+    """
+    if not cursor:
+        return None
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        return None
+    if not all(isinstance(v, (str, int, float)) or v is None for v in valores):
+        return None
+    return valores
+
+
+# ==============================================================================
+# 2. CONSULTA
+# ==============================================================================
+
+def _valor(obj, campo):
+    """Lê o valor de ordenação de um item (aceita 'campo__subcampo')."""
+    for parte in campo.split('__'):
+        obj = getattr(obj, parte)
+    return obj
+
+
+def _nulaveis(queryset, ordenacao):
+    """Nomes dos campos da ordenação que aceitam NULL no banco."""
+    nulaveis = set()
+    for campo in ordenacao:
+        nome = campo.lstrip('-')
+        try:
+            if queryset.model._meta.get_field(nome).null:
+                nulaveis.add(nome)
+        except FieldDoesNotExist:
+            pass # 'pk' ou anotações (ex: 'relevancia')
+    return nulaveis
+
+
+def filtro_apos(ordenacao, valores, nulaveis=()):
+    """
+    Monta a condição "vem depois do cursor" para uma ordenação composta.
+
+    Para a ordenação ('username', 'pk') e o cursor ['joao', 42], gera:
+        username > 'joao' OR (username = 'joao' AND pk > 42)
+
+    Campos com '-' (decrescentes) usam '<' em vez de '>'.
+
+    Campos em 'nulaveis' têm os NULLs sempre no FIM da ordenação (ex: a
+    tarifa "a negociar" aparece depois de todos os preços, nos dois
+    sentidos). Por isso, depois de um valor preenchido também vêm os NULLs,
+    e depois de um NULL só vêm os NULLs seguintes (desempatados pelo 'pk').
+    """
+    condicao = Q()
+    iguais = Q()
+    for campo, valor in zip(ordenacao, valores):
+        nome = campo.lstrip('-')
+        if valor is None:
+            iguais &= Q(**{f'{nome}__isnull': True})
+            continue
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        apos = Q(**{f'{nome}__{operador}': valor})
+        if nome in nulaveis:
+            apos |= Q(**{f'{nome}__isnull': True})
+        condicao |= iguais & apos
+        iguais &= Q(**{nome: valor})
+    return condicao
+
+
+def paginar(queryset, ordenacao, cursor, tamanho):
+    """
+    Retorna uma 'Pagina' com até 'tamanho' itens após o cursor.
+
+    Parâmetros:
+        queryset (QuerySet): A consulta completa (sem ordenação).
+        ordenacao (tuple): Campos de ordenação, como no 'order_by'. O ÚLTIMO
+            campo deve ser único e não nulo (ex: 'pk') para desempatar os demais.
+        cursor (str): O cursor recebido na URL ('?cursor=...').
+        tamanho (int): Quantidade de itens por página.
+    """
+    nulaveis = _nulaveis(queryset, ordenacao)
+    valores = decodificar_cursor(cursor, len(ordenacao))
+    if valores is not None:
+        queryset = queryset.filter(filtro_apos(ordenacao, valores, nulaveis))
+
+    # NULLs por último em qualquer banco (o padrão muda entre SQLite e PostgreSQL)
+    criterios = [
+        (F(c[1:]).desc(nulls_last=True) if c.startswith('-') else F(c).asc(nulls_last=True)) if c.lstrip('-') in nulaveis else c
+        for c in ordenacao
+    ]
+
+    # Busca UM item a mais só para saber se existe uma próxima página
+    itens = list(queryset.order_by(*criterios)[:tamanho + 1])
+
+    proximo_cursor = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor([_valor(ultimo, c.lstrip('-')) for c in ordenacao])
+
+    return Pagina(itens=itens, proximo_cursor=proximo_cursor)
+
+
+# ==============================================================================
+# 3. UNIÃO DE CONSULTAS
+# ==============================================================================
+
+def _ordenar_linhas(linhas, ordenacao):
+    """
+    Ordena em Python linhas (tuplas) com os valores de 'ordenacao'.
+    Uma ordenação estável por campo, do último para o primeiro, respeita
+    o sentido ('-') de cada um.
+    """
+    for posicao in reversed(range(len(ordenacao))):
+        linhas.sort(key=lambda linha: linha[posicao], reverse=ordenacao[posicao].startswith('-'))
+    return linhas
+
+
+def paginar_uniao(querysets, ordenacao, cursor, tamanho, relacionados=()):
+    """
+    Como 'paginar', mas para a UNIÃO de várias consultas do mesmo modelo
+    (ex: mensagens recebidas + mensagens enviadas).
+
+    Um filtro com OR ('Q(a) | Q(b)') impede o banco de usar um índice para
+    cada lado. Aqui cada consulta é um "fluxo" já ordenado pelo próprio
+    índice, limitado a 'tamanho + 1' linhas após o cursor; os fluxos são
+    então intercalados:
+    - No PostgreSQL, com um UNION no banco ('(SELECT ... LIMIT) UNION (...)').
+    - No SQLite (que não aceita LIMIT dentro de um UNION), em Python, com
+      no máximo 'tamanho + 1' linhas de cada fluxo.
+
+    Em ambos os casos só as chaves de ordenação são lidas primeiro; os
+    objetos completos da página vêm depois, em UMA consulta pela chave.
+
+    Os campos de 'ordenacao' não podem ser nulos, e o último deve ser 'pk'.
+    'relacionados' é repassado ao 'select_related' dessa última consulta.
+    """
+    modelo = querysets[0].model
+    valores = decodificar_cursor(cursor, len(ordenacao))
+    campos = [campo.lstrip('-') for campo in ordenacao]
+
+    fluxos = []
+    for queryset in querysets:
+        if valores is not None:
+            queryset = queryset.filter(filtro_apos(ordenacao, valores))
+        fluxos.append(queryset.order_by(*ordenacao).values_list(*campos)[:tamanho + 1])
+
+    if connection.features.supports_slicing_ordering_in_compound:
+        primeiro, *demais = fluxos
+        linhas = list(primeiro.union(*demais).order_by(*ordenacao)[:tamanho + 1])
+    else:
+        # Descarta repetidos (uma linha presente em mais de um fluxo), como o UNION
+        linhas = _ordenar_linhas(list({linha[-1]: linha for fluxo in fluxos for linha in fluxo}.values()), ordenacao)
+        linhas = linhas[:tamanho + 1]
+
+    proximo_cursor = None
+    if len(linhas) > tamanho:
+        linhas = linhas[:tamanho]
+        proximo_cursor = codificar_cursor(list(linhas[-1]))
+
+    # Os objetos completos, na ordem da página
+    pks = [linha[-1] for linha in linhas]
+    objetos = modelo._default_manager.select_related(*relacionados).in_bulk(pks) if pks else {}
+    return Pagina(itens=[objetos[pk] for pk in pks], proximo_cursor=proximo_cursor)
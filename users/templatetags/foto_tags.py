@@ -0,0 +1,48 @@
+"""
+Tags de Template para as fotos de perfil.
+
+Para usar as tags deste arquivo em um template, você deve
+primeiro carregá-las com: {% load foto_tags %}
+"""
+
+from django import template
+
+from users import imagens
+
+# Cria uma instância da biblioteca de templates,
+# que é usada para "registrar" novos filtros e tags.
+register = template.Library()
+
+
+@register.inclusion_tag('users/partials/foto_responsiva.html')
+def foto_responsiva(foto, variantes, tamanho, alt='', classes='', lazy=True):
+    """
+    Renderiza um '<picture>' com as versões reduzidas da foto (AVIF, WebP e
+    JPEG em 1x/2x/3x, ver 'imagens.py'), para que o navegador baixe só o
+    arquivo do tamanho e formato certos para a tela. Até a foto chegar, o
+    '<img>' mostra a cor média e uma miniatura borrada dela, embutidas no HTML.
+
+    Enquanto a foto enviada espera o worker de imagens ('pendente'), ou se
+    o worker desistiu dela ('falhou'), mostra um "placeholder" do mesmo
+    tamanho: o original ainda tem os metadados (EXIF, GPS). Só a foto sem
+    variantes enviada antes do pipeline usa o arquivo original.
+
+    Uso no template:
+        {% foto_responsiva professor.foto_perfil professor.foto_perfil_variantes 'card' alt="Foto" classes="h-72 w-72" %}
+
+    Parâmetros:
+        foto (FieldFile): O campo de imagem (ex: user.foto_perfil).
+        variantes (dict): O resumo das variantes (ex: user.foto_perfil_variantes).
+        tamanho (str): Uma das caixas de 'imagens.TAMANHOS' ('card', 'detalhe', 'navbar').
+        lazy (bool): Adia o download até a foto se aproximar da tela.
+    """
+    lado, _densidades = imagens.TAMANHOS[tamanho]
+    return {
+        'indisponivel': bool(variantes) and (variantes.get('pendente', False) or variantes.get('falhou', False)),
+        'original': foto.url,
+        'responsiva': imagens.urls(foto.name, foto.storage, variantes, tamanho),
+        'lado': lado,
+        'alt': alt,
+        'classes': classes,
+        'lazy': lazy,
+    }
@@ -1,3 +1,436 @@
-from django.test import TestCase
+"""
+Testes do aplicativo 'users'.
 
-# Create your tests here.
+Rodar com:
+    python manage.py test users
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import RequestFactory, TestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from . import arquivo, emails, facetas, imagens, limites, paginacao
+from .models import ContactProfessor, Conversa, CustomUser, EmailOutbox, MensagemArquivada, ProfessorListing
+
+
+def criar_usuario(email, professor=False, **campos):
+    """Cria um usuário (professor, se pedido), sem senha (mais rápido)."""
+    user = CustomUser.objects.create_user(email=email, password=None, **campos)
+    if professor:
+        user.is_professor = True
+        user.save()
+    return user
+
+
+# ==============================================================================
+# 1. PAGINAÇÃO POR CURSOR
+# ==============================================================================
+
+class PaginarUniaoTests(TestCase):
+    """
+    'paginar_uniao' tem dois caminhos: o UNION no banco (PostgreSQL) e a
+    intercalação em Python (SQLite). Os dois devem percorrer as conversas
+    na mesma ordem de um único filtro 'aluno OU professor', sem repetir
+    nem pular itens, inclusive com datas empatadas.
+    """
+
+    ordenacao = ('-ultima_mensagem_em', '-pk')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = criar_usuario('dono@teste.com', professor=True)
+        agora = timezone.now()
+        for i in range(4):
+            aluno = criar_usuario(f'aluno{i}@teste.com')
+            professor = criar_usuario(f'prof{i}@teste.com', professor=True)
+            # Datas repetidas de dois em dois: empates resolvidos pelo 'pk'
+            data = agora - timedelta(hours=i // 2)
+            Conversa.objects.create(aluno=aluno, professor=cls.user, ultima_mensagem_em=data)
+            Conversa.objects.create(aluno=cls.user, professor=professor, ultima_mensagem_em=data)
+
+    def _percorrer(self):
+        querysets = [Conversa.objects.filter(professor=self.user), Conversa.objects.filter(aluno=self.user)]
+        vistos, cursor = [], None
+        while True:
+            pagina = paginacao.paginar_uniao(querysets, self.ordenacao, cursor, 3)
+            vistos += [conversa.pk for conversa in pagina.itens]
+            cursor = pagina.proximo_cursor
+            if cursor is None:
+                return vistos
+
+    def _esperado(self):
+        return list(
+            Conversa.objects.filter(Q(professor=self.user) | Q(aluno=self.user))
+            .order_by(*self.ordenacao).values_list('pk', flat=True)
+        )
+
+    def test_intercalacao_em_python(self):
+        with mock.patch.object(connection.features, 'supports_slicing_ordering_in_compound', False):
+            self.assertEqual(self._percorrer(), self._esperado())
+
+    @skipUnlessDBFeature('supports_slicing_ordering_in_compound')
+    def test_union_no_banco(self):
+        self.assertEqual(self._percorrer(), self._esperado())
+
+    def test_conversa_nova_tem_data(self):
+        conversa = Conversa.da_dupla(criar_usuario('novo@teste.com').pk, self.user.pk)
+        self.assertIsNotNone(conversa.ultima_mensagem_em)
+
+
+class PaginarComNulosTests(TestCase):
+    """
+    'paginar' com um campo que aceita NULL ('tarifa_hora', "a negociar") e
+    valores repetidos: os NULLs vêm por último nos dois sentidos, e os
+    empates são desfeitos pelo 'pk', sem repetir nem pular professores.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i, tarifa in enumerate([50, None, 50, 30, None, 80, 50]):
+            user = criar_usuario(f'tarifa{i}@teste.com', professor=True)
+            ProfessorListing.objects.update_or_create(user=user, defaults={
+                'username': f'tarifa{i}', 'tarifa_hora': None if tarifa is None else Decimal(tarifa),
+            })
+
+    def _percorrer(self, ordenacao, tamanho):
+        vistos, cursor = [], None
+        while True:
+            pagina = paginacao.paginar(ProfessorListing.objects.all(), ordenacao, cursor, tamanho)
+            vistos += [professor.pk for professor in pagina.itens]
+            cursor = pagina.proximo_cursor
+            if cursor is None:
+                return vistos
+
+    def _esperado(self, decrescente):
+        professores = list(ProfessorListing.objects.values_list('tarifa_hora', 'pk'))
+        com_tarifa = sorted((p for p in professores if p[0] is not None), reverse=decrescente)
+        sem_tarifa = sorted((p for p in professores if p[0] is None), key=lambda p: p[1], reverse=decrescente)
+        return [pk for _tarifa, pk in com_tarifa + sem_tarifa]
+
+    def test_crescente(self):
+        for tamanho in (1, 2, 3):
+            self.assertEqual(self._percorrer(('tarifa_hora', 'pk'), tamanho), self._esperado(False))
+
+    def test_decrescente(self):
+        for tamanho in (1, 2, 3):
+            self.assertEqual(self._percorrer(('-tarifa_hora', '-pk'), tamanho), self._esperado(True))
+
+    def test_cursor_de_um_nulo(self):
+        # Depois de um NULL só vêm os NULLs seguintes, desempatados pelo 'pk'
+        nulos = list(ProfessorListing.objects.filter(tarifa_hora__isnull=True).order_by('pk').values_list('pk', flat=True))
+        depois = ProfessorListing.objects.filter(paginacao.filtro_apos(('tarifa_hora', 'pk'), [None, nulos[0]], {'tarifa_hora'}))
+        self.assertEqual(list(depois.values_list('pk', flat=True)), nulos[1:])
+
+
+# ==============================================================================
+# 2. FACETAS
+# ==============================================================================
+
+class FacetasTests(TestCase):
+    """Cada faceta é contada sem o próprio filtro (contagem disjuntiva)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i, (modalidade, online) in enumerate([('P', True), ('P', False), ('O', True), ('TO', True)]):
+            user = criar_usuario(f'faceta{i}@teste.com', professor=True)
+            ProfessorListing.objects.update_or_create(user=user, defaults={
+                'username': f'faceta{i}', 'modalidades': modalidade, 'aceita_online': online,
+            })
+
+    def _contar(self, filtros):
+        return facetas._calcular(ProfessorListing.objects.all(), filtros)
+
+    def _modalidades(self, resultado):
+        return {m['valor']: m['total'] for m in resultado['modalidade'] if m['total']}
+
+    def test_faceta_ignora_o_proprio_filtro(self):
+        resultado = self._contar({'modalidade': 'P'})
+        self.assertEqual(resultado['total'], 2)
+        # As outras modalidades continuam com as contagens delas
+        self.assertEqual(self._modalidades(resultado), {'P': 2, 'O': 1, 'TO': 1})
+        # As outras facetas respeitam a modalidade escolhida
+        self.assertEqual(resultado['booleanas']['online'], 1)
+
+    def test_filtros_combinados(self):
+        resultado = self._contar({'modalidade': 'P', 'online': True})
+        self.assertEqual(resultado['total'], 1)
+        self.assertEqual(self._modalidades(resultado), {'P': 1, 'O': 1, 'TO': 1})
+        self.assertEqual(resultado['booleanas']['online'], 1)
+
+
+# ==============================================================================
+# 3. ARQUIVAMENTO DAS MENSAGENS
+# ==============================================================================
+
+class ArquivoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.aluno = criar_usuario('remetente@teste.com')
+        cls.professor = criar_usuario('destino@teste.com', professor=True)
+        cls.limite = timezone.now() - timedelta(days=30)
+
+    def _mensagem(self, dias_atras, notificada=True):
+        contato = ContactProfessor.objects.create(
+            aluno=self.aluno, professor=self.professor, assunto='Oi', mensagem='Aula?',
+            notificado_em=timezone.now() if notificada else None,
+        )
+        # 'data_envio' é 'auto_now_add': a data antiga é gravada depois
+        ContactProfessor.objects.filter(pk=contato.pk).update(data_envio=timezone.now() - timedelta(days=dias_atras))
+        return contato
+
+    def _arquivar(self, tamanho=1):
+        return sum(arquivo.arquivar_faixa(inicio, fim, self.limite) for inicio, fim in arquivo.faixas(self.limite, tamanho))
+
+    def test_chave_maior_com_data_mais_antiga(self):
+        antiga = self._mensagem(60)
+        recente = self._mensagem(1)
+        # Chave maior, mas enviada antes da mais antiga (ex: importada)
+        fora_de_ordem = self._mensagem(90)
+        self.assertEqual(self._arquivar(), 2)
+        self.assertEqual(set(MensagemArquivada.objects.values_list('pk', flat=True)), {antiga.pk, fora_de_ordem.pk})
+        self.assertTrue(ContactProfessor.objects.filter(pk=recente.pk).exists())
+
+    def test_resumo_pendente_nao_e_arquivado(self):
+        pendente = self._mensagem(60, notificada=False)
+        self.assertEqual(self._arquivar(), 0)
+        self.assertTrue(ContactProfessor.objects.filter(pk=pendente.pk).exists())
+
+
+# ==============================================================================
+# 4. LIMITE DE TAXA
+# ==============================================================================
+
+class RegraEstimarTests(TestCase):
+    """'Regra.estimar' depois que o cache perde um ou os dois contadores."""
+
+    janela = 60 * 60
+
+    def setUp(self):
+        cache.clear()
+        self.regra = limites.Regra('teste', limite=10, janela=self.janela)
+        self.request = RequestFactory().post('/')
+        self.request.user = criar_usuario('limite@teste.com')
+        # 15 minutos dentro de uma janela: o contador anterior ainda vale 75%
+        self.agora = 1000 * self.janela + self.janela / 4
+        self.relogio = mock.patch('users.limites.time.time', return_value=self.agora)
+        self.relogio.start()
+        self.addCleanup(self.relogio.stop)
+        self.addCleanup(cache.clear)
+
+    def _registrar(self, quantidade, agora):
+        with mock.patch('users.limites.time.time', return_value=agora):
+            for _ in range(quantidade):
+                self.regra.registrar(self.request, {})
+
+    def test_cache_completo_nao_consulta_o_banco(self):
+        self._registrar(4, self.agora - self.janela) # Janela anterior
+        self._registrar(2, self.agora)
+        contar = mock.Mock()
+        self.assertEqual(self.regra.estimar(self.request, {}, contar), 2 + 4 * 0.75)
+        contar.assert_not_called()
+
+    def test_cache_perdido_usa_o_banco_e_reabastece(self):
+        self._registrar(4, self.agora - self.janela)
+        self._registrar(2, self.agora)
+        cache.clear()
+        contar = mock.Mock(return_value=5)
+        self.assertEqual(self.regra.estimar(self.request, {}, contar), 5)
+        contar.assert_called_once()
+        # O cache reabastecido dá a mesma estimativa, sem o banco
+        self.assertEqual(self.regra.estimar(self.request, {}, None), 5)
+
+    def test_um_contador_perdido_usa_o_banco(self):
+        self._registrar(4, self.agora - self.janela)
+        self._registrar(2, self.agora)
+        cache.delete(self.regra._chave(self.request, {}, int(self.agora // self.janela)))
+        contar = mock.Mock(return_value=5)
+        self.assertEqual(self.regra.estimar(self.request, {}, contar), 5)
+        contar.assert_called_once()
+        self.assertEqual(self.regra.estimar(self.request, {}, None), 5)
+
+
+# ==============================================================================
+# 5. FILA DE E-MAILS
+# ==============================================================================
+
+class FilaEmailsTests(TestCase):
+    """Novas tentativas com espera crescente ('emails.espera_apos') e desistência."""
+
+    def setUp(self):
+        self.email = EmailOutbox.objects.create(
+            assunto='Nova mensagem', corpo='Olá', remetente='noreply@teste.com', destinatarios=['prof@teste.com'],
+        )
+
+    def _servidor_fora_do_ar(self):
+        conexao = mock.Mock()
+        conexao.send_messages.side_effect = OSError('SMTP fora do ar')
+        return mock.patch('users.emails.get_connection', return_value=conexao)
+
+    def _liberar(self):
+        """Adianta a próxima tentativa (em vez de esperar o 'backoff')."""
+        EmailOutbox.objects.filter(pk=self.email.pk).update(proxima_tentativa=timezone.now())
+
+    def test_envio(self):
+        self.assertEqual(emails.processar_lote(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, EmailOutbox.Status.ENVIADO)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_falha_agenda_com_espera_crescente(self):
+        with self._servidor_fora_do_ar():
+            for tentativa in (1, 2, 3):
+                antes = timezone.now()
+                self.assertEqual(emails.processar_lote(), (0, 1))
+                self.email.refresh_from_db()
+                self.assertEqual(self.email.status, EmailOutbox.Status.PENDENTE)
+                self.assertEqual(self.email.tentativas, tentativa)
+                self.assertEqual(self.email.ultimo_erro, 'SMTP fora do ar')
+                espera = self.email.proxima_tentativa - antes
+                self.assertGreaterEqual(espera, timedelta(minutes=2 ** (tentativa - 1)))
+                self.assertLess(espera, timedelta(minutes=2 ** (tentativa - 1), seconds=30))
+                # Ainda não é a vez dele
+                self.assertEqual(emails.processar_lote(), (0, 0))
+                self._liberar()
+
+        # Com o servidor de volta, a próxima tentativa envia
+        self.assertEqual(emails.processar_lote(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, EmailOutbox.Status.ENVIADO)
+        self.assertEqual(self.email.ultimo_erro, '')
+
+    def test_desiste_apos_o_maximo_de_tentativas(self):
+        EmailOutbox.objects.filter(pk=self.email.pk).update(tentativas=emails.MAXIMO_TENTATIVAS - 1)
+        with self._servidor_fora_do_ar():
+            self.assertEqual(emails.processar_lote(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, EmailOutbox.Status.FALHOU)
+        self._liberar()
+        self.assertEqual(emails.processar_lote(), (0, 0))
+
+
+# ==============================================================================
+# 6. CONTADOR DE MENSAGENS NÃO LIDAS
+# ==============================================================================
+
+class MensagensNaoLidasTests(TestCase):
+    """
+    'CustomUser.mensagens_nao_lidas' e 'Conversa.nao_lidas_professor' são
+    contadores desnormalizados: devem bater com as mensagens não lidas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = criar_usuario('leitor@teste.com', professor=True)
+        cls.alunos = [criar_usuario(f'escritor{i}@teste.com') for i in range(2)]
+
+    def _enviar(self, aluno):
+        return ContactProfessor.objects.create(aluno=aluno, professor=self.professor, assunto='Oi', mensagem='Aula?')
+
+    def _conferir(self):
+        self.professor.refresh_from_db()
+        nao_lidas = ContactProfessor.objects.filter(professor=self.professor, lida=False)
+        self.assertEqual(self.professor.mensagens_nao_lidas, nao_lidas.count())
+        for conversa in Conversa.objects.filter(professor=self.professor):
+            self.assertEqual(conversa.nao_lidas_professor, nao_lidas.filter(conversa=conversa).count())
+        return self.professor.mensagens_nao_lidas
+
+    def test_marcar_todas_como_lidas(self):
+        for aluno in self.alunos * 2:
+            self._enviar(aluno)
+        self.assertEqual(self._conferir(), 4)
+
+        self.assertEqual(Conversa.marcar_todas_como_lidas(self.professor), 4)
+        self.assertEqual(self.professor.mensagens_nao_lidas, 0) # O objeto também é atualizado
+        self.assertEqual(self._conferir(), 0)
+
+        # Nada mais a marcar: o contador não fica negativo
+        self.assertEqual(Conversa.marcar_todas_como_lidas(self.professor), 0)
+        self.assertEqual(self._conferir(), 0)
+
+        # Mensagens que chegam depois voltam a contar
+        self._enviar(self.alunos[0])
+        self.assertEqual(self._conferir(), 1)
+
+    def test_marcar_uma_conversa_e_depois_todas(self):
+        for aluno in self.alunos * 2:
+            self._enviar(aluno)
+        conversa = Conversa.objects.get(professor=self.professor, aluno=self.alunos[0])
+        self.assertEqual(conversa.marcar_como_lida(self.professor), 2)
+        self.assertEqual(self._conferir(), 2)
+        self.assertEqual(Conversa.marcar_todas_como_lidas(self.professor), 2)
+        self.assertEqual(self._conferir(), 0)
+
+
+# ==============================================================================
+# 7. COLETA DOS ARQUIVOS DE MÍDIA (gc_media)
+# ==============================================================================
+
+class GcMediaTests(TestCase):
+    """O 'gc_media' só apaga o que o armazenamento por conteúdo gravou e ninguém usa."""
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        configuracao = override_settings(MEDIA_ROOT=pasta)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def _gravar(self, nome, conteudo, antigo=True):
+        nome = default_storage.save(nome, ContentFile(conteudo))
+        if antigo:
+            # Mais velho que a '--idade-minima' padrão (24 horas)
+            dois_dias_atras = time.time() - 2 * 24 * 60 * 60
+            os.utime(default_storage.path(nome), (dois_dias_atras, dois_dias_atras))
+        return nome
+
+    def _variante(self, original):
+        return self._gravar(imagens.nome_variante(original, 288, 'webp'), b'variante')
+
+    def test_apaga_so_o_que_ninguem_usa(self):
+        usado = self._gravar('profile_pics/usada.jpg', b'foto em uso')
+        variante_usada = self._variante(usado)
+        sem_uso = self._gravar('profile_pics/trocada.jpg', b'foto trocada')
+        variante_sem_uso = self._variante(sem_uso)
+        recente = self._gravar('profile_pics/nova.jpg', b'foto recem-enviada', antigo=False)
+        # Foto anterior ao armazenamento por conteúdo, com nome de hash
+        antiga = 'profile_pics/0123456789abcdef0123456789abcdef.jpg'
+        caminho = default_storage.path(antiga)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(b'foto antiga')
+        os.utime(caminho, (0, 0))
+
+        user = criar_usuario('foto@teste.com')
+        CustomUser.objects.filter(pk=user.pk).update(foto_perfil=usado)
+
+        call_command('gc_media', stdout=io.StringIO())
+
+        for nome in (usado, variante_usada, recente, antiga):
+            self.assertTrue(default_storage.exists(nome), nome)
+        for nome in (sem_uso, variante_sem_uso):
+            self.assertFalse(default_storage.exists(nome), nome)
+        # A pasta das variantes apagadas também sai
+        self.assertFalse(os.path.exists(os.path.dirname(default_storage.path(variante_sem_uso))))
+
+    def test_simular_nao_apaga(self):
+        sem_uso = self._gravar('profile_pics/trocada.jpg', b'foto trocada')
+        saida = io.StringIO()
+        call_command('gc_media', simular=True, stdout=saida)
+        self.assertIn(sem_uso, saida.getvalue())
+        self.assertTrue(default_storage.exists(sem_uso))
@@ -93,10 +93,25 @@ urlpatterns = [
     # Rota para a caixa de entrada de mensagens do usuário
     path('perfil/mensagens/', views.minhas_mensagens, name='minhas_mensagens'),
 
+    # Rota: /perfil/mensagens/marcar-lidas/ (POST)
+    # View: 'marcar_todas_lidas' (zera as mensagens não lidas)
+    path('perfil/mensagens/marcar-lidas/', views.marcar_todas_lidas, name='marcar_todas_lidas'),
+
+    # Rota: /perfil/mensagens/exportar.csv (ou .jsonl)
+    # View: 'exportar_mensagens' (download do histórico em streaming)
+    path('perfil/mensagens/exportar.<str:formato>', views.exportar_mensagens, name='exportar_mensagens'),
+
+    # Rota: /perfil/mensagens/<id>/
+    # View: 'conversa_detalhe' (mensagens de uma conversa)
+    path('perfil/mensagens/<int:conversa_pk>/', views.conversa_detalhe, name='conversa'),
+
     # Rota de Perfil Dinâmica:
     # Captura um valor da URL (ex: 'joao123') e o passa
     # para a view 'perfil_detalhe' como um argumento 'username'.
     path('perfil/<str:username>/', views.perfil_detalhe, name='perfil_detalhe'),
+
+    # Rota para criar, editar ou excluir a avaliação de um professor (só POST)
+    path('perfil/<str:username>/avaliar/', views.avaliar_professor, name='avaliar_professor'),
     
     # ----------------------------------------------------------------------
     # 3. LISTAGEM E BUSCA (Páginas Principais)
@@ -110,6 +125,14 @@ urlpatterns = [
     # Esta é uma rota inteligente: ela REUTILIZA a mesma view 'lista_professores',
     # mas passa um argumento extra {'somente_voluntarios': True} para a função.
     path('voluntarios/', views.lista_professores, {'somente_voluntarios': True}, name='lista_voluntarios'),
+
+    # Fragmentos do "Carregar mais" (paginação por cursor).
+    # Retornam apenas o HTML dos próximos cards de cada listagem.
+    path('professores/mais/', views.lista_professores_fragmento, name='lista_professores_fragmento'),
+    path('voluntarios/mais/', views.lista_professores_fragmento, {'somente_voluntarios': True}, name='lista_voluntarios_fragmento'),
+
+    # Sugestões do autocompletar da busca (JSON)
+    path('autocompletar/', views.sugestoes_busca, name='autocompletar'),
     
     # ----------------------------------------------------------------------
     # 4. FUNCIONALIDADE DE CONTATO E PÁGINAS ESTÁTICAS
@@ -10,26 +10,28 @@ no banco de dados ou enviar um e-mail.
 
 # Funções do Django para renderizar páginas, redirecionar e buscar objetos
 from django.shortcuts import render, redirect, get_object_or_404
+# Resposta em JSON (ex: sugestões do autocompletar) e em "streaming" (exportação)
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+# Para montar URLs a partir do nome da rota (ex: 'users:lista_professores')
+from django.urls import reverse
 # Funções de autenticação (login, logout) e para obter o modelo de usuário
 from django.contrib.auth import login, logout, authenticate, get_user_model
 # Decorador para proteger páginas que exigem login
 from django.contrib.auth.decorators import login_required
 # Formulário de login padrão
 from django.contrib.auth.forms import AuthenticationForm 
-# Para consultas complexas no banco (ex: "OU")
-from django.db.models import Q
 # Para exibir mensagens de feedback (sucesso, erro, aviso)
 from django.contrib import messages
+# Para consultas com "OU" (ex: participantes de uma conversa)
+from django.db.models import Q
 # Para garantir que operações de banco de dados sejam seguras (ou tudo ou nada)
 from django.db import transaction 
-# Funções para construir e enviar e-mails
-from django.core.mail import send_mail, EmailMessage 
 # Para carregar templates de e-mail em HTML
 from django.template.loader import render_to_string 
 # Para acessar o 'settings.py' (ex: chaves de API, DEBUG)
 from django.conf import settings 
 # Para lógica de tempo (ex: anti-spam)
-from datetime import timedelta
+from datetime import datetime, timezone as dt_timezone
 from django.utils import timezone
 
 # --- Importações Locais (do próprio app) ---
@@ -38,12 +40,16 @@ from django.utils import timezone
 CustomUser = get_user_model() 
 
 # Importa os modelos (tabelas) e formulários deste aplicativo
-from .models import ProfessorProfile, ContactProfessor 
+from .models import ProfessorProfile, ProfessorListing, ContactProfessor, Conversa, Disciplina, CepCoordenada, Avaliacao, EmailOutbox
+from . import autocompletar, busca, cards, exportacao, facetas, geo, paginacao
+from .cache_paginas import GRUPO_ESTATICO, cache_anonimo
+from .limites import acao_concluida, limite_de_taxa
 from .forms import (
     CustomUserCreationForm, 
     CustomUserEditForm, 
     ProfessorProfileForm, 
-    ContactProfessorForm
+    ContactProfessorForm,
+    AvaliacaoForm
 )
 
 
@@ -51,6 +57,7 @@ from .forms import (
 # 0. PÁGINAS ESTÁTICAS
 # ==============================================================================
 
+@cache_anonimo(GRUPO_ESTATICO)
 def sobre_nos(request):
     """
     Renderiza a página estática 'Sobre Nós'.
@@ -208,6 +215,7 @@ def editar_perfil(request):
     return render(request, 'users/editar_perfil.html', context)
 
 
+@cache_anonimo('perfil:{username}')
 def perfil_detalhe(request, username):
     """
     Exibe a página de perfil pública de um usuário (aluno ou professor).
@@ -232,85 +240,387 @@ def perfil_detalhe(request, username):
         'perfil_extensao': perfil_extensao, # O objeto ProfessorProfile (ou None)
         'tipo_perfil': tipo_perfil,       # String 'aluno' ou 'professor'
     }
+
+    # Avaliações: a média e o total já vêm prontos no 'perfil_extensao'
+    # (mantidos de forma incremental); aqui só buscamos as mais recentes.
+    if tipo_perfil == 'professor':
+        context['avaliacoes'] = (
+            user_perfil.avaliacoes_recebidas.select_related('aluno')[:AVALIACOES_POR_PERFIL]
+        )
+        if request.user.is_authenticated and request.user != user_perfil:
+            minha_avaliacao = Avaliacao.objects.filter(aluno=request.user, professor=user_perfil).first()
+            context['pode_avaliar'] = _pode_avaliar(request.user, user_perfil)
+            context['minha_avaliacao'] = minha_avaliacao
+            context['form_avaliacao'] = AvaliacaoForm(instance=minha_avaliacao)
+
     return render(request, 'users/perfil_detalhe.html', context)
 
 
+# Conversas por página em "Minhas Mensagens" e mensagens por página de uma conversa
+CONVERSAS_POR_PAGINA = 20
+MENSAGENS_POR_PAGINA = 20
+
+# Abas de "Minhas Mensagens" (valor de '?aba=' -> título)
+ABAS_MENSAGENS = {
+    'todas': 'Todas',
+    'recebidas': 'Recebidas',
+    'enviadas': 'Enviadas',
+}
+
+
 @login_required
 def minhas_mensagens(request):
     """
-    Exibe uma lista de todas as mensagens enviadas E recebidas
-    pelo usuário logado.
+    Exibe as conversas do usuário logado (uma por aluno + professor), da
+    mais recente para a mais antiga, paginadas por cursor.
+
+    A lista vem da tabela de resumo 'Conversa' (última mensagem, prévia e
+    não lidas já prontos); o texto das mensagens só é carregado quando a
+    conversa é aberta ('conversa_detalhe'). Cada aba usa um índice:
+    - 'recebidas': conversas em que o usuário é o professor;
+    - 'enviadas': conversas em que o usuário é o aluno;
+    - 'todas': a UNIÃO das duas consultas acima (ver 'paginacao.paginar_uniao'),
+      em vez de um filtro 'aluno OU professor', que não usa bem os índices.
     """
     user = request.user
-    
-    # Usa Q object para buscar mensagens ONDE o usuário é o remetente (aluno)
-    # OU o destinatário (professor).
-    mensagens = ContactProfessor.objects.filter(
-        Q(aluno=user) | Q(professor=user)
-    ).select_related('aluno', 'professor') # Otimiza a query
-    
-    # A ordenação (da mais nova para a mais antiga) é definida no models.py
-    
+    aba = request.GET.get('aba')
+    if aba not in ABAS_MENSAGENS:
+        aba = 'todas'
+
+    recebidas = Conversa.objects.filter(professor=user)
+    enviadas = Conversa.objects.filter(aluno=user)
+    ordenacao = ('-ultima_mensagem_em', '-pk')
+    cursor = request.GET.get('cursor')
+
+    if aba == 'todas':
+        pagina = paginacao.paginar_uniao(
+            [recebidas, enviadas], ordenacao, cursor, CONVERSAS_POR_PAGINA,
+            relacionados=('aluno', 'professor'),
+        )
+    else:
+        conversas = recebidas if aba == 'recebidas' else enviadas
+        pagina = paginacao.paginar(
+            conversas.select_related('aluno', 'professor'), ordenacao, cursor, CONVERSAS_POR_PAGINA
+        )
+
     context = {
-        'mensagens': mensagens
+        'conversas': pagina.itens,
+        'proximo_cursor': pagina.proximo_cursor,
+        'aba': aba,
+        'abas': ABAS_MENSAGENS,
     }
     return render(request, 'users/minhas_mensagens.html', context)
 
 
+@login_required
+def conversa_detalhe(request, conversa_pk):
+    """
+    Exibe as mensagens de uma conversa (mais novas primeiro, paginadas por
+    cursor) e as marca como lidas, se o usuário logado for o destinatário.
+    Só os dois participantes podem abrir a conversa.
+
+    Com '?arquivadas=1', mostra as mensagens antigas que já foram para o
+    arquivo ('MensagemArquivada', ver 'arquivo.py'): uma consulta à parte,
+    feita só quando o usuário pede.
+    """
+    conversa = get_object_or_404(
+        Conversa.objects.select_related('aluno', 'professor').filter(Q(aluno=request.user) | Q(professor=request.user)),
+        pk=conversa_pk,
+    )
+
+    arquivadas = request.GET.get('arquivadas') == '1'
+    mensagens = conversa.mensagens_arquivadas.all() if arquivadas else conversa.mensagens.all()
+    pagina = paginacao.paginar(
+        mensagens, ('-data_envio', '-pk'), request.GET.get('cursor'), MENSAGENS_POR_PAGINA
+    )
+    if not arquivadas:
+        conversa.marcar_como_lida(request.user)
+
+    context = {
+        'conversa': conversa,
+        'mensagens': pagina.itens,
+        'proximo_cursor': pagina.proximo_cursor,
+        'arquivadas': arquivadas,
+        # Link para o arquivo: só na última página das mensagens recentes
+        'tem_arquivadas': (
+            not arquivadas and pagina.proximo_cursor is None
+            and conversa.mensagens_arquivadas.exists()
+        ),
+        # Quem está do "outro lado" da conversa, do ponto de vista do usuário logado
+        'participante': conversa.aluno if conversa.professor_id == request.user.pk else conversa.professor,
+    }
+    return render(request, 'users/conversa.html', context)
+
+
+@login_required
+def marcar_todas_lidas(request):
+    """
+    Marca como lidas todas as mensagens recebidas pelo usuário logado
+    (botão em "Minhas Mensagens"). Só aceita POST.
+    """
+    if request.method == 'POST':
+        marcadas = Conversa.marcar_todas_como_lidas(request.user)
+        if marcadas:
+            messages.success(request, f"{marcadas} mensage{'m marcada' if marcadas == 1 else 'ns marcadas'} como lida{'s' if marcadas > 1 else ''}.")
+    return redirect('users:minhas_mensagens')
+
+
+@login_required
+def exportar_mensagens(request, formato):
+    """
+    Baixa todo o histórico de mensagens do usuário logado (recebidas e
+    enviadas) em CSV ou JSONL.
+
+    A resposta é enviada em pedaços ('StreamingHttpResponse') enquanto as
+    mensagens são lidas do banco em lotes (ver 'exportacao.py'): a memória
+    usada e o tempo até o primeiro byte não dependem do tamanho do histórico.
+    """
+    if formato not in exportacao.GERADORES:
+        raise Http404("Formato de exportação desconhecido.")
+
+    response = StreamingHttpResponse(
+        exportacao.GERADORES[formato](request.user),
+        content_type=exportacao.FORMATOS[formato],
+    )
+    nome_arquivo = f"mensagens-{request.user.username}-{timezone.localdate():%Y%m%d}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    # Dados pessoais: nenhum cache intermediário deve guardar o arquivo
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
 # ==============================================================================
 # 3. LISTAGEM E BUSCA DE PROFESSORES
 # ==============================================================================
 
-def lista_professores(request, somente_voluntarios=False):
+# Quantidade de cards carregados por vez (página inicial e cada "Carregar mais")
+PROFESSORES_POR_PAGINA = 24
+
+# Ordenações que o aluno pode escolher (?ordem=...). Cada uma é a chave do
+# cursor de paginação e corresponde a um índice de 'ProfessorListing'
+# (as decrescentes percorrem o índice de trás para frente, por isso o
+# desempate também é '-pk').
+ORDENACOES = {
+    'nome': ('username', 'pk'),
+    'preco': ('tarifa_hora', 'pk'),
+    '-preco': ('-tarifa_hora', '-pk'),
+    'avaliacao': ('-media_avaliacoes', '-pk'),
+}
+
+
+def _consultar_professores(request, somente_voluntarios):
     """
-    Página principal que lista todos os professores ativos.
-    Inclui funcionalidade de busca e filtro para voluntários.
+    Monta a consulta da listagem de professores a partir da URL.
+    Compartilhada pela página completa e pelo fragmento "Carregar mais",
+    para que os dois apliquem exatamente os mesmos filtros.
+
+    Retorna uma tupla (professores, ordenacao, contexto), onde 'ordenacao'
+    é a chave do cursor de paginação (ver 'paginacao.py').
     """
-    # Começa com a base de usuários que são professores
-    professores_base = CustomUser.objects.filter(is_professor=True)
-    
-    # Filtra para incluir APENAS professores com perfil ativo
-    ativos_pks = ProfessorProfile.objects.filter(status_ativo=True).values_list('user_id', flat=True)
-    professores = professores_base.filter(pk__in=ativos_pks).select_related('professorprofile')
+    # Lê apenas a tabela desnormalizada 'ProfessorListing', que já contém
+    # somente os professores ATIVOS e todos os campos exibidos no card
+    # (ver 'models.py'). Não há joins com 'CustomUser' ou 'ProfessorProfile'.
+    professores = ProfessorListing.objects.all()
 
     titulo = "Encontre o Professor Certo!"
     
     # Se a URL for '.../voluntarios/', filtra apenas os voluntários
     if somente_voluntarios:
-        voluntarios_pks = ProfessorProfile.objects.filter(is_voluntario=True).values_list('user_id', flat=True)
-        professores = professores.filter(pk__in=voluntarios_pks)
+        professores = professores.filter(is_voluntario=True)
         titulo = "Professores Voluntários (Aulas Gratuitas)"
 
+    # Filtro por disciplina (ex: /?disciplina=fisica).
+    # Usa o catálogo normalizado: "fisica" NÃO encontra "Astrofísica".
+    # A subconsulta percorre apenas o índice da tabela de junção da disciplina.
+    disciplina = None
+    slug_disciplina = request.GET.get('disciplina')
+    if slug_disciplina:
+        disciplina = Disciplina.objects.filter(slug=slug_disciplina).first()
+        if disciplina:
+            professores = professores.filter(pk__in=disciplina.professores.values('user_id'))
+        else:
+            professores = professores.none()
+
+    # Ordenação padrão: alfabética, com o 'pk' como desempate do cursor
+    ordenacao = ('username', 'pk')
+
     # Lógica de Busca (query 'q' na URL, ex: /?q=matematica)
     query = request.GET.get('q')
     if query:
         # Busca no nome de usuário, nome completo, disciplinas ou cidade
-        professores = professores.filter(
-            Q(username__icontains=query) |
-            Q(nome_completo__icontains=query) |
-            Q(professorprofile__disciplinas__icontains=query) |
-            Q(cidade__icontains=query)
-        ).distinct() # '.distinct()' evita duplicatas se o professor corresponder a múltiplos critérios
-
-    context = {
-        'professores': professores.order_by('username'),
+        # usando o índice textual (ver 'busca.py'), e ordena por relevância.
+        professores = busca.buscar(professores, query)
+        ordenacao = ('-relevancia', 'pk')
+
+    # Busca "Perto de Mim" (ex: /?cep=50030-230&raio=10).
+    # Usa a caixa delimitadora + índice de coordenadas (ver 'geo.py') e
+    # ordena do mais perto para o mais longe (tem prioridade sobre a relevância).
+    cep = (request.GET.get('cep') or '').strip()
+    raio = geo.raio_da_url(request.GET.get('raio'))
+    cep_desconhecido = False
+    if cep:
+        coordenadas = CepCoordenada.localizar(cep)
+        if coordenadas:
+            professores = geo.filtrar_proximos(professores, *coordenadas, raio_km=raio)
+            # Quem só dá aulas online não depende da distância
+            professores = professores.exclude(modalidades='O')
+            ordenacao = ('distancia', 'pk')
+        else:
+            cep_desconhecido = True
+
+    # Filtros de facetas (ex: /?modalidade=O&online=1&cidade=Recife).
+    # Aplicados por último: as contagens das facetas partem da consulta
+    # SEM eles (cada faceta ignora o próprio filtro, ver 'facetas.py')
+    filtros = facetas.filtros_da_url(request.GET)
+    sem_facetas = professores
+    professores = facetas.aplicar_filtros(professores, filtros)
+
+    # Ordenação escolhida pelo aluno (ex: /?ordem=preco). Tem prioridade
+    # sobre a relevância da busca e sobre a distância.
+    ordem = request.GET.get('ordem')
+    if ordem in ORDENACOES:
+        ordenacao = ORDENACOES[ordem]
+    else:
+        ordem = ''
+
+    contexto = {
         'titulo': titulo,
-        'somente_voluntarios': somente_voluntarios
+        'somente_voluntarios': somente_voluntarios,
+        'disciplina': disciplina,
+        'filtros': filtros,
+        'cep': cep,
+        'raio': raio,
+        'raios': geo.RAIOS_KM,
+        'cep_desconhecido': cep_desconhecido,
+        'ordem': ordem,
+        # A consulta antes dos filtros de facetas (base das contagens)
+        'professores_sem_facetas': sem_facetas,
+        # Tudo o que define a consulta acima (usado na chave do cache de facetas)
+        'chave_consulta': {
+            'voluntarios': somente_voluntarios,
+            'disciplina': slug_disciplina or '',
+            'q': ' '.join((query or '').lower().split()),
+            'filtros': filtros,
+            'cep': CepCoordenada.normalizar(cep) if cep else '',
+            'raio': raio,
+        },
     }
+    return professores, ordenacao, contexto
+
+
+def _url_proxima_pagina(request, pagina, somente_voluntarios):
+    """
+    Monta a URL do fragmento "Carregar mais", mantendo os filtros atuais
+    da URL e trocando apenas o cursor.
+    """
+    if not pagina.tem_proxima:
+        return None
+    parametros = request.GET.copy()
+    parametros['cursor'] = pagina.proximo_cursor
+    nome_rota = 'users:lista_voluntarios_fragmento' if somente_voluntarios else 'users:lista_professores_fragmento'
+    return f"{reverse(nome_rota)}?{parametros.urlencode()}"
+
+
+@cache_anonimo('listagem')
+def lista_professores(request, somente_voluntarios=False):
+    """
+    Página principal que lista os professores ativos.
+    Inclui funcionalidade de busca e filtro para voluntários.
+
+    Os filtros de facetas (modalidade, cidade, online...) mostram ao lado
+    de cada opção quantos professores ela encontra (ver 'facetas.py').
+
+    Mostra apenas a primeira "fatia" de professores; as próximas são
+    pedidas pelo botão "Carregar mais" (ou pela rolagem infinita) ao
+    fragmento 'lista_professores_fragmento'.
+    """
+    professores, ordenacao, context = _consultar_professores(request, somente_voluntarios)
+    pagina = paginacao.paginar(professores, ordenacao, request.GET.get('cursor'), PROFESSORES_POR_PAGINA)
+
+    context.update({
+        'professores': pagina.itens,
+        # HTML dos cards, do cache sempre que possível (ver 'cards.py')
+        'cards': cards.renderizar(pagina.itens),
+        'proximo_cursor': pagina.proximo_cursor,
+        'url_proxima_pagina': _url_proxima_pagina(request, pagina, somente_voluntarios),
+        # Contagens dos filtros laterais (do cache, na maioria das vezes).
+        # Só a página completa precisa delas; o fragmento não as exibe.
+        'facetas': facetas.contar(context['professores_sem_facetas'], context['filtros'], context['chave_consulta']),
+    })
     return render(request, 'users/lista_professores.html', context)
 
 
+def lista_professores_fragmento(request, somente_voluntarios=False):
+    """
+    Retorna APENAS o HTML dos próximos cards (sem cabeçalho, menu, etc.),
+    para ser anexado à grade pelo JavaScript do "Carregar mais".
+
+    A URL da fatia seguinte vai no cabeçalho 'X-Proxima-Pagina' (ausente
+    quando não há mais professores).
+    """
+    professores, ordenacao, context = _consultar_professores(request, somente_voluntarios)
+    pagina = paginacao.paginar(professores, ordenacao, request.GET.get('cursor'), PROFESSORES_POR_PAGINA)
+
+    response = render(request, 'users/partials/cards_professores.html', {
+        'professores': pagina.itens,
+        'cards': cards.renderizar(pagina.itens),
+    })
+    url_proxima_pagina = _url_proxima_pagina(request, pagina, somente_voluntarios)
+    if url_proxima_pagina:
+        response['X-Proxima-Pagina'] = url_proxima_pagina
+    return response
+
+
+def sugestoes_busca(request):
+    """
+    Endpoint JSON do autocompletar da busca (ex: /autocompletar/?q=fis).
+
+    As sugestões (disciplinas, cidades e nomes de professores) saem do
+    índice de prefixos em memória (ver 'autocompletar.py'), sem consultar
+    o banco de dados a cada tecla digitada.
+    """
+    sugestoes = autocompletar.sugerir(request.GET.get('q', ''))
+    response = JsonResponse({'sugestoes': sugestoes})
+    # O navegador pode reaproveitar a resposta do mesmo prefixo por um minuto
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
 # ==============================================================================
 # 4. FUNCIONALIDADE DE CONTATO (Ação Principal)
 # ==============================================================================
 
+def _contar_contatos(request, inicio, professor_pk=None):
+    """
+    Conta no banco as mensagens enviadas pelo usuário desde 'inicio'
+    (usado pelo limite de taxa quando o cache não tem o contador).
+    Usa o índice (aluno, professor, data_envio) de 'ContactProfessor'.
+    """
+    contatos = ContactProfessor.objects.filter(
+        aluno=request.user,
+        data_envio__gte=datetime.fromtimestamp(inicio, tz=dt_timezone.utc),
+    )
+    if professor_pk is not None:
+        contatos = contatos.filter(professor_id=professor_pk)
+    return contatos.count()
+
+
+def _contato_bloqueado(request, professor_pk):
+    """Resposta para quem atingiu o limite de mensagens."""
+    professor = get_object_or_404(CustomUser, pk=professor_pk, is_professor=True)
+    messages.error(request, "Você enviou muitas mensagens recentemente. Tente novamente em uma hora.")
+    return redirect('users:perfil_detalhe', username=professor.username)
+
+
 @login_required
+# Anti-Spam: limites por professor e no total (ver LIMITES_DE_TAXA no 'settings.py')
+@limite_de_taxa('contato_professor', contar_no_banco=_contar_contatos, ao_bloquear=_contato_bloqueado)
 def contato_professor(request, professor_pk):
     """
     Lida com o envio do formulário de contato de um aluno para um professor.
     
     - Se GET: Mostra o formulário de contato.
-    - Se POST: Salva a mensagem no DB, tenta enviar o e-mail e redireciona.
+    - Se POST: Salva a mensagem no DB, coloca os e-mails na fila e redireciona.
     """
     # Busca o professor (destinatário) ou retorna Erro 404
     professor = get_object_or_404(CustomUser, pk=professor_pk, is_professor=True)
@@ -320,21 +630,6 @@ def contato_professor(request, professor_pk):
         messages.warning(request, "Você não pode enviar uma mensagem de contato para si mesmo.")
         return redirect('users:perfil_detalhe', username=professor.username)
 
-    # --- Lógica Anti-Spam ---
-    # Define um limite de tempo (ex: 1 hora atrás)
-    limite_tempo = timezone.now() - timedelta(hours=1)
-    # Conta quantas mensagens o usuário já enviou para este professor nesta janela de tempo
-    contagem_recente = ContactProfessor.objects.filter(
-        aluno=request.user,
-        professor=professor,
-        data_envio__gte=limite_tempo
-    ).count()
-    
-    LIMITE_MENSAGENS = 3 # Limite de 3 mensagens por hora
-    if contagem_recente >= LIMITE_MENSAGENS:
-        messages.error(request, "Você enviou muitas mensagens recentemente para este professor. Tente novamente em uma hora.")
-        return redirect('users:perfil_detalhe', username=professor.username)
-        
     aluno_email = request.user.email
 
     if request.method == 'POST':
@@ -347,64 +642,64 @@ def contato_professor(request, professor_pk):
                 contato = form.save(commit=False)
                 contato.aluno = request.user
                 contato.professor = professor
-                contato.save()
 
                 # Pega o e-mail confirmado pelo aluno no formulário
                 email_confirmado_pelo_aluno = form.cleaned_data.get('confirmar_email')
+                contato.email_resposta = email_confirmado_pelo_aluno
+
+                # Professores que preferem resumos recebem esta mensagem no
+                # próximo resumo (comando 'enviar_resumos_contatos')
+                aviso_imediato = (
+                    professor.professorprofile.frequencia_notificacoes
+                    == ProfessorProfile.FrequenciaNotificacao.IMEDIATA
+                )
+                if aviso_imediato:
+                    contato.notificado_em = timezone.now()
+                contato.save()
                 
                 # Prepara dados de telefone (se o aluno optou por incluir)
                 incluir_telefone = form.cleaned_data.get('incluir_telefone')
                 is_whatsapp = form.cleaned_data.get('is_whatsapp')
                 aluno_telefone = request.user.telefone if incluir_telefone and request.user.telefone else None
 
-                # 2. Tenta enviar os e-mails (para professor e cópia para aluno)
-                try:
-                    # Prepara o contexto para o template HTML do e-mail
-                    contexto_email = {
-                        'professor_nome': professor.como_deseja_ser_chamado or professor.username,
-                        'aluno_nome': request.user.como_deseja_ser_chamado or request.user.username,
-                        'assunto_mensagem': contato.assunto,
-                        'mensagem_detalhada': contato.mensagem,
-                        'aluno_email': email_confirmado_pelo_aluno,
-                        'aluno_telefone': aluno_telefone,
-                        'is_whatsapp': is_whatsapp,
-                        'link_perfil_aluno': request.build_absolute_uri(
-                            redirect('users:perfil_detalhe', username=request.user.username).url
-                        )
-                    }
-                    
-                    # Renderiza o HTML do e-mail
-                    html_message = render_to_string('emails/notificacao_professor.html', contexto_email)
-
-                    # Cria o e-mail para o PROFESSOR
-                    email_msg = EmailMessage(
-                        subject=f"Novo Interesse de Aula: {contato.assunto}",
-                        body=html_message, # Corpo principal é o HTML
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        to=[professor.email], # Destinatário
-                        reply_to=[email_confirmado_pelo_aluno], # Botão "Responder" vai para o aluno
+                # 2. Coloca os e-mails na fila (professor e cópia para o aluno).
+                # Eles são gravados NESTA transação e enviados em segundo plano
+                # pelo comando 'process_email_outbox': a resposta não espera
+                # pelo servidor de e-mail, e uma falha no envio é tentada de novo.
+                contexto_email = {
+                    'professor_nome': professor.como_deseja_ser_chamado or professor.username,
+                    'aluno_nome': request.user.como_deseja_ser_chamado or request.user.username,
+                    'assunto_mensagem': contato.assunto,
+                    'mensagem_detalhada': contato.mensagem,
+                    'aluno_email': email_confirmado_pelo_aluno,
+                    'aluno_telefone': aluno_telefone,
+                    'is_whatsapp': is_whatsapp,
+                    'link_perfil_aluno': request.build_absolute_uri(
+                        redirect('users:perfil_detalhe', username=request.user.username).url
                     )
-                    email_msg.content_subtype = "html" # Define o tipo como HTML
-                    
-                    # Envia para o PROFESSOR
-                    email_msg.send(fail_silently=False)
-
-                    # Envia a CÓPIA para o ALUNO (texto simples)
-                    send_mail(
-                        subject=f"Cópia: Seu contato com {professor.como_deseja_ser_chamado or professor.username}",
-                        message=f"Esta é uma cópia da sua mensagem enviada:\n\n{contato.mensagem}", 
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[email_confirmado_pelo_aluno],
-                        fail_silently=False, # Falha se houver erro
+                }
+
+                # E-mail para o PROFESSOR (HTML); "Responder" vai para o aluno
+                if aviso_imediato:
+                    EmailOutbox.enfileirar(
+                        assunto=f"Novo Interesse de Aula: {contato.assunto}",
+                        corpo=render_to_string('emails/notificacao_professor.html', contexto_email),
+                        html=True,
+                        destinatarios=[professor.email],
+                        responder_para=[email_confirmado_pelo_aluno],
                     )
 
-                    # Mensagem de sucesso completo (DB + E-mails)
-                    messages.success(request, f"Sua mensagem foi enviada para {professor.como_deseja_ser_chamado or professor.username} e uma cópia foi enviada para você.")
+                # CÓPIA para o ALUNO (texto simples)
+                EmailOutbox.enfileirar(
+                    assunto=f"Cópia: Seu contato com {professor.como_deseja_ser_chamado or professor.username}",
+                    corpo=f"Esta é uma cópia da sua mensagem enviada:\n\n{contato.mensagem}",
+                    destinatarios=[email_confirmado_pelo_aluno],
+                )
 
-                except Exception as e:
-                    # Falha no E-mail: A mensagem JÁ FOI SALVA no DB, mas o envio falhou.
-                    # Isso é crucial: o 'except' impede o site de quebrar (Erro 500).
-                    messages.warning(request, f"Sua mensagem foi salva, mas ocorreu um erro ao enviar o e-mail: {e}. Verifique suas configurações no Render.")
+            # A mensagem foi enviada: conta para o limite de taxa
+            acao_concluida(request)
+
+            messages.success(request, f"Sua mensagem foi enviada para {professor.como_deseja_ser_chamado or professor.username} e uma cópia foi enviada para você.")
 
             # Redireciona de volta para o perfil do professor
             return redirect('users:perfil_detalhe', username=professor.username)
@@ -424,7 +719,69 @@ def contato_professor(request, professor_pk):
 
 
 # ==============================================================================
-# 5. ZONA DE PERIGO (EXCLUSÃO DE CONTA)
+# 5. AVALIAÇÕES DE PROFESSORES
+# ==============================================================================
+
+# Quantas avaliações (as mais recentes) aparecem na página de perfil
+AVALIACOES_POR_PERFIL = 10
+
+
+def _pode_avaliar(aluno, professor):
+    """
+    Só pode avaliar quem já entrou em contato com o professor pela
+    plataforma (evita avaliações de quem nunca teve aula).
+
+    Consulta a 'Conversa' da dupla, que continua existindo mesmo depois que
+    as mensagens antigas são arquivadas.
+    """
+    return Conversa.objects.filter(aluno=aluno, professor=professor).exists()
+
+
+@login_required
+def avaliar_professor(request, username):
+    """
+    Cria, edita ou exclui a avaliação do aluno logado para um professor.
+    Aceita apenas POST (o formulário fica na página de perfil).
+
+    A média do professor é atualizada na mesma transação (ver 'Avaliacao.save'
+    e o signal 'descontar_avaliacao_excluida' no 'models.py').
+    """
+    professor = get_object_or_404(CustomUser, username=username, is_professor=True)
+
+    if request.method != 'POST':
+        return redirect('users:perfil_detalhe', username=professor.username)
+
+    if request.user == professor:
+        messages.warning(request, "Você não pode avaliar a si mesmo.")
+        return redirect('users:perfil_detalhe', username=professor.username)
+
+    avaliacao = Avaliacao.objects.filter(aluno=request.user, professor=professor).first()
+
+    # Exclusão da avaliação existente
+    if 'excluir' in request.POST:
+        if avaliacao:
+            avaliacao.delete()
+            messages.success(request, "Sua avaliação foi removida.")
+        return redirect('users:perfil_detalhe', username=professor.username)
+
+    if not _pode_avaliar(request.user, professor):
+        messages.error(request, "Você só pode avaliar professores com quem já entrou em contato.")
+        return redirect('users:perfil_detalhe', username=professor.username)
+
+    form = AvaliacaoForm(request.POST, instance=avaliacao)
+    if form.is_valid():
+        avaliacao = form.save(commit=False)
+        avaliacao.aluno = request.user
+        avaliacao.professor = professor
+        avaliacao.save()
+        messages.success(request, "Obrigado! Sua avaliação foi salva.")
+    else:
+        messages.error(request, "Escolha uma nota de 1 a 5 estrelas.")
+    return redirect('users:perfil_detalhe', username=professor.username)
+
+
+# ==============================================================================
+# 6. ZONA DE PERIGO (EXCLUSÃO DE CONTA)
 # ==============================================================================
 
 @login_required